@@ -0,0 +1,174 @@
+"""
+Benchmark das engines de segmentação (torch x ONNX x OpenVINO).
+
+Executa cada engine sobre o mesmo conjunto fixo de imagens de satélite e
+compara latência por imagem e a IoU da melhor máscara contra a engine torch.
+As engines exportadas precisam usar o mesmo tamanho de entrada do modelo
+torch; caso contrário o benchmark é interrompido antes de medir.
+
+Uso (a partir de lot-render/):
+    python -m benchmarks.bench_detection_engines \\
+        --images input/benchmark_images --model models/best.pt \\
+        --onnx models/best.onnx --openvino models/best_openvino_model/best.xml
+
+Com --locations (CSV com colunas lat,lon) as imagens vêm do provedor de
+imagens configurado; com IMAGERY_PROVIDER=mbtiles ou geotiff e
+IMAGERY_SOURCE_PATH o benchmark roda totalmente offline:
+    IMAGERY_PROVIDER=mbtiles IMAGERY_SOURCE_PATH=input/regiao.mbtiles \\
+        python -m benchmarks.bench_detection_engines --locations input/lotes.csv
+"""
+
+import argparse
+import csv
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.apis.imagery_providers import get_imagery_provider
+from src.modules.detection import get_best_segmentation, prepare_detection_image
+from src.modules.segmentation_engines import (
+    OnnxSegmentationModel,
+    OpenVinoSegmentationModel,
+    load_segmentation_model,
+)
+
+
+def load_images(images_dir: str, limit: int) -> List[np.ndarray]:
+    paths = sorted(
+        p
+        for p in Path(images_dir).iterdir()
+        if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+    )[:limit]
+    images = []
+    for path in paths:
+        img = prepare_detection_image(path.read_bytes())
+        if img is not None:
+            images.append(img)
+    return images
+
+
+def load_provider_images(
+    locations_csv: str, limit: int, zoom: int = 20
+) -> List[np.ndarray]:
+    """Busca as imagens das coordenadas do CSV no provedor configurado."""
+    provider = get_imagery_provider()
+    with open(locations_csv, newline="") as f:
+        rows = list(csv.DictReader(f))[:limit]
+    images = []
+    for row in rows:
+        content = provider.get_satellite_image(
+            lat=float(row["lat"]), lng=float(row["lon"]), zoom=zoom
+        )
+        img = prepare_detection_image(content)
+        if img is not None:
+            images.append(img)
+    return images
+
+
+def polygon_mask(polygon: Optional[np.ndarray], size: int = 512) -> np.ndarray:
+    mask = np.zeros((size, size), dtype=np.uint8)
+    if polygon is not None and len(polygon) >= 3:
+        pts = np.array(polygon * size, dtype=np.int32).reshape(-1, 1, 2)
+        cv2.fillPoly(mask, [pts], 1)
+    return mask
+
+
+def mask_iou(a: np.ndarray, b: np.ndarray) -> float:
+    union = np.logical_or(a, b).sum()
+    if union == 0:
+        return 1.0
+    return float(np.logical_and(a, b).sum() / union)
+
+
+def input_size(model) -> Tuple[int, int]:
+    """Tamanho (h, w) de entrada da engine (torch: imgsz do treino)."""
+    if hasattr(model, "overrides"):
+        imgsz = model.overrides.get("imgsz") or 640
+        if isinstance(imgsz, int):
+            return (imgsz, imgsz)
+        return (int(imgsz[0]), int(imgsz[-1]))
+    return tuple(model.imgsz)
+
+
+def check_input_size(name: str, model, reference: Tuple[int, int]) -> None:
+    size = input_size(model)
+    if size != reference:
+        raise SystemExit(
+            f"{name}: tamanho de entrada {size} difere do torch {reference}; "
+            f"exporte novamente sem --imgsz"
+        )
+
+
+def run_engine(model, images: List[np.ndarray], warmup: int = 2) -> Dict:
+    for img in images[:warmup]:
+        get_best_segmentation(model, img)
+
+    latencies = []
+    results = []
+    for img in images:
+        start = time.perf_counter()
+        results.append(get_best_segmentation(model, img))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"latencies": latencies, "results": results}
+
+
+def summarize(name: str, run: Dict, reference: Optional[Dict]) -> None:
+    lat = sorted(run["latencies"])
+    p95 = lat[min(int(len(lat) * 0.95), len(lat) - 1)]
+    line = (
+        f"{name:<10} mean={statistics.mean(lat):8.1f}ms "
+        f"p50={statistics.median(lat):8.1f}ms p95={p95:8.1f}ms "
+        f"detections={sum(r is not None for r in run['results'])}/{len(lat)}"
+    )
+    if reference is not None:
+        ious = [
+            mask_iou(
+                polygon_mask(r and r["polygon"]),
+                polygon_mask(ref and ref["polygon"]),
+            )
+            for r, ref in zip(run["results"], reference["results"])
+        ]
+        line += f" IoU(mean)={statistics.mean(ious):.4f} IoU(min)={min(ious):.4f}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--images")
+    source.add_argument("--locations")
+    parser.add_argument("--model", default="models/best.pt")
+    parser.add_argument("--onnx")
+    parser.add_argument("--openvino")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.locations:
+        images = load_provider_images(args.locations, args.limit)
+    else:
+        images = load_images(args.images, args.limit)
+    print(f"Imagens: {len(images)}")
+
+    torch_model = load_segmentation_model(args.model)
+    torch_size = input_size(torch_model)
+    print(f"Tamanho de entrada: {torch_size[0]}x{torch_size[1]}")
+    engines = []
+    if args.onnx:
+        engines.append(("onnx", OnnxSegmentationModel(args.onnx)))
+    if args.openvino:
+        engines.append(("openvino", OpenVinoSegmentationModel(args.openvino)))
+    for name, model in engines:
+        check_input_size(name, model, torch_size)
+
+    torch_run = run_engine(torch_model, images)
+    summarize("torch", torch_run, None)
+    for name, model in engines:
+        summarize(name, run_engine(model, images), torch_run)
+
+
+if __name__ == "__main__":
+    main()
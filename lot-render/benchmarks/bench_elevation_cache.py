@@ -0,0 +1,117 @@
+"""
+Benchmark do cache SQLite de elevações.
+
+Compara a implementação anterior (nova conexão por lote, um SELECT por
+ponto com chave (lat, lon) REAL) com o ElevationCache (conexão persistente
+em WAL, chave inteira empacotada e um SELECT ... IN por lote).
+
+Uso (a partir de lot-render/):
+    python -m benchmarks.bench_elevation_cache --lots 200 --points 130
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from src.modules.elevation_cache import ElevationCache
+
+
+def legacy_lookup(
+    db_path: str, locations: List[Tuple[float, float]]
+) -> List[float]:
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    elevations = []
+    for lat, lon in locations:
+        cursor.execute(
+            "SELECT elevation FROM elevations WHERE lat = ? AND lon = ?",
+            (round(lat, 6), round(lon, 6)),
+        )
+        row = cursor.fetchone()
+        elevations.append(row[0] if row else None)
+    conn.close()
+    return elevations
+
+
+def synthetic_lots(
+    lots: int, points: int, seed: int
+) -> List[List[Tuple[float, float]]]:
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform([-23.7, -46.8], [-23.4, -46.4], (lots, 2))
+    return [
+        [
+            (round(lat, 6), round(lon, 6))
+            for lat, lon in center + rng.uniform(-2e-4, 2e-4, (points, 2))
+        ]
+        for center in centers
+    ]
+
+
+def _time(fn, lots) -> List[float]:
+    timings = []
+    for lot in lots:
+        start = time.perf_counter()
+        fn(lot)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark do cache SQLite de elevações"
+    )
+    parser.add_argument("--lots", type=int, default=200)
+    parser.add_argument("--points", type=int, default=130)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    lots = synthetic_lots(args.lots, args.points, args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, "legacy.db")
+        conn = sqlite3.connect(legacy_db)
+        conn.execute(
+            "CREATE TABLE elevations (lat REAL, lon REAL, elevation REAL, "
+            "PRIMARY KEY (lat, lon))"
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO elevations VALUES (?, ?, ?)",
+            [(lat, lon, 750.0 + lat) for lot in lots for lat, lon in lot],
+        )
+        conn.commit()
+        conn.close()
+
+        cache = ElevationCache(os.path.join(tmp, "cache.db"))
+        for lot in lots:
+            cache.put_many(lot, [750.0 + lat for lat, _ in lot])
+
+        legacy_times = _time(lambda lot: legacy_lookup(legacy_db, lot), lots)
+        new_times = _time(cache.get_many, lots)
+
+        same = all(
+            legacy_lookup(legacy_db, lot) == cache.get_many(lot)
+            for lot in lots[:20]
+        )
+
+    print(f"{args.lots} lotes x {args.points} pontos (todos em cache)")
+    print(
+        f"anterior: média {statistics.mean(legacy_times):.3f}ms  "
+        f"p50 {statistics.median(legacy_times):.3f}ms"
+    )
+    print(
+        f"atual:    média {statistics.mean(new_times):.3f}ms  "
+        f"p50 {statistics.median(new_times):.3f}ms"
+    )
+    print(
+        f"speedup médio: {statistics.mean(legacy_times) / statistics.mean(new_times):.1f}x  "
+        f"mesmos valores: {same}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Benchmark da amostragem e correção de cores do lote.
+
+Compara o laço anterior de process_lot_colors (um DataFrame de uma linha
+por ponto, passado por correct_colors) com a coleta vetorizada (um único
+índice avançado na imagem) e correct_colors_array sobre o array (N, 3).
+Também compara, em nuvens densas de pontos (raio 2), correct_colors com a
+implementação anterior, que filtrava o DataFrame inteiro para cada ponto
+escuro/claro (O(N²)), e confere que correct_colors_array dá o mesmo
+resultado.
+
+Uso (a partir de lot-render/):
+    python -m benchmarks.bench_lot_colors --points 130 10000 --cloud 2000 20000
+"""
+
+import argparse
+import statistics
+import time
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.modules.lot_colors_adjustment import correct_colors, correct_colors_array
+
+DARK_THRESHOLD = 70
+BRIGHT_THRESHOLD = 215
+
+
+def legacy_colors(
+    image: np.ndarray, points: List[Tuple[int, int]]
+) -> Tuple[list, list]:
+    colors = []
+    colors_adjusted = []
+    for point in points:
+        color = image[point[1], point[0]]
+        colors.append(color.tolist())
+        df_color = pd.DataFrame(
+            [
+                [
+                    int(color[2]),
+                    int(color[1]),
+                    int(color[0]),
+                    point[0],
+                    point[1],
+                    0,
+                ]
+            ],
+            columns=["r", "g", "b", "x", "y", "z"],
+        )
+        df_corrected = correct_colors(df_color, DARK_THRESHOLD, BRIGHT_THRESHOLD)
+        colors_adjusted.append(
+            [
+                int(df_corrected.loc[0, "r"]),
+                int(df_corrected.loc[0, "g"]),
+                int(df_corrected.loc[0, "b"]),
+            ]
+        )
+    return colors, colors_adjusted
+
+
+def vectorized_colors(
+    image: np.ndarray, points: List[Tuple[int, int]]
+) -> Tuple[list, list]:
+    pixels = np.asarray(points, dtype=np.int64)
+    point_colors = image[pixels[:, 1], pixels[:, 0]]
+    colors_adjusted = correct_colors_array(
+        point_colors[:, [2, 1, 0]],
+        pixels,
+        DARK_THRESHOLD,
+        BRIGHT_THRESHOLD,
+        radius=0.0,
+    )
+    return point_colors.tolist(), colors_adjusted.tolist()
+
+
+def legacy_correct_colors(data: pd.DataFrame, radius: float = 2.0) -> pd.DataFrame:
+    """correct_colors anterior: um filtro no DataFrame inteiro por ponto"""
+    for flag, mask in (
+        ("is_dark", lambda d: d[["r", "g", "b"]].mean(axis=1) < DARK_THRESHOLD),
+        ("is_bright", lambda d: d[["r", "g", "b"]].mean(axis=1) > BRIGHT_THRESHOLD),
+    ):
+        data[flag] = mask(data)
+        for index, row in data[data[flag]].iterrows():
+            nearby = data[
+                (~data[flag])
+                & (np.abs(data["x"] - row["x"]) <= radius)
+                & (np.abs(data["y"] - row["y"]) <= radius)
+                & (np.abs(data["z"] - row["z"]) <= radius)
+            ]
+            if not nearby.empty:
+                data.loc[index, ["r", "g", "b"]] = (
+                    int(nearby["r"].mean()),
+                    int(nearby["g"].mean()),
+                    int(nearby["b"].mean()),
+                )
+    return data
+
+
+def synthetic_cloud(rng: np.random.Generator, points: int) -> pd.DataFrame:
+    """Nuvem com ~2 pontos por unidade² e z em degraus (terreno)"""
+    side = int(np.sqrt(points / 2)) + 1
+    return pd.DataFrame(
+        {
+            "r": rng.integers(0, 256, points),
+            "g": rng.integers(0, 256, points),
+            "b": rng.integers(0, 256, points),
+            "x": rng.uniform(0, side, points),
+            "y": rng.uniform(0, side, points),
+            "z": rng.integers(0, 3, points).astype(float),
+        }
+    )
+
+
+def _time(fn, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark da correção de cores do lote"
+    )
+    parser.add_argument("--points", type=int, nargs="+", default=[130, 10000])
+    parser.add_argument("--cloud", type=int, nargs="+", default=[2000, 20000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    image = rng.integers(0, 256, (1280, 1280, 3), dtype=np.uint8)
+
+    for n_points in args.points:
+        flat = rng.choice(1280 * 1280, size=n_points, replace=False)
+        points = [(int(i % 1280), int(i // 1280)) for i in flat]
+
+        repeat = args.repeat if n_points <= 1000 else 1
+        legacy_times = _time(lambda: legacy_colors(image, points), repeat)
+        new_times = _time(lambda: vectorized_colors(image, points), args.repeat)
+        same = legacy_colors(image, points) == vectorized_colors(image, points)
+
+        print(f"{n_points} pontos")
+        print(f"  anterior: p50 {statistics.median(legacy_times):.2f}ms")
+        print(f"  atual:    p50 {statistics.median(new_times):.2f}ms")
+        print(
+            f"  speedup: {statistics.median(legacy_times) / statistics.median(new_times):.0f}x  "
+            f"mesmas cores: {same}"
+        )
+
+    for n_points in args.cloud:
+        data = synthetic_cloud(rng, n_points)
+        start = time.perf_counter()
+        expected = legacy_correct_colors(data.copy())
+        legacy_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        corrected = correct_colors(data.copy(), DARK_THRESHOLD, BRIGHT_THRESHOLD)
+        new_ms = (time.perf_counter() - start) * 1000
+        array = correct_colors_array(
+            data[["r", "g", "b"]].to_numpy(),
+            data[["x", "y", "z"]].to_numpy(),
+            DARK_THRESHOLD,
+            BRIGHT_THRESHOLD,
+        )
+        columns = ["r", "g", "b"]
+        same = np.array_equal(
+            expected[columns].to_numpy(), corrected[columns].to_numpy()
+        ) and np.array_equal(expected[columns].to_numpy(), array)
+
+        print(f"nuvem de {n_points} pontos (raio 2)")
+        print(f"  anterior: {legacy_ms:.0f}ms")
+        print(f"  atual:    {new_ms:.0f}ms")
+        print(f"  speedup: {legacy_ms / new_ms:.0f}x  mesmas cores: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark da amostragem de pontos dentro do polígono do lote.
+
+Compara a implementação anterior de get_points_inside_mask (máscara do
+tamanho da imagem redesenhada e np.where sobre todos os pixels) com a
+amostragem estratificada no retângulo envolvente: latência, pico de
+memória (tracemalloc) e uniformidade (distância ao vizinho mais próximo;
+quanto maior o mínimo, menos pontos agrupados).
+
+Uso (a partir de lot-render/):
+    python -m benchmarks.bench_points_sampler --lots 50
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+from scipy.spatial import cKDTree
+
+from src.modules.colors import compute_number_of_points, get_points_inside_mask
+
+IMAGE_SIZE = 1280
+
+
+def legacy_points_inside_mask(
+    mask: np.ndarray, area_m2: float, max_points: int = 130
+) -> List[Tuple[int, int]]:
+    contours, _ = cv2.findContours(
+        mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+    )
+    if not contours:
+        return []
+    contour = max(contours, key=cv2.contourArea)
+    point_mask = np.zeros_like(mask)
+    cv2.drawContours(point_mask, [contour], -1, 255, -1)
+    y_coords, x_coords = np.where(point_mask > 0)
+    if len(x_coords) == 0:
+        return []
+    n_points = min(compute_number_of_points(area_m2), max_points)
+    indices = np.random.choice(len(x_coords), size=n_points, replace=False)
+    return [(int(x_coords[i]), int(y_coords[i])) for i in indices]
+
+
+def synthetic_masks(lots: int, seed: int) -> List[np.ndarray]:
+    """Lotes quadriláteros irregulares de ~150 a ~450 px de lado"""
+    rng = np.random.default_rng(seed)
+    masks = []
+    for _ in range(lots):
+        center = rng.uniform(400, 880, 2)
+        half = rng.uniform(75, 225, 2)
+        corners = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]]) * half
+        corners += rng.uniform(-0.25, 0.25, (4, 2)) * half
+        mask = np.zeros((IMAGE_SIZE, IMAGE_SIZE), dtype=np.uint8)
+        cv2.fillPoly(mask, [(center + corners).astype(np.int32)], 1)
+        masks.append(mask)
+    return masks
+
+
+def _run(fn, masks, area_m2: float):
+    timings, peaks, min_distances = [], [], []
+    for mask in masks:
+        tracemalloc.start()
+        start = time.perf_counter()
+        points = fn(mask, area_m2)
+        timings.append((time.perf_counter() - start) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024 / 1024)
+        tracemalloc.stop()
+        distances, _ = cKDTree(points).query(points, k=2)
+        min_distances.append(distances[:, 1].min())
+    return timings, peaks, min_distances
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark da amostragem de pontos no polígono"
+    )
+    parser.add_argument("--lots", type=int, default=50)
+    parser.add_argument("--area", type=float, default=8000.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    masks = synthetic_masks(args.lots, args.seed)
+    legacy = _run(legacy_points_inside_mask, masks, args.area)
+    current = _run(
+        lambda mask, area: get_points_inside_mask(mask, area, seed=args.seed),
+        masks,
+        args.area,
+    )
+
+    print(f"{args.lots} lotes, {compute_number_of_points(args.area)} pontos por lote")
+    for name, (timings, peaks, min_distances) in (
+        ("anterior", legacy),
+        ("atual   ", current),
+    ):
+        print(
+            f"{name}: p50 {statistics.median(timings):.2f}ms  "
+            f"pico de memória {statistics.median(peaks):.1f}MB  "
+            f"menor distância entre pontos (mediana) "
+            f"{statistics.median(min_distances):.1f}px"
+        )
+    print(
+        f"speedup: {statistics.median(legacy[0]) / statistics.median(current[0]):.1f}x  "
+        f"determinístico com seed: "
+        f"{get_points_inside_mask(masks[0], args.area, seed=1) == get_points_inside_mask(masks[0], args.area, seed=1)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
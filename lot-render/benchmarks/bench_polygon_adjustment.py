@@ -0,0 +1,254 @@
+"""
+Microbenchmark do ajuste de polígonos (select_best_polygon_adjustment).
+
+Compara o ajuste geométrico atual (PolygonAdjuster, direto sobre os
+vértices) com a implementação anterior, que rasterizava o polígono em uma
+máscara 512x512 e extraía o contorno de novo em cada método.
+
+Os polígonos são sintéticos e reproduzíveis (--seed): quadriláteros
+rotacionados e lotes irregulares com ruído, densificados com a quantidade de
+vértices típica de masks.xyn.
+
+Uso (a partir de lot-render/):
+    python -m benchmarks.bench_polygon_adjustment --polygons 500
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import time
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.modules.poligonization import (
+    adjust_rectangle_area,
+    calculate_polygon_area,
+    is_polygon_convex,
+    select_best_polygon_adjustment,
+)
+
+
+def _raster_contour(polygon: np.ndarray, size: tuple):
+    h, w = size
+    mask = np.zeros((h, w), dtype=np.uint8)
+    points = np.array(polygon * [w, h], dtype=np.int32)
+    cv2.fillPoly(mask, [points], 1)
+    contours, _ = cv2.findContours(
+        mask * 255, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+    )
+    if not contours:
+        return None
+    return max(contours, key=cv2.contourArea)
+
+
+def legacy_min_rect(polygon: np.ndarray, size: tuple) -> Optional[np.ndarray]:
+    h, w = size
+    contour = _raster_contour(polygon, size)
+    if contour is None:
+        return None
+    points = cv2.boxPoints(cv2.minAreaRect(contour)).astype(float)
+    points[:, 0] /= w
+    points[:, 1] /= h
+    return points
+
+
+def legacy_approx_poly(
+    polygon: np.ndarray,
+    size: tuple,
+    epsilon_factor: float = 0.04,
+    min_points: int = 4,
+    max_points: int = 6,
+) -> Optional[np.ndarray]:
+    h, w = size
+    contour = _raster_contour(polygon, size)
+    if contour is None:
+        return None
+    perimeter = cv2.arcLength(contour, True)
+    epsilon_min = epsilon_factor * 0.5
+    epsilon_max = epsilon_factor * 2.0
+    best_approx = None
+    best_points = 0
+    for _ in range(10):
+        epsilon = (epsilon_min + epsilon_max) / 2
+        approx = cv2.approxPolyDP(contour, epsilon * perimeter, True)
+        num_points = len(approx)
+        if min_points <= num_points <= max_points:
+            best_approx = approx
+            break
+        elif num_points > max_points:
+            epsilon_min = epsilon
+        else:
+            epsilon_max = epsilon
+        if best_approx is None or abs(
+            num_points - (min_points + max_points) / 2
+        ) < abs(best_points - (min_points + max_points) / 2):
+            best_approx = approx
+            best_points = num_points
+    points = best_approx.reshape(-1, 2).astype(float)
+    points[:, 0] /= w
+    points[:, 1] /= h
+    return points
+
+
+def legacy_select_best_polygon_adjustment(
+    segmentation_data: dict,
+    original_area: float,
+    size: tuple = (512, 512),
+    area_diff_threshold: float = 0.18,
+) -> Tuple[Optional[np.ndarray], str]:
+    """Implementação anterior (rasterização por método), como referência."""
+    polygon = segmentation_data["polygon"]
+    min_rect_polygon = legacy_min_rect(polygon, size)
+    if min_rect_polygon is None:
+        return None, "none"
+    min_rect_area = calculate_polygon_area(min_rect_polygon)
+    original_area = calculate_polygon_area(polygon)
+    min_rect_diff = (min_rect_area - original_area) / original_area
+    if abs(min_rect_diff) <= area_diff_threshold:
+        return min_rect_polygon, "min_rect"
+
+    approx_polygon = legacy_approx_poly(polygon, size)
+    if approx_polygon is not None and is_polygon_convex(approx_polygon):
+        approx_diff = (
+            calculate_polygon_area(approx_polygon) - original_area
+        ) / original_area
+        if abs(approx_diff) < abs(min_rect_diff) * 0.8:
+            return approx_polygon, "approx_poly"
+
+    return (
+        adjust_rectangle_area(min_rect_polygon, original_area / min_rect_area),
+        "adjusted_min_rect",
+    )
+
+
+def _densify(vertices: np.ndarray, points_per_edge: int) -> np.ndarray:
+    closed = np.vstack([vertices, vertices[:1]])
+    t = np.linspace(0, 1, points_per_edge, endpoint=False)[:, None]
+    return np.concatenate(
+        [a + (b - a) * t for a, b in zip(closed[:-1], closed[1:])]
+    )
+
+
+def synthetic_polygons(count: int, seed: int) -> List[np.ndarray]:
+    """Polígonos normalizados parecidos com as máscaras de lotes."""
+    rng = np.random.default_rng(seed)
+    polygons = []
+    for i in range(count):
+        center = rng.uniform(0.35, 0.65, 2)
+        half = rng.uniform(0.05, 0.2, 2)
+        angle = rng.uniform(0, np.pi)
+        rot = np.array(
+            [[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]]
+        )
+        if i % 3 == 2:
+            # Lote irregular (em L)
+            base = np.array(
+                [[-1, -1], [1, -1], [1, 0.2], [0.1, 0.2], [0.1, 1], [-1, 1]]
+            )
+        else:
+            base = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]])
+            base = base + rng.normal(0, 0.06, base.shape)
+        vertices = (base * half) @ rot.T + center
+        dense = _densify(vertices, int(rng.integers(15, 60)))
+        dense += rng.normal(0, 0.002, dense.shape)
+        polygons.append(np.clip(dense, 0.0, 1.0))
+    return polygons
+
+
+def _polygon_mask(polygon: Optional[np.ndarray], size: int = 512) -> np.ndarray:
+    mask = np.zeros((size, size), dtype=np.uint8)
+    if polygon is not None:
+        cv2.fillPoly(mask, [np.array(polygon * size, dtype=np.int32)], 1)
+    return mask
+
+
+def _mask_iou(a: np.ndarray, b: np.ndarray) -> float:
+    union = np.logical_or(a, b).sum()
+    return 1.0 if union == 0 else float(np.logical_and(a, b).sum() / union)
+
+
+def _time_all(
+    fn: Callable, polygons: List[np.ndarray], repeat: int
+) -> Tuple[List[float], list]:
+    timings = []
+    outputs = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for polygon in polygons:
+            seg = {"polygon": polygon, "class_id": 0, "confidence": 1.0}
+            area = calculate_polygon_area(polygon)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                result = fn(seg, area, size=(512, 512))
+            timings.append((time.perf_counter() - start) / repeat * 1e6)
+            outputs.append(result)
+    return timings, outputs
+
+
+def _summary(timings: List[float]) -> str:
+    ordered = sorted(timings)
+    p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+    return (
+        f"média {statistics.mean(ordered):8.1f}us  "
+        f"p50 {statistics.median(ordered):8.1f}us  p95 {p95:8.1f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark do ajuste de polígonos (raster x geométrico)"
+    )
+    parser.add_argument("--polygons", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    polygons = synthetic_polygons(args.polygons, args.seed)
+    vertices = [len(p) for p in polygons]
+    print(
+        f"{len(polygons)} polígonos, {statistics.mean(vertices):.0f} vértices em média"
+    )
+
+    legacy_times, legacy_out = _time_all(
+        legacy_select_best_polygon_adjustment, polygons, args.repeat
+    )
+    new_times, new_out = _time_all(
+        select_best_polygon_adjustment, polygons, args.repeat
+    )
+
+    same_method = sum(
+        old[1] == new[1] for old, new in zip(legacy_out, new_out)
+    )
+    ious = [
+        _mask_iou(_polygon_mask(old[0]), _polygon_mask(new[0]))
+        for old, new in zip(legacy_out, new_out)
+    ]
+    originals = [_polygon_mask(polygon) for polygon in polygons]
+    legacy_fit = [
+        _mask_iou(mask, _polygon_mask(out[0]))
+        for mask, out in zip(originals, legacy_out)
+    ]
+    new_fit = [
+        _mask_iou(mask, _polygon_mask(out[0]))
+        for mask, out in zip(originals, new_out)
+    ]
+
+    print(f"raster (anterior):  {_summary(legacy_times)}")
+    print(f"geométrico (atual): {_summary(new_times)}")
+    print(
+        f"speedup médio: {statistics.mean(legacy_times) / statistics.mean(new_times):.1f}x"
+    )
+    print(
+        f"mesmo método: {same_method}/{len(polygons)}  "
+        f"IoU entre resultados: média {statistics.mean(ious):.4f}, mín {min(ious):.4f}"
+    )
+    print(
+        f"IoU com a máscara original: raster {statistics.mean(legacy_fit):.4f}  "
+        f"geométrico {statistics.mean(new_fit):.4f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import httpx
+from googlemaps.convert import encode_polyline
+
+from .google_maps import ELEVATION_URL
+from .http_client import async_http_get, create_async_client
+
+Location = Tuple[float, float]
+
+# Google Elevation API limit of locations per request
+MAX_LOCATIONS_PER_REQUEST = 512
+
+
+class TokenBucket:
+    """
+    Async token bucket: refills rate tokens per second up to capacity and
+    each request takes one token, waiting for the refill when empty.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.rate,
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ElevationFetcher:
+    """
+    Concurrent Google Elevation API client for one API key.
+
+    Points are sent as encoded polylines (enc:..., about 5x shorter than
+    "lat,lon|..." so each request carries up to batch_size points),
+    requests are paced by a token bucket and at most max_in_flight run at
+    once. Requests are single-flight per point: a point already being
+    fetched for another lot is awaited instead of requested again.
+
+    Polyline encoding rounds coordinates to 1e-5 degrees (~1 m), well
+    below the resolution of the elevation data.
+
+    Must be created and used on a single event loop.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        rate: float = 50,
+        burst: float = 10,
+        max_in_flight: int = 8,
+        batch_size: int = MAX_LOCATIONS_PER_REQUEST,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.api_key = api_key
+        self.batch_size = min(batch_size, MAX_LOCATIONS_PER_REQUEST)
+        self.client = client
+        self._bucket = TokenBucket(rate, burst)
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._in_flight: Dict[Location, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.requests = 0
+        self.points_fetched = 0
+        self.points_deduplicated = 0
+
+    async def fetch(
+        self, locations: Sequence[Location]
+    ) -> List[Optional[float]]:
+        """Elevations in the order of locations (None where the API failed)"""
+        loop = asyncio.get_running_loop()
+        keys = [(round(lat, 6), round(lon, 6)) for lat, lon in locations]
+
+        waiting: Dict[Location, asyncio.Future] = {}
+        new_keys: List[Location] = []
+        for key in dict.fromkeys(keys):
+            future = self._in_flight.get(key)
+            if future is None:
+                future = loop.create_future()
+                self._in_flight[key] = future
+                new_keys.append(key)
+            else:
+                self.points_deduplicated += 1
+            waiting[key] = future
+
+        # Tasks are not cancelled with the caller: other lots may await them
+        tasks = [
+            asyncio.ensure_future(
+                self._fetch_batch(new_keys[i : i + self.batch_size])
+            )
+            for i in range(0, len(new_keys), self.batch_size)
+        ]
+        for task in tasks:
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+
+        results = {
+            key: await asyncio.shield(future) for key, future in waiting.items()
+        }
+        return [results[key] for key in keys]
+
+    async def _fetch_batch(self, keys: List[Location]) -> None:
+        elevations: List[Optional[float]] = [None] * len(keys)
+        try:
+            async with self._semaphore:
+                await self._bucket.acquire()
+                elevations = await self._request(keys)
+        except Exception as e:
+            print(f"Elevation batch of {len(keys)} points failed: {str(e)}")
+        finally:
+            for key, elevation in zip(keys, elevations):
+                future = self._in_flight.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_result(elevation)
+
+    async def _request(self, keys: List[Location]) -> List[Optional[float]]:
+        self.requests += 1
+        params = {"locations": f"enc:{encode_polyline(keys)}", "key": self.api_key}
+        response = await async_http_get(
+            ELEVATION_URL,
+            params=params,
+            provider="google_elevation",
+            client=self.client,
+        )
+        if response.status_code != 200:
+            print(f"Elevation API request failed: {response.status_code}")
+            return [None] * len(keys)
+
+        data = response.json()
+        results = data.get("results", [])
+        if data.get("status") != "OK" or len(results) != len(keys):
+            print(f"Elevation API error: {data.get('status')}")
+            return [None] * len(keys)
+
+        self.points_fetched += len(keys)
+        return [result.get("elevation") for result in results]
+
+    async def aclose(self) -> None:
+        """Cancel the pending requests; their points resolve to None"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks)
+        # Tasks cancelled before starting never reach _fetch_batch's finally
+        for future in self._in_flight.values():
+            if not future.done():
+                future.set_result(None)
+        self._in_flight.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "points_fetched": self.points_fetched,
+            "points_deduplicated": self.points_deduplicated,
+            "points_in_flight": len(self._in_flight),
+        }
+
+
+class _FetcherLoop:
+    """
+    Background event loop shared by every elevation fetch of the process,
+    so sync callers (the lot pipeline modules, from any thread) share the
+    rate limiter and the in-flight table.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.client: Optional[httpx.AsyncClient] = None
+        self.fetchers: Dict[str, ElevationFetcher] = {}
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="elevation-fetcher", daemon=True
+        )
+        self._thread.start()
+
+    def _get_fetcher(self, api_key: str) -> ElevationFetcher:
+        fetcher = self.fetchers.get(api_key)
+        if fetcher is None:
+            if self.client is None:
+                self.client = create_async_client()
+            fetcher = ElevationFetcher(
+                api_key,
+                rate=float(os.getenv("ELEVATION_RATE_LIMIT_PER_SECOND", "50")),
+                burst=float(os.getenv("ELEVATION_RATE_BURST", "10")),
+                max_in_flight=int(os.getenv("ELEVATION_MAX_IN_FLIGHT", "8")),
+                batch_size=int(
+                    os.getenv(
+                        "ELEVATION_BATCH_SIZE", str(MAX_LOCATIONS_PER_REQUEST)
+                    )
+                ),
+                client=self.client,
+            )
+            self.fetchers[api_key] = fetcher
+        return fetcher
+
+    async def _fetch(
+        self, locations: Sequence[Location], api_key: str
+    ) -> List[Optional[float]]:
+        return await self._get_fetcher(api_key).fetch(locations)
+
+    def submit(self, locations: Sequence[Location], api_key: str):
+        return asyncio.run_coroutine_threadsafe(
+            self._fetch(list(locations), api_key), self.loop
+        )
+
+    async def _aclose(self) -> None:
+        # Pending fetches return None elevations instead of leaving sync
+        # callers blocked on a stopped loop
+        for fetcher in self.fetchers.values():
+            await fetcher.aclose()
+        current = asyncio.current_task()
+        pending = [task for task in asyncio.all_tasks() if task is not current]
+        if pending:
+            _, still_pending = await asyncio.wait(pending, timeout=5)
+            for task in still_pending:
+                task.cancel()
+            if still_pending:
+                await asyncio.wait(still_pending)
+        if self.client is not None:
+            await self.client.aclose()
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._aclose(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+_fetcher_loop: Optional[_FetcherLoop] = None
+_fetcher_lock = threading.Lock()
+
+
+def _get_fetcher_loop() -> _FetcherLoop:
+    global _fetcher_loop
+    with _fetcher_lock:
+        if _fetcher_loop is None:
+            _fetcher_loop = _FetcherLoop()
+        return _fetcher_loop
+
+
+def fetch_elevations(
+    locations: Sequence[Location], api_key: str
+) -> List[Optional[float]]:
+    """
+    Fetch elevations from the Google Elevation API (blocking).
+
+    Environment:
+        ELEVATION_RATE_LIMIT_PER_SECOND: requests per second, match the
+            project quota (default: 50)
+        ELEVATION_RATE_BURST: requests allowed at once after idling (default: 10)
+        ELEVATION_MAX_IN_FLIGHT: concurrent requests (default: 8)
+        ELEVATION_BATCH_SIZE: points per request, at most 512 (default: 512)
+    """
+    if not locations:
+        return []
+    return _get_fetcher_loop().submit(locations, api_key).result()
+
+
+def close_elevation_fetcher() -> None:
+    """Stop the background loop and close its HTTP client (shutdown)"""
+    global _fetcher_loop
+    with _fetcher_lock:
+        if _fetcher_loop is not None:
+            _fetcher_loop.close()
+            _fetcher_loop = None
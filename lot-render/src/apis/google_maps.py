@@ -1,6 +1,12 @@
+import asyncio
 import os
-import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
+
+from .http_client import async_http_get, http_get
+from .imagery_cache import get_imagery_cache, quantize_center
+
+STATIC_MAP_URL = "https://maps.googleapis.com/maps/api/staticmap"
+ELEVATION_URL = "https://maps.googleapis.com/maps/api/elevation/json"
 
 
 class GoogleMapsAPI:
@@ -8,6 +14,7 @@ class GoogleMapsAPI:
         self.api_key = api_key or os.getenv("GOOGLE_MAPS_API_KEY")
         if not self.api_key:
             raise ValueError("Google Maps API key not found")
+        self.image_cache = get_imagery_cache()
 
     def get_satellite_image(
         self,
@@ -20,6 +27,12 @@ class GoogleMapsAPI:
         """
         Get satellite image from Google Maps Static API.
 
+        With the imagery cache enabled the center is snapped to a grid of
+        SATELLITE_CACHE_QUANTUM_PX world pixels (default and maximum: 1,
+        i.e. at most half a pixel off, since callers georeference the image
+        with the center they passed) and repeat requests are served from
+        disk.
+
         Args:
             lat: Latitude
             lng: Longitude
@@ -30,18 +43,137 @@ class GoogleMapsAPI:
         Returns:
             bytes: Image content
         """
-        base_url = "https://maps.googleapis.com/maps/api/staticmap"
+        maptype = "satellite"
+        lat, lng, cache_key = self._image_cache_key(
+            lat, lng, zoom, size, scale, maptype
+        )
+        if cache_key:
+            content = self.image_cache.get(cache_key)
+            if content is not None:
+                return content
+
+        content = self.fetch_static_map(lat, lng, zoom, size, scale, maptype)
+
+        if cache_key:
+            self.image_cache.put(cache_key, content)
+
+        return content
+
+    async def get_satellite_image_async(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int = 20,
+        size: str = "640x640",
+        scale: int = 2,
+    ) -> bytes:
+        """Async variant of get_satellite_image (shared httpx client)"""
+        maptype = "satellite"
+        lat, lng, cache_key = self._image_cache_key(
+            lat, lng, zoom, size, scale, maptype
+        )
+        if cache_key:
+            content = await asyncio.to_thread(self.image_cache.get, cache_key)
+            if content is not None:
+                return content
 
-        params = {
+        content = await self.fetch_static_map_async(
+            lat, lng, zoom, size, scale, maptype
+        )
+
+        if cache_key:
+            await asyncio.to_thread(self.image_cache.put, cache_key, content)
+
+        return content
+
+    def _image_cache_key(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int,
+        size: str,
+        scale: int,
+        maptype: str,
+    ) -> Tuple[float, float, Optional[str]]:
+        """Snap the center to the cache grid and build the cache key"""
+        if not self.image_cache:
+            return lat, lng, None
+        lat, lng = quantize_center(
+            lat,
+            lng,
+            zoom,
+            scale,
+            float(os.getenv("SATELLITE_CACHE_QUANTUM_PX", "1")),
+        )
+        cache_key = self.image_cache.make_key(
+            center=f"{lat},{lng}",
+            zoom=zoom,
+            size=size,
+            scale=scale,
+            maptype=maptype,
+        )
+        return lat, lng, cache_key
+
+    def _static_map_params(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int,
+        size: str,
+        scale: int,
+        maptype: str,
+    ) -> Dict[str, Any]:
+        return {
             "center": f"{lat},{lng}",
             "zoom": zoom,
             "size": size,
             "scale": scale,
-            "maptype": "satellite",
+            "maptype": maptype,
             "key": self.api_key,
         }
 
-        response = requests.get(base_url, params=params)
+    def fetch_static_map(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int = 20,
+        size: str = "640x640",
+        scale: int = 2,
+        maptype: str = "satellite",
+    ) -> bytes:
+        """
+        Single Google Maps Static API request, without caching.
+
+        Returns:
+            bytes: Image content
+        """
+        params = self._static_map_params(lat, lng, zoom, size, scale, maptype)
+
+        response = http_get(
+            STATIC_MAP_URL, params=params, provider="google_static_maps"
+        )
+        if response.status_code != 200:
+            raise Exception(
+                f"Error getting image: {response.status_code} - {response.text}"
+            )
+
+        return response.content
+
+    async def fetch_static_map_async(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int = 20,
+        size: str = "640x640",
+        scale: int = 2,
+        maptype: str = "satellite",
+    ) -> bytes:
+        """Async variant of fetch_static_map (shared httpx client)"""
+        params = self._static_map_params(lat, lng, zoom, size, scale, maptype)
+
+        response = await async_http_get(
+            STATIC_MAP_URL, params=params, provider="google_static_maps"
+        )
         if response.status_code != 200:
             raise Exception(
                 f"Error getting image: {response.status_code} - {response.text}"
@@ -60,11 +192,11 @@ class GoogleMapsAPI:
         Returns:
             float: Elevation in meters
         """
-        base_url = "https://maps.googleapis.com/maps/api/elevation/json"
-
         params = {"locations": f"{lat},{lng}", "key": self.api_key}
 
-        response = requests.get(base_url, params=params)
+        response = http_get(
+            ELEVATION_URL, params=params, provider="google_elevation"
+        )
         if response.status_code != 200:
             raise Exception(
                 f"Error getting elevation: {response.status_code} - {response.text}"
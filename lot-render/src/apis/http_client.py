@@ -0,0 +1,182 @@
+import importlib.util
+import os
+import threading
+from typing import Any, Optional, Tuple, Union
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from .resilience import get_resilient_caller
+
+Timeout = Union[float, Tuple[float, float]]
+
+# Responses worth retrying (rate limiting and transient server errors)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def http_timeouts() -> Tuple[float, float]:
+    """(connect, read) timeouts in seconds"""
+    return (
+        float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+        float(os.getenv("HTTP_READ_TIMEOUT", "30")),
+    )
+
+
+def _pool_size() -> int:
+    return int(os.getenv("HTTP_POOL_SIZE", "32"))
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Process-wide requests session for the sync modules.
+
+    Connections are kept alive in a pool per host (HTTP_POOL_SIZE
+    connections each), so repeated calls to the same API skip the TCP and
+    TLS handshakes.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=_pool_size(), pool_maxsize=_pool_size()
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _status_failed(response) -> bool:
+    return response.status_code in RETRYABLE_STATUS
+
+
+def http_get(
+    url: str,
+    params: Optional[dict] = None,
+    timeout: Optional[Timeout] = None,
+    provider: Optional[str] = None,
+    **kwargs: Any,
+) -> requests.Response:
+    """
+    GET through the shared session with default timeouts
+    (HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT seconds).
+
+    With provider set the call runs under that provider's resilience policy
+    (deadline, retries on errors and 429/5xx, hedging, circuit breaker; see
+    resilience.get_resilient_caller). The read timeout of each attempt is
+    capped by the time left in the deadline.
+    """
+    connect, read = http_timeouts()
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+    elif timeout is not None:
+        connect = read = timeout
+
+    if provider is None:
+        return get_session().get(
+            url, params=params, timeout=(connect, read), **kwargs
+        )
+
+    def attempt(remaining: float) -> requests.Response:
+        return get_session().get(
+            url,
+            params=params,
+            timeout=(min(connect, remaining), min(read, remaining)),
+            **kwargs,
+        )
+
+    return get_resilient_caller(provider).call(attempt, _status_failed)
+
+
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def http2_enabled() -> bool:
+    """HTTP/2 is used when HTTP2_ENABLED is set and the h2 package is installed"""
+    if os.getenv("HTTP2_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return False
+    return importlib.util.find_spec("h2") is not None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Shared httpx client for the FastAPI services (one per process, bound to
+    the server event loop), with keep-alive pools and HTTP/2 when available.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = create_async_client()
+    return _async_client
+
+
+def create_async_client() -> httpx.AsyncClient:
+    """New httpx client with the default timeouts, pool limits and HTTP/2"""
+    connect, read = http_timeouts()
+    return httpx.AsyncClient(
+        http2=http2_enabled(),
+        timeout=httpx.Timeout(read, connect=connect),
+        limits=httpx.Limits(
+            max_connections=_pool_size() * 2,
+            max_keepalive_connections=_pool_size(),
+        ),
+    )
+
+
+async def async_http_get(
+    url: str,
+    params: Optional[dict] = None,
+    timeout: Optional[Timeout] = None,
+    provider: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    **kwargs: Any,
+) -> httpx.Response:
+    """
+    Async GET through the shared httpx client (provider: see http_get).
+    Callers running on another event loop pass their own client.
+    """
+    client = client or get_async_client()
+    connect, read = http_timeouts()
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+    elif timeout is not None:
+        connect = read = timeout
+
+    if provider is None:
+        return await client.get(
+            url,
+            params=params,
+            timeout=httpx.Timeout(read, connect=connect),
+            **kwargs,
+        )
+
+    async def attempt(remaining: float) -> httpx.Response:
+        return await client.get(
+            url,
+            params=params,
+            timeout=httpx.Timeout(
+                min(read, remaining), connect=min(connect, remaining)
+            ),
+            **kwargs,
+        )
+
+    return await get_resilient_caller(provider).call_async(
+        attempt, _status_failed
+    )
+
+
+async def close_http_clients() -> None:
+    """Close the shared clients (FastAPI shutdown)"""
+    global _async_client, _session
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
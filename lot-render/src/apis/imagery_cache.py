@@ -0,0 +1,188 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from ..modules.pixel_to_geo import latlon_to_world_pixel, world_pixel_to_latlon
+
+
+# Callers georeference the image with their own (unsnapped) center, so the
+# snap must stay below the precision of the detected polygons
+MAX_CENTER_QUANTUM_PX = 1.0
+
+
+def quantize_center(
+    lat: float,
+    lng: float,
+    zoom: int,
+    scale: int,
+    quantum_px: float = 1.0,
+) -> Tuple[float, float]:
+    """
+    Snap a map center to a grid of quantum_px world pixels at zoom/scale.
+
+    Requests are sent with the snapped center, so a cached image is exact
+    for its key and the caller's center is off by at most quantum_px / 2
+    pixels. quantum_px is capped at MAX_CENTER_QUANTUM_PX: callers convert
+    pixels to lat/lon with the center they asked for, and a coarser grid
+    would shift every polygon.
+    """
+    quantum_px = min(quantum_px, MAX_CENTER_QUANTUM_PX)
+    x, y = latlon_to_world_pixel(lat, lng, zoom, scale)
+    x = round(x / quantum_px) * quantum_px
+    y = round(y / quantum_px) * quantum_px
+    snapped_lat, snapped_lng = world_pixel_to_latlon(x, y, zoom, scale)
+    return round(snapped_lat, 8), round(snapped_lng, 8)
+
+
+class ImageryDiskCache:
+    """
+    Content-addressed disk cache for Static Maps images.
+
+    Each image is stored under the SHA-256 of its request parameters
+    (center, zoom, size, scale, maptype). Writes go to a temporary file that
+    is atomically renamed, so concurrent readers (threads or other
+    processes) never see partial images. When the total size exceeds
+    max_bytes the least recently used files are removed.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # path -> size, oldest first
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".img"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(entries):
+            self._index[path] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def make_key(**params: Any) -> str:
+        canonical = "&".join(f"{k}={params[k]}" for k in sorted(params))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.img")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached bytes for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            # mtime is the LRU clock shared with other processes
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            if path not in self._index:
+                self._total_bytes += len(content)
+            self._index[path] = len(content)
+            self._index.move_to_end(path)
+        return content
+
+    def put(self, key: str, content: bytes) -> None:
+        """Store content atomically and evict old entries over the size cap."""
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        with self._lock:
+            self._total_bytes += len(content) - self._index.pop(path, 0)
+            self._index[path] = len(content)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            path, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cache_dir": self.cache_dir,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_imagery_cache: Optional[ImageryDiskCache] = None
+_imagery_cache_lock = threading.Lock()
+
+
+def get_imagery_cache() -> Optional[ImageryDiskCache]:
+    """
+    Return the process-wide satellite image cache (None when disabled).
+
+    Environment:
+        SATELLITE_CACHE_ENABLED: enable the cache (default: true)
+        SATELLITE_CACHE_DIR: cache directory (default: <tmp>/satellite_cache)
+        SATELLITE_CACHE_MAX_MB: size cap in MB (default: 1024)
+    """
+    global _imagery_cache
+    if os.getenv("SATELLITE_CACHE_ENABLED", "true").lower() not in (
+        "1",
+        "true",
+        "yes",
+    ):
+        return None
+
+    with _imagery_cache_lock:
+        if _imagery_cache is None:
+            _imagery_cache = ImageryDiskCache(
+                cache_dir=os.getenv(
+                    "SATELLITE_CACHE_DIR",
+                    os.path.join(tempfile.gettempdir(), "satellite_cache"),
+                ),
+                max_bytes=int(
+                    float(os.getenv("SATELLITE_CACHE_MAX_MB", "1024")) * 1024**2
+                ),
+            )
+        return _imagery_cache
@@ -0,0 +1,389 @@
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ..modules.pixel_to_geo import TILE_SIZE, latlon_to_world_pixel
+
+EARTH_RADIUS = 6378137.0
+PROVIDERS = ("google", "mosaic", "mbtiles", "geotiff")
+
+
+def _window(
+    lat: float, lng: float, zoom: int, scale: int, width: int, height: int
+) -> Tuple[float, float]:
+    """Top-left world pixel of a width x height image centered on lat/lng."""
+    center_x, center_y = latlon_to_world_pixel(lat, lng, zoom, scale)
+    return center_x - width / 2, center_y - height / 2
+
+
+def _parse_size(size: str, scale: int) -> Tuple[int, int]:
+    width, height = (int(v) * scale for v in size.split("x"))
+    return width, height
+
+
+class ImageryProvider:
+    """
+    Source of satellite imagery for the detection and colour stages.
+
+    Implementations return the width x height BGR crop centered on lat/lng
+    at zoom/scale, with the same geometry as Static Maps and pixel_to_geo
+    (top-left = center - size / 2 in world pixels), so masks and pixel/geo
+    conversions are identical whichever provider is used.
+    """
+
+    name = "base"
+
+    def get_image(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int = 20,
+        width: int = 1280,
+        height: int = 1280,
+        scale: int = 2,
+    ) -> np.ndarray:
+        raise NotImplementedError
+
+    def get_satellite_image(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int = 20,
+        size: str = "640x640",
+        scale: int = 2,
+    ) -> bytes:
+        """Same contract as GoogleMapsAPI.get_satellite_image (JPEG bytes)."""
+        width, height = _parse_size(size, scale)
+        image = self.get_image(lat, lng, zoom, width, height, scale)
+        ok, encoded = cv2.imencode(
+            ".jpg", image, [int(cv2.IMWRITE_JPEG_QUALITY), 95]
+        )
+        if not ok:
+            raise Exception(f"Error encoding {self.name} image")
+        return encoded.tobytes()
+
+    async def get_satellite_image_async(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int = 20,
+        size: str = "640x640",
+        scale: int = 2,
+    ) -> bytes:
+        """Async get_satellite_image (local providers run in a thread)."""
+        return await asyncio.to_thread(
+            self.get_satellite_image, lat, lng, zoom, size, scale
+        )
+
+
+class GoogleStaticMapsProvider(ImageryProvider):
+    """Google Maps Static API (through the GoogleMapsAPI disk cache)."""
+
+    name = "google"
+
+    def __init__(self, google_maps):
+        self.google_maps = google_maps
+
+    def get_image(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int = 20,
+        width: int = 1280,
+        height: int = 1280,
+        scale: int = 2,
+    ) -> np.ndarray:
+        content = self.get_satellite_image(
+            lat, lng, zoom, f"{width // scale}x{height // scale}", scale
+        )
+        image = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise Exception("Error decoding Static Maps image")
+        return image
+
+    def get_satellite_image(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int = 20,
+        size: str = "640x640",
+        scale: int = 2,
+    ) -> bytes:
+        return self.google_maps.get_satellite_image(
+            lat=lat, lng=lng, zoom=zoom, size=size, scale=scale
+        )
+
+    async def get_satellite_image_async(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int = 20,
+        size: str = "640x640",
+        scale: int = 2,
+    ) -> bytes:
+        return await self.google_maps.get_satellite_image_async(
+            lat=lat, lng=lng, zoom=zoom, size=size, scale=scale
+        )
+
+
+class MBTilesProvider(ImageryProvider):
+    """
+    Offline imagery from an MBTiles file (SQLite, XYZ tiles in TMS row order).
+
+    The crop is read at the MBTiles zoom whose ground resolution matches the
+    requested zoom/scale (e.g. zoom 20 @ scale 2 = zoom 21 with 256 px
+    tiles); when that level is not in the file the closest level is used
+    and the crop is resampled.
+    """
+
+    name = "mbtiles"
+
+    def __init__(self, path: str, cache_tiles: int = 256):
+        if not os.path.exists(path):
+            raise ValueError(f"MBTiles file not found: {path}")
+        self.path = path
+        self._conn = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._tiles: "OrderedDict[tuple, Optional[np.ndarray]]" = OrderedDict()
+        self.cache_tiles = cache_tiles
+        with self._lock:
+            self.zooms = sorted(
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT DISTINCT zoom_level FROM tiles"
+                )
+            )
+            row = self._conn.execute(
+                "SELECT tile_data FROM tiles LIMIT 1"
+            ).fetchone()
+        if not self.zooms or row is None:
+            raise ValueError(f"MBTiles file has no tiles: {path}")
+        sample = self._decode(row[0])
+        self.tile_size = sample.shape[0] if sample is not None else TILE_SIZE
+
+    @staticmethod
+    def _decode(data: bytes) -> Optional[np.ndarray]:
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+    def _tile(self, z: int, x: int, y: int) -> Optional[np.ndarray]:
+        key = (z, x, y)
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+            tms_row = (1 << z) - 1 - y
+            row = self._conn.execute(
+                "SELECT tile_data FROM tiles "
+                "WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                (z, x, tms_row),
+            ).fetchone()
+            tile = self._decode(row[0]) if row else None
+            self._tiles[key] = tile
+            while len(self._tiles) > self.cache_tiles:
+                self._tiles.popitem(last=False)
+            return tile
+
+    def _source_zoom(self, zoom: int, scale: int) -> int:
+        target = zoom + math.log2(TILE_SIZE * scale / self.tile_size)
+        higher = [z for z in self.zooms if z >= target]
+        return min(higher) if higher else max(self.zooms)
+
+    def get_image(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int = 20,
+        width: int = 1280,
+        height: int = 1280,
+        scale: int = 2,
+    ) -> np.ndarray:
+        left, top = _window(lat, lng, zoom, scale, width, height)
+        source_zoom = self._source_zoom(zoom, scale)
+        # source pixels per requested pixel
+        factor = (self.tile_size * 2**source_zoom) / (
+            TILE_SIZE * 2**zoom * scale
+        )
+
+        src_left = int(math.floor(left * factor))
+        src_top = int(math.floor(top * factor))
+        src_w = int(math.ceil(width * factor))
+        src_h = int(math.ceil(height * factor))
+
+        canvas = np.zeros((src_h, src_w, 3), dtype=np.uint8)
+        ts = self.tile_size
+        found = 0
+        for y in range(src_top // ts, (src_top + src_h - 1) // ts + 1):
+            for x in range(src_left // ts, (src_left + src_w - 1) // ts + 1):
+                tile = self._tile(source_zoom, x, y)
+                if tile is None:
+                    continue
+                found += 1
+                x0 = max(src_left, x * ts)
+                y0 = max(src_top, y * ts)
+                x1 = min(src_left + src_w, (x + 1) * ts)
+                y1 = min(src_top + src_h, (y + 1) * ts)
+                canvas[y0 - src_top : y1 - src_top, x0 - src_left : x1 - src_left] = (
+                    tile[y0 - y * ts : y1 - y * ts, x0 - x * ts : x1 - x * ts]
+                )
+
+        if found == 0:
+            raise Exception(
+                f"No MBTiles coverage for {lat},{lng} at zoom {source_zoom}"
+            )
+        if (src_w, src_h) != (width, height):
+            canvas = cv2.resize(
+                canvas, (width, height), interpolation=cv2.INTER_LINEAR
+            )
+        return canvas
+
+
+class GeoTiffProvider(ImageryProvider):
+    """
+    Offline imagery from a GeoTIFF orthophoto (any CRS), read with rasterio.
+
+    The dataset is opened once and warped on the fly to Web Mercator
+    (EPSG:3857); each crop is a single windowed read resampled to the
+    requested size. Uncompressed files are memory-mapped by GDAL
+    (GTIFF_VIRTUAL_MEM_IO), so reads run at disk speed.
+    """
+
+    name = "geotiff"
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise ValueError(f"GeoTIFF file not found: {path}")
+        import rasterio
+        from rasterio.vrt import WarpedVRT
+
+        self.path = path
+        self._dataset = rasterio.open(path)
+        self._vrt = WarpedVRT(self._dataset, crs="EPSG:3857")
+        self._lock = threading.Lock()
+
+    def get_image(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int = 20,
+        width: int = 1280,
+        height: int = 1280,
+        scale: int = 2,
+    ) -> np.ndarray:
+        import rasterio
+        from rasterio.enums import Resampling
+        from rasterio.windows import Window, from_bounds
+
+        left, top = _window(lat, lng, zoom, scale, width, height)
+        map_size = TILE_SIZE * (2**zoom) * scale
+        meters_per_pixel = 2 * math.pi * EARTH_RADIUS / map_size
+        west = left * meters_per_pixel - math.pi * EARTH_RADIUS
+        north = math.pi * EARTH_RADIUS - top * meters_per_pixel
+        east = west + width * meters_per_pixel
+        south = north - height * meters_per_pixel
+
+        # WarpedVRT does not support boundless reads: read the part of the
+        # window inside the raster and pad the rest with zeros
+        window = from_bounds(west, south, east, north, self._vrt.transform)
+        col0 = max(window.col_off, 0)
+        row0 = max(window.row_off, 0)
+        col1 = min(window.col_off + window.width, self._vrt.width)
+        row1 = min(window.row_off + window.height, self._vrt.height)
+        scale_x = width / window.width
+        scale_y = height / window.height
+        x0 = int(round((col0 - window.col_off) * scale_x))
+        y0 = int(round((row0 - window.row_off) * scale_y))
+        x1 = int(round((col1 - window.col_off) * scale_x))
+        y1 = int(round((row1 - window.row_off) * scale_y))
+        if x1 <= x0 or y1 <= y0:
+            raise Exception(f"No GeoTIFF coverage for {lat},{lng}")
+
+        bands = np.zeros((3, height, width), dtype=self._vrt.dtypes[0])
+        # GDAL config is per thread: set it around each read
+        with self._lock, rasterio.Env(GTIFF_VIRTUAL_MEM_IO="IF_ENOUGH_RAM"):
+            bands[:, y0:y1, x0:x1] = self._vrt.read(
+                indexes=[1, 2, 3],
+                window=Window(col0, row0, col1 - col0, row1 - row0),
+                out_shape=(3, y1 - y0, x1 - x0),
+                resampling=Resampling.bilinear,
+            )
+
+        rgb = np.ascontiguousarray(bands.transpose(1, 2, 0))
+        if rgb.dtype != np.uint8:
+            rgb = cv2.normalize(rgb, None, 0, 255, cv2.NORM_MINMAX).astype(
+                np.uint8
+            )
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+
+    def close(self) -> None:
+        self._vrt.close()
+        self._dataset.close()
+
+
+_file_provider: Optional[ImageryProvider] = None
+_file_provider_lock = threading.Lock()
+
+
+def get_provider_name() -> str:
+    """
+    Provider selected in IMAGERY_PROVIDER. Defaults to "mosaic" when
+    SATELLITE_MOSAIC_ENABLED is set, otherwise "google".
+    """
+    default = (
+        "mosaic"
+        if os.getenv("SATELLITE_MOSAIC_ENABLED", "false").lower()
+        in ("1", "true", "yes")
+        else "google"
+    )
+    name = os.getenv("IMAGERY_PROVIDER", default).lower()
+    if name not in PROVIDERS:
+        raise ValueError(
+            f"Invalid IMAGERY_PROVIDER: {name} (options: {', '.join(PROVIDERS)})"
+        )
+    return name
+
+
+def get_imagery_provider(google_maps=None) -> ImageryProvider:
+    """
+    Return the configured imagery provider.
+
+    Environment:
+        IMAGERY_PROVIDER: google | mosaic | mbtiles | geotiff
+        IMAGERY_SOURCE_PATH: .mbtiles / GeoTIFF file for the offline providers
+    """
+    global _file_provider
+    name = get_provider_name()
+
+    if name in ("google", "mosaic"):
+        if google_maps is None:
+            from .google_maps import GoogleMapsAPI
+
+            google_maps = GoogleMapsAPI()
+        if name == "mosaic":
+            from .satellite_mosaic import get_satellite_mosaic
+
+            return get_satellite_mosaic(google_maps)
+        return GoogleStaticMapsProvider(google_maps)
+
+    with _file_provider_lock:
+        path = os.getenv("IMAGERY_SOURCE_PATH")
+        if not path:
+            raise ValueError("IMAGERY_SOURCE_PATH not found")
+        if (
+            _file_provider is None
+            or _file_provider.name != name
+            or _file_provider.path != path
+        ):
+            if name == "mbtiles":
+                _file_provider = MBTilesProvider(path)
+            else:
+                _file_provider = GeoTiffProvider(path)
+        return _file_provider
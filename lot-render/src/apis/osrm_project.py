@@ -1,5 +1,6 @@
 import os
-import requests
+
+from .http_client import http_get
 
 
 class OSRMProject:
@@ -16,7 +17,7 @@ class OSRMProject:
     ):
         url = f"{self.base_url}/route/v1/{by}/{origin_lon},{origin_lat};{destination_lon},{destination_lat}"
         params = {"steps": "true", "overview": "full"}
-        resp = requests.get(url, params=params)
+        resp = http_get(url, params=params, provider="osrm")
         if not resp.ok:
             return None
 
@@ -0,0 +1,430 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit is open"""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a call runs out of its per-call deadline"""
+
+
+def _env(name: str, provider: str, default: str) -> str:
+    """Provider override (NAME_PROVIDER) first, then NAME, then default"""
+    return os.getenv(f"{name}_{provider.upper()}", os.getenv(name, default))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail fast with CircuitOpenError for reset_timeout seconds; then a single
+    trial call is let through (half-open) and its outcome closes or re-opens
+    the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("circuit open")
+            if self._trial_in_flight:
+                raise CircuitOpenError("circuit half-open, trial in flight")
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Call abandoned without an outcome (e.g. cancelled)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies (seconds)"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(len(ordered) * q / 100), len(ordered) - 1)]
+
+
+class ResilientCaller:
+    """
+    Deadline, retries, hedging and circuit breaker for one external provider.
+
+    Each call gets a total deadline shared by all attempts. Failed attempts
+    (exceptions, or results flagged by is_failure such as HTTP 429/5xx) are
+    retried with full-jitter exponential backoff while the deadline allows.
+    With hedging on, when an attempt is still running after the provider's
+    p95 latency a duplicate is sent and the first answer wins; only use it
+    for idempotent calls. Sync hedged attempts run on the provider's own
+    hedge_max_threads threads and are never queued: without a free thread
+    the attempt runs (or keeps waiting) without a duplicate.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        deadline: float = 20,
+        max_retries: int = 3,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4,
+        hedge: bool = False,
+        hedge_min_delay: float = 0.2,
+        hedge_min_samples: int = 20,
+        hedge_max_threads: int = 4,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.provider = provider
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self._hedge_slots = threading.BoundedSemaphore(hedge_max_threads)
+        self._hedge_executor = (
+            ThreadPoolExecutor(
+                max_workers=hedge_max_threads,
+                thread_name_prefix=f"hedge-{provider}",
+            )
+            if hedge
+            else None
+        )
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedges_skipped = 0
+        self.failures = 0
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2**attempt)
+        )
+
+    def _hedge_delay(self, remaining: float) -> Optional[float]:
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        delay = max(self.hedge_min_delay, self.latency.percentile(95))
+        return delay if delay < remaining else None
+
+    def _submit_hedged(self, fn: Callable[[float], T], timeout: float):
+        """Run fn on a free hedge thread; None when every thread is busy"""
+        if not self._hedge_slots.acquire(blocking=False):
+            return None
+        try:
+            future = self._hedge_executor.submit(fn, timeout)
+        except BaseException:
+            self._hedge_slots.release()
+            raise
+        # The slot is held until fn returns, even after losing the race
+        future.add_done_callback(lambda _: self._hedge_slots.release())
+        return future
+
+    def _attempt(self, fn: Callable[[float], T], remaining: float) -> T:
+        delay = self._hedge_delay(remaining)
+        primary = (
+            self._submit_hedged(fn, remaining) if delay is not None else None
+        )
+        if primary is None:
+            if delay is not None:
+                self.hedges_skipped += 1
+            return fn(remaining)
+
+        futures = [primary]
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            hedge = self._submit_hedged(fn, remaining - delay)
+            if hedge is None:
+                self.hedges_skipped += 1
+            else:
+                self.hedges += 1
+                futures.append(hedge)
+
+        deadline = time.monotonic() + remaining - delay
+        error: Optional[BaseException] = None
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(
+                    pending,
+                    timeout=max(deadline - time.monotonic(), 0),
+                    return_when=FIRST_COMPLETED,
+                )
+                if not done:
+                    break
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    error = future.exception()
+            raise error or DeadlineExceeded(
+                f"{self.provider}: deadline exceeded"
+            )
+        finally:
+            # Running losers cannot be interrupted; they end at their own
+            # timeout and only then free their thread
+            for future in futures:
+                future.cancel()
+
+    def call(
+        self,
+        fn: Callable[[float], T],
+        is_failure: Optional[Callable[[T], bool]] = None,
+    ) -> T:
+        """
+        Run fn(timeout_seconds) under the policy. Returns the first good
+        result, or the last result flagged by is_failure once retries are
+        exhausted; raises the last error (or CircuitOpenError /
+        DeadlineExceeded) otherwise.
+        """
+        self.calls += 1
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"{self.provider}: deadline exceeded")
+            self.breaker.before_call()
+
+            started = time.monotonic()
+            result, error = None, None
+            try:
+                result = self._attempt(fn, remaining)
+            except Exception as e:
+                error = e
+            except BaseException:
+                self.breaker.release()
+                raise
+            if error is None and not (is_failure and is_failure(result)):
+                self.latency.record(time.monotonic() - started)
+                self.breaker.record_success()
+                return result
+
+            self.breaker.record_failure()
+            self.failures += 1
+            sleep = self._backoff(attempt)
+            attempt += 1
+            if (
+                attempt > self.max_retries
+                or time.monotonic() + sleep >= deadline
+            ):
+                if error is not None:
+                    raise error
+                return result
+
+            print(
+                f"{self.provider}: attempt {attempt} failed "
+                f"({error or 'retryable response'}), retrying in {sleep:.2f}s"
+            )
+            self.retries += 1
+            time.sleep(sleep)
+
+    async def _attempt_async(
+        self, fn: Callable[[float], Awaitable[T]], remaining: float
+    ) -> T:
+        delay = self._hedge_delay(remaining)
+        if delay is None:
+            return await asyncio.wait_for(fn(remaining), remaining)
+
+        tasks = [asyncio.ensure_future(fn(remaining))]
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            self.hedges += 1
+            tasks.append(asyncio.ensure_future(fn(remaining - delay)))
+
+        deadline = time.monotonic() + remaining - delay
+        error: Optional[BaseException] = None
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(deadline - time.monotonic(), 0),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error or DeadlineExceeded(
+                f"{self.provider}: deadline exceeded"
+            )
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def call_async(
+        self,
+        fn: Callable[[float], Awaitable[T]],
+        is_failure: Optional[Callable[[T], bool]] = None,
+    ) -> T:
+        """Async counterpart of call(); fn(timeout_seconds) is a coroutine"""
+        self.calls += 1
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded(f"{self.provider}: deadline exceeded")
+            self.breaker.before_call()
+
+            started = time.monotonic()
+            result, error = None, None
+            try:
+                result = await self._attempt_async(fn, remaining)
+            except asyncio.TimeoutError:
+                error = DeadlineExceeded(f"{self.provider}: deadline exceeded")
+            except Exception as e:
+                error = e
+            except BaseException:
+                self.breaker.release()
+                raise
+            if error is None and not (is_failure and is_failure(result)):
+                self.latency.record(time.monotonic() - started)
+                self.breaker.record_success()
+                return result
+
+            self.breaker.record_failure()
+            self.failures += 1
+            sleep = self._backoff(attempt)
+            attempt += 1
+            if (
+                attempt > self.max_retries
+                or time.monotonic() + sleep >= deadline
+            ):
+                if error is not None:
+                    raise error
+                return result
+
+            print(
+                f"{self.provider}: attempt {attempt} failed "
+                f"({error or 'retryable response'}), retrying in {sleep:.2f}s"
+            )
+            self.retries += 1
+            await asyncio.sleep(sleep)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "circuit": self.breaker.state,
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedges_skipped": self.hedges_skipped,
+            "failures": self.failures,
+            "p95_seconds": self.latency.percentile(95),
+        }
+
+
+_callers: Dict[str, ResilientCaller] = {}
+_callers_lock = threading.Lock()
+
+
+def get_resilient_caller(provider: str) -> ResilientCaller:
+    """
+    Return the process-wide policy for a provider (e.g. google_static_maps,
+    google_elevation, google_places, google_roads, osrm).
+
+    Environment (each can be overridden per provider with a _<PROVIDER>
+    suffix, e.g. HTTP_DEADLINE_SECONDS_OSRM):
+        HTTP_DEADLINE_SECONDS: total deadline per call, retries included (default: 20)
+        HTTP_MAX_RETRIES: retries after the first attempt (default: 3)
+        HTTP_BACKOFF_BASE_SECONDS: first backoff cap, doubled per retry (default: 0.25)
+        HTTP_BACKOFF_MAX_SECONDS: backoff cap (default: 4)
+        HTTP_HEDGE_ENABLED: send a duplicate request after the p95 latency (default: false)
+        HTTP_HEDGE_MIN_DELAY_SECONDS: lower bound for the hedge delay (default: 0.2)
+        HTTP_HEDGE_MAX_THREADS: threads for sync hedged attempts (default: 4)
+        CIRCUIT_FAILURE_THRESHOLD: consecutive failures that open the circuit (default: 5)
+        CIRCUIT_RESET_SECONDS: time before a trial call is allowed (default: 30)
+    """
+    with _callers_lock:
+        caller = _callers.get(provider)
+        if caller is None:
+            caller = ResilientCaller(
+                provider,
+                deadline=float(_env("HTTP_DEADLINE_SECONDS", provider, "20")),
+                max_retries=int(_env("HTTP_MAX_RETRIES", provider, "3")),
+                backoff_base=float(
+                    _env("HTTP_BACKOFF_BASE_SECONDS", provider, "0.25")
+                ),
+                backoff_max=float(
+                    _env("HTTP_BACKOFF_MAX_SECONDS", provider, "4")
+                ),
+                hedge=_env("HTTP_HEDGE_ENABLED", provider, "false").lower()
+                in ("1", "true", "yes"),
+                hedge_min_delay=float(
+                    _env("HTTP_HEDGE_MIN_DELAY_SECONDS", provider, "0.2")
+                ),
+                hedge_max_threads=int(
+                    _env("HTTP_HEDGE_MAX_THREADS", provider, "4")
+                ),
+                breaker=CircuitBreaker(
+                    failure_threshold=int(
+                        _env("CIRCUIT_FAILURE_THRESHOLD", provider, "5")
+                    ),
+                    reset_timeout=float(
+                        _env("CIRCUIT_RESET_SECONDS", provider, "30")
+                    ),
+                ),
+            )
+            _callers[provider] = caller
+        return caller
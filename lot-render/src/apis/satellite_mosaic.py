@@ -0,0 +1,225 @@
+import math
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ..modules.pixel_to_geo import latlon_to_world_pixel, world_pixel_to_latlon
+from .imagery_cache import ImageryDiskCache, get_imagery_cache
+from .imagery_providers import ImageryProvider
+
+
+class SatelliteMosaic(ImageryProvider):
+    """
+    Web Mercator tile-grid mosaic built from Static Maps images.
+
+    The world pixel plane (at a given zoom/scale) is split into square,
+    grid-aligned tiles of tile_size pixels. Each tile is fetched once as a
+    Static Maps image centered on the tile, from which the central
+    tile_size x tile_size window is kept (dropping the Google logo and
+    attribution at the borders), and stored losslessly in the imagery disk
+    cache. Any center/size crop is assembled from the cached tiles, fetching
+    only the missing ones, so neighbouring lots on the same block share the
+    same pixels.
+    """
+
+    name = "mosaic"
+
+    def __init__(
+        self,
+        google_maps,
+        disk_cache: Optional[ImageryDiskCache] = None,
+        tile_size: int = 1024,
+        fetch_size: int = 1280,
+        memory_tiles: int = 32,
+        max_workers: int = 4,
+    ):
+        if tile_size > fetch_size:
+            raise ValueError("tile_size must not exceed fetch_size")
+        self.google_maps = google_maps
+        self.disk_cache = disk_cache
+        self.tile_size = tile_size
+        self.fetch_size = fetch_size
+        self.memory_tiles = memory_tiles
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._tiles: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        # tiles being fetched by another thread -> Event
+        self._inflight: Dict[tuple, threading.Event] = {}
+        self.tiles_fetched = 0
+
+    def _tile_cache_key(self, tile: tuple) -> str:
+        zoom, scale, maptype, col, row = tile
+        return ImageryDiskCache.make_key(
+            kind="mosaic_tile",
+            zoom=zoom,
+            scale=scale,
+            maptype=maptype,
+            col=col,
+            row=row,
+            tile_size=self.tile_size,
+        )
+
+    def _remember(self, tile: tuple, image: np.ndarray) -> None:
+        with self._lock:
+            self._tiles[tile] = image
+            self._tiles.move_to_end(tile)
+            while len(self._tiles) > self.memory_tiles:
+                self._tiles.popitem(last=False)
+
+    def _fetch_tile(self, tile: tuple) -> np.ndarray:
+        zoom, scale, maptype, col, row = tile
+        # Static Maps places the requested center at (size/2, size/2)
+        center_x = (col + 0.5) * self.tile_size
+        center_y = (row + 0.5) * self.tile_size
+        lat, lng = world_pixel_to_latlon(center_x, center_y, zoom, scale)
+
+        content = self.google_maps.fetch_static_map(
+            lat=lat,
+            lng=lng,
+            zoom=zoom,
+            size=f"{self.fetch_size // scale}x{self.fetch_size // scale}",
+            scale=scale,
+            maptype=maptype,
+        )
+        image = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+        if image is None or image.shape[0] < self.fetch_size:
+            raise Exception(f"Invalid Static Maps image for tile {tile}")
+
+        margin = (self.fetch_size - self.tile_size) // 2
+        tile_image = image[
+            margin : margin + self.tile_size, margin : margin + self.tile_size
+        ].copy()
+        self.tiles_fetched += 1
+        return tile_image
+
+    def get_tile(
+        self, col: int, row: int, zoom: int, scale: int, maptype: str = "satellite"
+    ) -> np.ndarray:
+        """Return one tile (BGR), from memory, disk or Static Maps."""
+        tile = (zoom, scale, maptype, col, row)
+        while True:
+            with self._lock:
+                image = self._tiles.get(tile)
+                if image is not None:
+                    self._tiles.move_to_end(tile)
+                    return image
+                event = self._inflight.get(tile)
+                if event is None:
+                    event = self._inflight[tile] = threading.Event()
+                    break
+            # Another thread is fetching this tile
+            event.wait()
+
+        try:
+            key = self._tile_cache_key(tile)
+            content = self.disk_cache.get(key) if self.disk_cache else None
+            image = None
+            if content is not None:
+                image = cv2.imdecode(
+                    np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR
+                )
+            if image is None:
+                image = self._fetch_tile(tile)
+                if self.disk_cache:
+                    ok, encoded = cv2.imencode(".png", image)
+                    if ok:
+                        self.disk_cache.put(key, encoded.tobytes())
+            self._remember(tile, image)
+            return image
+        finally:
+            with self._lock:
+                self._inflight.pop(tile, None)
+            event.set()
+
+    def get_image(
+        self,
+        lat: float,
+        lng: float,
+        zoom: int = 20,
+        width: int = 1280,
+        height: int = 1280,
+        scale: int = 2,
+        maptype: str = "satellite",
+    ) -> np.ndarray:
+        """
+        Assemble the width x height crop (BGR) centered on lat/lng, using the
+        same geometry as pixel_to_geo (top-left = center - size / 2).
+        """
+        center_x, center_y = latlon_to_world_pixel(lat, lng, zoom, scale)
+        left = int(round(center_x - width / 2))
+        top = int(round(center_y - height / 2))
+
+        col_range = range(
+            math.floor(left / self.tile_size),
+            math.floor((left + width - 1) / self.tile_size) + 1,
+        )
+        row_range = range(
+            math.floor(top / self.tile_size),
+            math.floor((top + height - 1) / self.tile_size) + 1,
+        )
+        tiles = [(col, row) for row in row_range for col in col_range]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            images = list(
+                executor.map(
+                    lambda t: self.get_tile(t[0], t[1], zoom, scale, maptype),
+                    tiles,
+                )
+            )
+
+        canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        for (col, row), tile_image in zip(tiles, images):
+            tile_left = col * self.tile_size
+            tile_top = row * self.tile_size
+            # Intersection of the tile with the requested window
+            x0 = max(left, tile_left)
+            y0 = max(top, tile_top)
+            x1 = min(left + width, tile_left + self.tile_size)
+            y1 = min(top + height, tile_top + self.tile_size)
+            canvas[y0 - top : y1 - top, x0 - left : x1 - left] = tile_image[
+                y0 - tile_top : y1 - tile_top, x0 - tile_left : x1 - tile_left
+            ]
+        return canvas
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "memory_tiles": len(self._tiles),
+                "tiles_fetched": self.tiles_fetched,
+            }
+
+
+_mosaic: Optional[SatelliteMosaic] = None
+_mosaic_lock = threading.Lock()
+
+
+def get_satellite_mosaic(google_maps=None) -> SatelliteMosaic:
+    """
+    Return the process-wide satellite mosaic (selected with
+    IMAGERY_PROVIDER=mosaic, see imagery_providers).
+
+    Environment:
+        SATELLITE_MOSAIC_TILE_SIZE: tile size in pixels (default: 1024)
+        SATELLITE_MOSAIC_MEMORY_TILES: decoded tiles kept in memory (default: 32)
+    """
+    global _mosaic
+    with _mosaic_lock:
+        if _mosaic is None:
+            if google_maps is None:
+                from .google_maps import GoogleMapsAPI
+
+                google_maps = GoogleMapsAPI()
+            _mosaic = SatelliteMosaic(
+                google_maps,
+                disk_cache=get_imagery_cache(),
+                tile_size=int(os.getenv("SATELLITE_MOSAIC_TILE_SIZE", "1024")),
+                memory_tiles=int(
+                    os.getenv("SATELLITE_MOSAIC_MEMORY_TILES", "32")
+                ),
+            )
+        return _mosaic
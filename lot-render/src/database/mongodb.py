@@ -1,8 +1,9 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
-from datetime import datetime
-from typing import Dict, Any
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
 from bson import ObjectId
+from shapely.geometry import Polygon
 
 
 class MongoDB:
@@ -10,6 +11,7 @@ class MongoDB:
         connection_string = os.getenv("MONGO_CONNECTION_STRING")
         db_name = os.getenv("MONGO_DB_NAME", "gethome-01-hmg")
         self.collection_name = "lots_detections_details_hmg"
+        self.candidates_collection_name = "lots_detections_candidates_hmg"
 
         if not connection_string:
             raise ValueError(
@@ -19,6 +21,8 @@ class MongoDB:
         self.client = AsyncIOMotorClient(connection_string)
         self.db = self.client[db_name]
         self.collection = self.db[self.collection_name]
+        self.candidates_collection = self.db[self.candidates_collection_name]
+        self._candidate_indexes_ready = False
 
     async def insert_detection(self, detection_data: Dict[str, Any]) -> str:
         """Insert initial detection data and return the document ID"""
@@ -38,3 +42,116 @@ class MongoDB:
     async def get_detection(self, doc_id: str) -> Dict[str, Any]:
         """Retrieve detection document"""
         return await self.collection.find_one({"_id": ObjectId(doc_id)})
+
+    async def _ensure_candidate_indexes(self):
+        """Create the geospatial index used to look up candidates by point"""
+        if self._candidate_indexes_ready:
+            return
+        await self.candidates_collection.create_index(
+            [("geometry", "2dsphere")]
+        )
+        await self.candidates_collection.create_index("created_at")
+        self._candidate_indexes_ready = True
+
+    @staticmethod
+    def _candidate_geometry(
+        geo_points: List[List[float]],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Convert [lat, lon] points to a valid GeoJSON Polygon ([lon, lat],
+        closed ring). Self-intersecting masks are repaired; returns None if
+        no polygon is left.
+        """
+        polygon = Polygon([(lon, lat) for lat, lon in geo_points])
+        if not polygon.is_valid:
+            polygon = polygon.buffer(0)
+            if polygon.geom_type == "MultiPolygon":
+                polygon = max(polygon.geoms, key=lambda geom: geom.area)
+        if polygon.is_empty or polygon.geom_type != "Polygon":
+            return None
+        return {
+            "type": "Polygon",
+            "coordinates": [[list(coord) for coord in polygon.exterior.coords]],
+        }
+
+    async def insert_candidate_detections(
+        self,
+        source_doc_id: str,
+        image_center: Dict[str, float],
+        image_info: Dict[str, Any],
+        candidates: List[Dict[str, Any]],
+    ) -> List[str]:
+        """
+        Store the neighbouring lots found in a detection image so later
+        requests inside them can be served without new imagery/inference.
+        """
+        await self._ensure_candidate_indexes()
+        now = datetime.utcnow()
+        docs = []
+        for candidate in candidates:
+            geometry = self._candidate_geometry(candidate["geo_points"])
+            if geometry is None:
+                continue
+            docs.append(
+                {
+                    "source_doc_id": source_doc_id,
+                    "image_center": image_center,
+                    "image_info": image_info,
+                    "mask_points": candidate["polygon"],
+                    "geo_points": candidate["geo_points"],
+                    "class_id": candidate["class_id"],
+                    "confidence": candidate["confidence"],
+                    "geometry": geometry,
+                    "served_doc_ids": [],
+                    "created_at": now,
+                }
+            )
+        if not docs:
+            return []
+        result = await self.candidates_collection.insert_many(docs)
+        return [str(inserted_id) for inserted_id in result.inserted_ids]
+
+    async def find_candidate_detection(
+        self,
+        latitude: float,
+        longitude: float,
+        zoom: int,
+        year: str,
+        max_age_days: Optional[float] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Find the most confident stored candidate lot containing the point"""
+        await self._ensure_candidate_indexes()
+        query = {
+            "geometry": {
+                "$geoIntersects": {
+                    "$geometry": {
+                        "type": "Point",
+                        "coordinates": [longitude, latitude],
+                    }
+                }
+            },
+            "image_info.zoom": zoom,
+            "image_info.year": year,
+        }
+        if max_age_days is not None:
+            query["created_at"] = {
+                "$gte": datetime.utcnow() - timedelta(days=max_age_days)
+            }
+        cursor = (
+            self.candidates_collection.find(query)
+            .sort("confidence", -1)
+            .limit(1)
+        )
+        async for candidate in cursor:
+            return candidate
+        return None
+
+    async def mark_candidate_served(
+        self, candidate_id: str, doc_id: str
+    ) -> bool:
+        """Record that a detection document was created from a candidate"""
+        result = await self.candidates_collection.update_one(
+            {"_id": ObjectId(candidate_id)},
+            {"$push": {"served_doc_ids": doc_id}},
+        )
+        return result.modified_count > 0
@@ -0,0 +1,373 @@
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+GCS_URL_PREFIX = "https://storage.cloud.google.com/"
+LOCAL_URL_PREFIX = "file://"
+# Failed background uploads remembered for upload_error()
+MAX_RECORDED_ERRORS = 1000
+
+
+class GCSBackend:
+    """Google Cloud Storage with a single client shared by the whole process"""
+
+    name = "gcs"
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from google.cloud import storage
+
+                self._client = storage.Client()
+            return self._client
+
+    def url_for(self, bucket: str, path: str) -> str:
+        return f"{GCS_URL_PREFIX}{bucket}/{path}"
+
+    def upload(
+        self, bucket: str, path: str, data: bytes, content_type: Optional[str]
+    ) -> None:
+        blob = self.client.bucket(bucket).blob(path)
+        blob.upload_from_string(data, content_type=content_type)
+
+    def download(self, bucket: str, path: str) -> bytes:
+        return self.client.bucket(bucket).blob(path).download_as_bytes()
+
+    def copy(self, bucket: str, source_path: str, target_path: str) -> None:
+        source_bucket = self.client.bucket(bucket)
+        source_bucket.copy_blob(
+            source_bucket.blob(source_path), source_bucket, target_path
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+class LocalBackend:
+    """
+    Local filesystem backend (<root>/<bucket>/<path>), used to run and
+    benchmark the pipeline without GCS.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _file(self, bucket: str, path: str) -> str:
+        return os.path.join(self.root, bucket, path)
+
+    def url_for(self, bucket: str, path: str) -> str:
+        return f"{LOCAL_URL_PREFIX}{self._file(bucket, path)}"
+
+    def upload(
+        self, bucket: str, path: str, data: bytes, content_type: Optional[str]
+    ) -> None:
+        target = self._file(bucket, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(target), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, target)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def download(self, bucket: str, path: str) -> bytes:
+        with open(self._file(bucket, path), "rb") as f:
+            return f.read()
+
+    def copy(self, bucket: str, source_path: str, target_path: str) -> None:
+        self.upload(bucket, target_path, self.download(bucket, source_path), None)
+
+    def close(self) -> None:
+        pass
+
+
+class ObjectStorage:
+    """
+    Object storage used by the pipeline (satellite images, site images, CSV
+    and GLB files).
+
+    Uploads are sent straight from memory. With background uploads enabled,
+    upload() returns the final URL immediately and the write runs on a
+    bounded thread pool; at most max_pending uploads are queued, after which
+    upload() blocks (backpressure). Reads and copies of an object that is
+    still being uploaded are served from / wait for the pending buffer, so
+    later stages of the same pipeline always see their own writes.
+    """
+
+    def __init__(
+        self,
+        backend,
+        background: bool = True,
+        max_workers: int = 4,
+        max_pending: int = 64,
+        retries: int = 3,
+    ):
+        self.backend = backend
+        self.background = background
+        self.retries = retries
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="storage-upload"
+        )
+        self._slots = threading.BoundedSemaphore(max(int(max_pending), 1))
+        self._lock = threading.Lock()
+        # (bucket, path) -> (data, future)
+        self._pending: Dict[Tuple[str, str], Tuple[bytes, Future]] = {}
+        # (bucket, path) -> error of the last background upload, if it failed
+        self._errors: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self.uploaded = 0
+        self.failed = 0
+
+    def parse_url(self, url: str) -> Tuple[str, str]:
+        """Split a storage URL (GCS or local) into (bucket, path)"""
+        if url.startswith(GCS_URL_PREFIX):
+            bucket, _, path = url[len(GCS_URL_PREFIX) :].partition("/")
+            return bucket, path
+        if url.startswith(LOCAL_URL_PREFIX) and isinstance(
+            self.backend, LocalBackend
+        ):
+            relative = os.path.relpath(
+                url[len(LOCAL_URL_PREFIX) :], self.backend.root
+            )
+            bucket, _, path = relative.partition(os.sep)
+            return bucket, path.replace(os.sep, "/")
+        if url.startswith("gs://"):
+            bucket, _, path = url[len("gs://") :].partition("/")
+            return bucket, path
+        bucket, _, path = url.partition("/")
+        return bucket, path
+
+    def _upload_with_retries(
+        self, bucket: str, path: str, data: bytes, content_type: Optional[str]
+    ) -> None:
+        for attempt in range(self.retries):
+            try:
+                self.backend.upload(bucket, path, data, content_type)
+                return
+            except Exception as e:
+                if attempt == self.retries - 1:
+                    raise
+                print(
+                    f"Upload failed for {bucket}/{path} "
+                    f"(attempt {attempt + 1}): {str(e)}"
+                )
+                time.sleep(0.5 * 2**attempt)
+
+    def _run_upload(
+        self,
+        key: Tuple[str, str],
+        data: bytes,
+        content_type: Optional[str],
+        previous: Optional[Future],
+    ) -> None:
+        try:
+            # Uploads to the same object are applied in submission order
+            if previous is not None:
+                try:
+                    previous.result()
+                except Exception:
+                    pass
+            self._upload_with_retries(key[0], key[1], data, content_type)
+            with self._lock:
+                self.uploaded += 1
+                self._errors.pop(key, None)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+                self._errors[key] = str(e)
+                self._errors.move_to_end(key)
+                while len(self._errors) > MAX_RECORDED_ERRORS:
+                    self._errors.popitem(last=False)
+            print(f"Error uploading {key[0]}/{key[1]}: {str(e)}")
+            raise
+        finally:
+            with self._lock:
+                entry = self._pending.get(key)
+                if entry is not None and entry[0] is data:
+                    del self._pending[key]
+            self._slots.release()
+
+    def upload(
+        self,
+        bucket: str,
+        path: str,
+        data: bytes,
+        content_type: Optional[str] = None,
+        wait: bool = False,
+    ) -> str:
+        """Upload data and return its URL (immediately unless wait=True)"""
+        if not self.background or wait:
+            self.wait_for(bucket, path)
+            self._upload_with_retries(bucket, path, data, content_type)
+            with self._lock:
+                self.uploaded += 1
+            return self.backend.url_for(bucket, path)
+
+        key = (bucket, path)
+        self._slots.acquire()
+        try:
+            with self._lock:
+                entry = self._pending.get(key)
+                future = self._executor.submit(
+                    self._run_upload,
+                    key,
+                    data,
+                    content_type,
+                    entry[1] if entry is not None else None,
+                )
+                self._pending[key] = (data, future)
+        except BaseException:
+            self._slots.release()
+            raise
+        return self.backend.url_for(bucket, path)
+
+    def upload_error(self, bucket: str, path: str) -> Optional[str]:
+        """
+        Error of the last background upload of bucket/path, or None if it
+        succeeded (or was never uploaded in the background). Waits for a
+        pending upload first.
+        """
+        self.wait_for(bucket, path)
+        with self._lock:
+            return self._errors.get((bucket, path))
+
+    def upload_error_for_url(self, url: str) -> Optional[str]:
+        bucket, path = self.parse_url(url)
+        return self.upload_error(bucket, path)
+
+    def wait_for(self, bucket: str, path: str) -> None:
+        """Wait until a pending upload of bucket/path (if any) is finished"""
+        with self._lock:
+            entry = self._pending.get((bucket, path))
+        if entry is not None:
+            try:
+                entry[1].result()
+            except Exception:
+                pass
+
+    def download(self, bucket: str, path: str) -> bytes:
+        with self._lock:
+            entry = self._pending.get((bucket, path))
+        if entry is not None:
+            return entry[0]
+        return self.backend.download(bucket, path)
+
+    def download_url(self, url: str) -> bytes:
+        bucket, path = self.parse_url(url)
+        return self.download(bucket, path)
+
+    def copy(self, bucket: str, source_path: str, target_path: str) -> None:
+        self.wait_for(bucket, source_path)
+        self.wait_for(bucket, target_path)
+        self.backend.copy(bucket, source_path, target_path)
+
+    def url_for(self, bucket: str, path: str) -> str:
+        return self.backend.url_for(bucket, path)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every pending upload; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                futures = [future for _, future in self._pending.values()]
+            if not futures:
+                return True
+            for future in futures:
+                remaining = (
+                    None if deadline is None else deadline - time.monotonic()
+                )
+                if remaining is not None and remaining <= 0:
+                    return False
+                try:
+                    future.result(timeout=remaining)
+                except Exception:
+                    pass
+
+    def close(self) -> None:
+        self.flush()
+        self._executor.shutdown(wait=True)
+        self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self.backend.name,
+                "background": self.background,
+                "pending": len(self._pending),
+                "uploaded": self.uploaded,
+                "failed": self.failed,
+                "failed_objects": [
+                    f"{bucket}/{path}" for bucket, path in self._errors
+                ],
+            }
+
+
+_storage: Optional[ObjectStorage] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> ObjectStorage:
+    """
+    Return the process-wide object storage.
+
+    Environment:
+        STORAGE_BACKEND: gcs | local (default: gcs)
+        STORAGE_LOCAL_DIR: root directory of the local backend
+            (default: <tmp>/lot_render_storage)
+        STORAGE_BACKGROUND_UPLOADS: upload on a background pool (default: true)
+        STORAGE_UPLOAD_WORKERS: concurrent uploads (default: 4)
+        STORAGE_MAX_PENDING_UPLOADS: queued uploads before upload() blocks
+            (default: 64)
+    """
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            backend_name = os.getenv("STORAGE_BACKEND", "gcs").lower()
+            if backend_name == "local":
+                backend = LocalBackend(
+                    os.getenv(
+                        "STORAGE_LOCAL_DIR",
+                        os.path.join(tempfile.gettempdir(), "lot_render_storage"),
+                    )
+                )
+            elif backend_name == "gcs":
+                backend = GCSBackend()
+            else:
+                raise ValueError(f"Invalid STORAGE_BACKEND: {backend_name}")
+
+            _storage = ObjectStorage(
+                backend,
+                background=os.getenv("STORAGE_BACKGROUND_UPLOADS", "true").lower()
+                in ("1", "true", "yes"),
+                max_workers=int(os.getenv("STORAGE_UPLOAD_WORKERS", "4")),
+                max_pending=int(os.getenv("STORAGE_MAX_PENDING_UPLOADS", "64")),
+            )
+        return _storage
+
+
+def close_storage() -> None:
+    """Flush pending uploads and release the storage client"""
+    global _storage
+    with _storage_lock:
+        if _storage is not None:
+            _storage.close()
+            _storage = None
@@ -4,7 +4,16 @@ from .routers import lots
 from fastapi.responses import JSONResponse
 from fastapi.security.api_key import APIKeyHeader
 from starlette.status import HTTP_403_FORBIDDEN
+import asyncio
 import os
+from typing import Any, Dict
+
+from .modules.model_registry import model_registry
+from .modules.inference_pool import get_inference_pool
+from .modules.detection import stop_inference_workers
+from .database.storage import close_storage
+from .apis.http_client import close_http_clients
+from .apis.elevation_fetcher import close_elevation_fetcher
 
 
 API_KEY = os.getenv("API_KEY")
@@ -66,7 +75,73 @@ api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
 app.include_router(lots.router, prefix="/lots")
 
 
+@app.on_event("startup")
+async def load_detection_model():
+    """Load and warm up the YOLO model in the background at startup"""
+    model_path = os.getenv("YOLO_MODEL_PATH")
+    if not model_path:
+        print("YOLO_MODEL_PATH not set, skipping model preload")
+        return
+
+    loop = asyncio.get_running_loop()
+    pool = get_inference_pool(model_path)
+    if pool:
+        # Each pool process loads and warms its own copy of the model
+        loop.run_in_executor(None, pool.warmup)
+        return
+
+    model_registry.default_path = os.path.abspath(model_path)
+    loop.run_in_executor(None, model_registry.load, model_path)
+
+
+def detection_status() -> Dict[str, Any]:
+    """Readiness of the detection model (process pool or in-process registry)"""
+    try:
+        pool = get_inference_pool()
+    except ValueError as e:
+        return {"ready": False, "error": str(e)}
+    if pool:
+        return {"ready": pool.is_ready(), "pool": pool.status()}
+    return {"ready": model_registry.is_ready(), "model": model_registry.status()}
+
+
+@app.on_event("shutdown")
+async def stop_detection_workers():
+    """Stop the micro-batching inference workers and the process pool"""
+    await asyncio.to_thread(stop_inference_workers)
+
+
+@app.on_event("shutdown")
+async def flush_storage_uploads():
+    """Wait for pending background uploads before the process exits"""
+    await asyncio.to_thread(close_storage)
+
+
+@app.on_event("shutdown")
+async def close_http_sessions():
+    """Close the pooled HTTP sessions used for the external APIs"""
+    await close_http_clients()
+
+
+@app.on_event("shutdown")
+async def stop_elevation_fetcher():
+    """Stop the background loop of the elevation fetcher"""
+    await asyncio.to_thread(close_elevation_fetcher)
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: succeeds once the detection model is loaded and warm"""
+    detection = detection_status()
+    if detection["ready"]:
+        return {"status": "ready", "detection": detection}
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "loading", "detection": detection},
+    )
@@ -5,7 +5,7 @@ from typing import Dict, List, Any
 import cv2
 import numpy as np
 from shapely.geometry import Polygon
-from .pixel_to_geo import pixel_to_latlon
+from .pixel_to_geo import pixel_to_latlon_array
 import math
 
 
@@ -62,21 +62,22 @@ def calculate_lot_area(doc: dict) -> float:
     else:
         points_array = doc["detection_result"]["mask_points"]
 
-    geo_points = []
-    for x, y in points_array:
-        pixel_x = x * width
-        pixel_y = y * height
-        lat, lon = pixel_to_latlon(
-            pixel_x=pixel_x,
-            pixel_y=pixel_y,
+    pixels = np.array(points_array, dtype=np.float64).reshape(-1, 2) * (
+        width,
+        height,
+    )
+    geo_points = [
+        (lat, lon)
+        for lat, lon in pixel_to_latlon_array(
+            pixels,
             center_lat=center_lat,
             center_lon=center_lon,
             zoom=zoom,
             scale=2,
             image_width=width,
             image_height=height,
-        )
-        geo_points.append((lat, lon))
+        ).tolist()
+    ]
 
     return calculate_geo_area(geo_points)
 
@@ -8,7 +8,7 @@ import numpy as np
 import tempfile
 from pymongo import MongoClient
 from bson import ObjectId
-from google.cloud import storage
+from ..database.storage import get_storage
 
 
 def read_lot_data(csv_file: str) -> pd.DataFrame:
@@ -158,8 +158,8 @@ def process_lots_slope(
     """
     client = None
     try:
-        # Inicializa cliente do Google Cloud Storage
-        storage_client = storage.Client()
+        # Cliente de storage compartilhado (GCS ou local)
+        storage = get_storage()
 
         # Estabelece conexão com MongoDB
         client = MongoClient(mongodb_uri)
@@ -200,23 +200,14 @@ def process_lots_slope(
                 # Extrai o caminho do CSV do URL
                 csv_url = doc["csv_elevation_colors"]
 
-                # Extrai o caminho relativo do arquivo no bucket
-                csv_blob_path = csv_url.replace(
-                    "https://storage.cloud.google.com/csv_from_have_allotment/",
-                    "",
-                )
-
-                # Download do CSV do GCS
-                bucket = storage_client.bucket("csv_from_have_allotment")
-                blob = bucket.blob(csv_blob_path)
-
                 # Cria diretório temporário
                 with tempfile.TemporaryDirectory() as temp_dir:
                     # Define caminho do arquivo temporário
                     temp_csv = os.path.join(temp_dir, f"{doc['_id']}.csv")
 
-                    # Baixa o arquivo CSV do bucket
-                    blob.download_to_filename(temp_csv)
+                    # Baixa o arquivo CSV do storage
+                    with open(temp_csv, "wb") as f:
+                        f.write(storage.download_url(csv_url))
 
                     print(f"Processando lote: {doc['_id']}")
                     print(f"CSV baixado para: {temp_csv}")
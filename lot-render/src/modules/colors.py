@@ -1,18 +1,24 @@
 import os
 import json
 from pathlib import Path
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 import cv2
 import numpy as np
 from PIL import Image
-from .pixel_to_geo import pixel_to_latlon, extract_zoom
-from .lot_colors_adjustment import correct_colors
-import pandas as pd
+from .pixel_to_geo import pixel_to_latlon_array, extract_zoom
+from .lot_colors_adjustment import (
+    correct_bright_colors,
+    correct_colors,
+    correct_colors_array,
+    correct_dark_colors,
+)
+from .image_store import decode_image, get_image_cache
+from ..apis.imagery_providers import get_provider_name, get_imagery_provider
 import traceback
 import random
 from pymongo import MongoClient
 from bson.objectid import ObjectId
-from google.cloud import storage
+from ..database.storage import get_storage
 import math
 
 
@@ -38,16 +44,63 @@ def compute_number_of_points(area_m2: float) -> int:
     return total_points
 
 
+def _stratified_sample(
+    local: np.ndarray, n_points: int, rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Jittered-grid sampling inside a binary mask: one random pixel per grid
+    cell (cell area ~ mask area / n_points), rejected when outside the mask,
+    then n_points of the accepted ones. Returns (xs, ys).
+    """
+    inside_count = cv2.countNonZero(local)
+    if inside_count <= n_points:
+        ys, xs = np.nonzero(local)
+        return xs, ys
+
+    height, width = local.shape
+    step = math.sqrt(inside_count / n_points)
+    for _ in range(5):
+        cell_x, cell_y = np.meshgrid(
+            np.arange(0, width, step), np.arange(0, height, step)
+        )
+        xs = np.minimum(
+            (cell_x + rng.random(cell_x.shape) * step).astype(np.int64),
+            width - 1,
+        ).ravel()
+        ys = np.minimum(
+            (cell_y + rng.random(cell_y.shape) * step).astype(np.int64),
+            height - 1,
+        ).ravel()
+        keep = local[ys, xs] > 0
+        flat = np.unique(ys[keep] * width + xs[keep])
+        if len(flat) >= n_points:
+            flat = rng.choice(flat, size=n_points, replace=False)
+            return flat % width, flat // width
+        # Too few cells fell inside the polygon: refine the grid
+        step = max(step * 0.85, 1.0)
+
+    ys, xs = np.nonzero(local)
+    indices = rng.choice(len(xs), size=n_points, replace=False)
+    return xs[indices], ys[indices]
+
+
 def get_points_inside_mask(
-    mask: np.ndarray, area_m2: float, max_points: int = 130
+    mask: np.ndarray,
+    area_m2: float,
+    max_points: int = 130,
+    seed: Optional[int] = None,
 ) -> List[Tuple[int, int]]:
     """
-    Get random points inside mask.
+    Get evenly spread random points inside mask.
+
+    Only the bounding box of the largest contour is rasterized and sampled
+    (stratified, see _stratified_sample), instead of the whole image.
 
     Args:
         mask: Binary mask
         area_m2: Lot area in square meters
         max_points: Maximum number of points
+        seed: Random seed (same seed and mask give the same points)
 
     Returns:
         List of (x, y) points
@@ -62,23 +115,16 @@ def get_points_inside_mask(
     # Get largest contour
     contour = max(contours, key=cv2.contourArea)
 
-    # Create point mask
-    point_mask = np.zeros_like(mask)
-    cv2.drawContours(point_mask, [contour], -1, 255, -1)
-
-    # Get points inside mask
-    y_coords, x_coords = np.where(point_mask > 0)
-    if len(x_coords) == 0:
-        return []
+    # Create point mask over the contour bounding box only
+    x0, y0, width, height = cv2.boundingRect(contour)
+    local = np.zeros((height, width), dtype=np.uint8)
+    cv2.drawContours(local, [contour], -1, 255, -1, offset=(-x0, -y0))
 
     # Compute number of points
     n_points = min(compute_number_of_points(area_m2), max_points)
 
-    # Randomly sample points
-    indices = np.random.choice(len(x_coords), size=n_points, replace=False)
-    points = [(int(x_coords[i]), int(y_coords[i])) for i in indices]
-
-    return points
+    xs, ys = _stratified_sample(local, n_points, np.random.default_rng(seed))
+    return [(int(x) + x0, int(y) + y0) for x, y in zip(xs, ys)]
 
 
 def rgb_to_hex(rgb: Tuple[int, int, int]) -> str:
@@ -132,71 +178,85 @@ def calculate_lot_area(doc: dict) -> float:
     else:
         points_array = doc.get("yolov8_annotation", [])
 
-    geo_points = []
-    if points_array and isinstance(points_array[0], list):
-        for point in points_array:
-            x, y = point
-            pixel_x = float(x) * width
-            pixel_y = float(y) * height
-            lat, lon = pixel_to_latlon(
-                pixel_x=pixel_x,
-                pixel_y=pixel_y,
-                center_lat=center_lat,
-                center_lon=center_lon,
-                zoom=zoom,
-                scale=scale,
-                image_width=width,
-                image_height=height,
-            )
-            geo_points.append((lat, lon))
-    else:
-        for i in range(0, len(points_array), 2):
-            pixel_x = float(points_array[i]) * width
-            pixel_y = float(points_array[i + 1]) * height
-            lat, lon = pixel_to_latlon(
-                pixel_x=pixel_x,
-                pixel_y=pixel_y,
-                center_lat=center_lat,
-                center_lon=center_lon,
-                zoom=zoom,
-                scale=scale,
-                image_width=width,
-                image_height=height,
-            )
-            geo_points.append((lat, lon))
+    # Nested [[x, y], ...] or flat [x1, y1, x2, y2, ...] lists
+    pixels = np.array(points_array, dtype=np.float64).reshape(-1, 2) * (
+        width,
+        height,
+    )
+
+    geo_points = [
+        (lat, lon)
+        for lat, lon in pixel_to_latlon_array(
+            pixels,
+            center_lat=center_lat,
+            center_lon=center_lon,
+            zoom=zoom,
+            scale=scale,
+            image_width=width,
+            image_height=height,
+        ).tolist()
+    ]
 
     return calculate_geo_area(geo_points)
 
 
-def download_image_from_gcs(image_url: str) -> np.ndarray:
+def load_lot_image(doc: dict) -> np.ndarray:
     """
-    Baixa imagem do Google Cloud Storage.
+    Carrega a imagem de satélite do lote. Usa o LRU de imagens decodificadas
+    quando a imagem ainda está em memória; com um provedor de imagens local
+    (mosaico, MBTiles ou GeoTIFF em IMAGERY_PROVIDER), recorta a imagem
+    1280x1280 no centro ao qual os pontos da máscara se referem; caso
+    contrário (ou em erro) baixa a imagem salva no GCS.
     """
-    try:
-        # Remove o prefixo 'https://storage.cloud.google.com/' se presente
-        if image_url.startswith("https://storage.cloud.google.com/"):
-            bucket_path = image_url.replace(
-                "https://storage.cloud.google.com/", ""
+    image_url = doc["image_info"]["url"]
+    cache = get_image_cache()
+    if cache:
+        image = cache.get(image_url)
+        if image is not None:
+            return image
+
+    if get_provider_name() != "google":
+        center = (
+            doc.get("detection_result", {}).get("center", {}).get("geo")
+            or doc["coordinates"]
+        )
+        image_info = doc.get("image_info", {})
+        try:
+            image = get_imagery_provider().get_image(
+                center["lat"],
+                center["lon"],
+                zoom=image_info.get("zoom", 20),
+                width=1280,
+                height=1280,
+                scale=image_info.get("scale", 2),
             )
-        else:
-            bucket_path = image_url
+            return cache.put(image_url, image) if cache else image
+        except Exception as e:
+            print(f"Erro ao obter imagem do provedor, usando GCS: {str(e)}")
+
+    return download_image_from_gcs(image_url)
 
-        # Separa o nome do bucket e o caminho do blob
-        parts = bucket_path.split("/", 1)
-        bucket_name = parts[0]
-        blob_path = parts[1]
 
-        # Inicializa cliente GCS
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(blob_path)
+def download_image_from_gcs(image_url: str) -> np.ndarray:
+    """
+    Baixa imagem do storage (GCS ou local), ou a devolve do LRU de imagens
+    decodificadas se ainda estiver em memória.
+    """
+    cache = get_image_cache()
+    if cache:
+        image = cache.get(image_url)
+        if image is not None:
+            return image
 
-        # Baixa os bytes da imagem
-        image_bytes = blob.download_as_bytes()
+    try:
+        # Baixa os bytes da imagem (cliente de storage compartilhado; uploads
+        # ainda pendentes são lidos da memória)
+        image_bytes = get_storage().download_url(image_url)
 
         # Converte para numpy array
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image = decode_image(image_bytes)
+        if image is not None and cache:
+            image = cache.put(image_url, image)
 
         return image
     except Exception as e:
@@ -204,104 +264,6 @@ def download_image_from_gcs(image_url: str) -> np.ndarray:
         return None
 
 
-# Função para encontrar a cor média de pontos próximos não escuros
-def get_replacement_color(point, data, radius=2.0):
-    x, y, z = point["x"], point["y"], point["z"]
-    # Filtrar pontos próximos
-    nearby_points = data[
-        (~data["is_dark"])  # Apenas pontos não escuros
-        & (np.abs(data["x"] - x) <= radius)
-        & (np.abs(data["y"] - y) <= radius)
-        & (np.abs(data["z"] - z) <= radius)
-    ]
-    if nearby_points.empty:
-        return None  # Nenhum ponto próximo encontrado
-    # Calcular a média de R, G, B dos pontos próximos
-    avg_r = nearby_points["r"].mean()
-    avg_g = nearby_points["g"].mean()
-    avg_b = nearby_points["b"].mean()
-    return int(avg_r), int(avg_g), int(avg_b)
-
-
-# Função para corrigir cores escuras
-def correct_dark_colors(data, dark_threshold=50, radius=2.0):
-    data["is_dark"] = data[["r", "g", "b"]].mean(axis=1) < dark_threshold
-    for index, row in data[data["is_dark"]].iterrows():
-        replacement_color = get_replacement_color(row, data, radius)
-        if replacement_color:
-            data.loc[index, ["r", "g", "b"]] = replacement_color
-    # Atualizar a coluna 'hex_color'
-    data["hex_color"] = data.apply(
-        lambda row: f"#{int(row['r']):02x}{int(row['g']):02x}{int(row['b']):02x}",
-        axis=1,
-    )
-    return data
-
-
-def get_replacement_color_for_bright(point, data, radius=2.0):
-    """
-    Encontra a cor média de pontos próximos não brancos.
-
-    Parameters:
-        point: Series - Ponto atual com coordenadas e cores
-        data: DataFrame - DataFrame com todos os pontos
-        radius: float - Raio de busca para pontos próximos
-    """
-    x, y, z = point["x"], point["y"], point["z"]
-    # Filtrar pontos próximos
-    nearby_points = data[
-        (~data["is_bright"])  # Apenas pontos não brancos
-        & (np.abs(data["x"] - x) <= radius)
-        & (np.abs(data["y"] - y) <= radius)
-        & (np.abs(data["z"] - z) <= radius)
-    ]
-    if nearby_points.empty:
-        return None
-    # Calcular a média de R, G, B dos pontos próximos
-    avg_r = nearby_points["r"].mean()
-    avg_g = nearby_points["g"].mean()
-    avg_b = nearby_points["b"].mean()
-    return int(avg_r), int(avg_g), int(avg_b)
-
-
-def correct_bright_colors(data, bright_threshold=240, radius=2.0):
-    """
-    Corrige cores muito claras (brancas) substituindo pela média das cores próximas.
-
-    Parameters:
-        data: DataFrame - DataFrame com colunas r, g, b, x, y, z
-        bright_threshold: int - Valor mínimo para considerar uma cor como branca
-        radius: float - Raio de busca para pontos próximos
-    """
-    # Identifica cores muito claras (média dos canais acima do threshold)
-    data["is_bright"] = data[["r", "g", "b"]].mean(axis=1) > bright_threshold
-
-    # Corrige cores muito claras
-    for index, row in data[data["is_bright"]].iterrows():
-        replacement_color = get_replacement_color_for_bright(row, data, radius)
-        if replacement_color:
-            data.loc[index, ["r", "g", "b"]] = replacement_color
-
-    return data
-
-
-def correct_colors(data, dark_threshold=50, bright_threshold=240, radius=2.0):
-    """
-    Aplica correção tanto para cores escuras quanto para cores claras.
-
-    Parameters:
-        data: DataFrame - DataFrame com colunas r, g, b, x, y, z
-        dark_threshold: int - Valor máximo para considerar uma cor como escura
-        bright_threshold: int - Valor mínimo para considerar uma cor como branca
-        radius: float - Raio de busca para pontos próximos
-    """
-    # Primeiro corrige as cores escuras
-    data = correct_dark_colors(data, dark_threshold, radius)
-    # Depois corrige as cores claras
-    data = correct_bright_colors(data, bright_threshold, radius)
-    return data
-
-
 def process_lot_colors(
     mongodb_uri: str,
     doc_id: str,
@@ -309,8 +271,22 @@ def process_lot_colors(
     dark_threshold: int = 70,
     bright_threshold: int = 215,
     confidence: float = 0.62,
+    image: Optional[np.ndarray] = None,
+    neighbour_radius: float = 0.0,
+    seed: Optional[int] = None,
 ) -> list:
-    """Process lot colors."""
+    """
+    Process lot colors.
+
+    image: satellite image already decoded by an earlier stage (see
+    image_store.LotArtifacts); loaded with load_lot_image when None.
+
+    neighbour_radius: dark/bright colors are replaced by the mean of the
+    sampled points within this many pixels. The default 0 keeps each point
+    corrected on its own, as the stored colors_adjusted always were.
+
+    seed: makes the sampled points reproducible (see get_points_inside_mask).
+    """
     print("\n=== Iniciando processamento de cores do lote ===")
     print(f"ID do documento: {doc_id}")
     print("Parâmetros:")
@@ -340,14 +316,12 @@ def process_lot_colors(
             )
             return []
 
-        # Get image URL from new structure
-        image_url = doc["image_info"]["url"]
-
         # Get area from detection result
         area = calculate_lot_area(doc)
 
-        # Download and process image
-        image = download_image_from_gcs(image_url)
+        # Download and process image (unless shared by the caller)
+        if image is None:
+            image = load_lot_image(doc)
         if image is None:
             print("Erro ao baixar imagem")
             return []
@@ -427,57 +401,40 @@ def process_lot_colors(
         cv2.fillPoly(mask, [pts], 1)
 
         # Generate internal points
-        points_inside = get_points_inside_mask(mask, area, max_points)
+        points_inside = get_points_inside_mask(
+            mask, area, max_points, seed=seed
+        )
 
-        # Process colors for points
+        # Process colors for points: one gather for all pixels (BGR)
         colors = []
         colors_adjusted = []
         points_lat_lon = []
 
-        for point in points_inside:
-            # Get color from image
-            color = image[point[1], point[0]]
-            colors.append(color.tolist())
-
-            # Create a single-row DataFrame for the pixel with columns [r,g,b,x,y,z].
-            # Note: OpenCV returns color in BGR, so we convert to RGB order.
-            df_color = pd.DataFrame(
-                [
-                    [
-                        int(color[2]),
-                        int(color[1]),
-                        int(color[0]),
-                        point[0],
-                        point[1],
-                        0,
-                    ]
-                ],
-                columns=["r", "g", "b", "x", "y", "z"],
-            )
-
-            # Adjust color using correct_colors which expects a DataFrame
-            df_corrected = correct_colors(
-                df_color, dark_threshold, bright_threshold
-            )
-            adjusted_color = [
-                int(df_corrected.loc[0, "r"]),
-                int(df_corrected.loc[0, "g"]),
-                int(df_corrected.loc[0, "b"]),
-            ]
-            colors_adjusted.append(adjusted_color)
-
-            # Convert point to lat/lon
-            lat, lon = pixel_to_latlon(
-                pixel_x=point[0],
-                pixel_y=point[1],
+        if points_inside:
+            pixels = np.asarray(points_inside, dtype=np.int64)
+            point_colors = image[pixels[:, 1], pixels[:, 0]]
+            colors = point_colors.tolist()
+
+            # Batched correction over the (N, 3) RGB array
+            colors_adjusted = correct_colors_array(
+                point_colors[:, [2, 1, 0]],
+                pixels,
+                dark_threshold,
+                bright_threshold,
+                radius=neighbour_radius,
+            ).tolist()
+
+        # Convert all points to lat/lon in one call
+        if points_inside:
+            points_lat_lon = pixel_to_latlon_array(
+                points_inside,
                 center_lat=doc["coordinates"]["lat"],
                 center_lon=doc["coordinates"]["lon"],
                 zoom=doc["image_info"]["zoom"],
                 scale=doc["image_info"]["scale"],
                 image_width=width,
                 image_height=height,
-            )
-            points_lat_lon.append([lat, lon])
+            ).tolist()
 
         # Update MongoDB
         update_data = {
@@ -0,0 +1,254 @@
+import math
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+HGT_NAME = re.compile(r"^([NS])(\d{2})([EW])(\d{3})", re.IGNORECASE)
+HGT_VOID = -32768
+
+
+def _bilinear_grid(
+    data: np.ndarray, rows: np.ndarray, cols: np.ndarray
+) -> np.ndarray:
+    """
+    Amostragem bilinear vetorizada de uma grade 2D em posições fracionárias
+    (linha, coluna). Posições fora da grade ou com nó vazio (NaN) retornam
+    NaN.
+    """
+    height, width = data.shape
+    result = np.full(rows.shape, np.nan, dtype=np.float64)
+    inside = (rows >= 0) & (cols >= 0) & (rows <= height - 1) & (cols <= width - 1)
+    if not inside.any():
+        return result
+
+    r = rows[inside]
+    c = cols[inside]
+    r0 = np.minimum(np.floor(r).astype(np.int64), max(height - 2, 0))
+    c0 = np.minimum(np.floor(c).astype(np.int64), max(width - 2, 0))
+    r1 = np.minimum(r0 + 1, height - 1)
+    c1 = np.minimum(c0 + 1, width - 1)
+    fr = r - r0
+    fc = c - c0
+
+    # Índices avançados leem só os nós necessários do memmap
+    v00 = data[r0, c0].astype(np.float64)
+    v01 = data[r0, c1].astype(np.float64)
+    v10 = data[r1, c0].astype(np.float64)
+    v11 = data[r1, c1].astype(np.float64)
+    top = v00 * (1 - fc) + v01 * fc
+    bottom = v10 * (1 - fc) + v11 * fc
+    result[inside] = top * (1 - fr) + bottom * fr
+    return result
+
+
+class HgtTile:
+    """
+    Tile SRTM/ALOS .hgt (inteiros 16 bits big-endian, 1°x1°, 1201 ou 3601
+    amostras por lado, nós nos cantos), lido via np.memmap: apenas as
+    páginas dos nós amostrados são carregadas do disco.
+    """
+
+    def __init__(self, path: str):
+        match = HGT_NAME.match(os.path.basename(path))
+        if not match:
+            raise ValueError(f"Nome de tile .hgt inválido: {path}")
+        lat = int(match.group(2)) * (1 if match.group(1).upper() == "N" else -1)
+        lon = int(match.group(4)) * (1 if match.group(3).upper() == "E" else -1)
+        size = int(round(math.sqrt(os.path.getsize(path) / 2)))
+        if size * size * 2 != os.path.getsize(path):
+            raise ValueError(f"Tamanho de tile .hgt inválido: {path}")
+
+        self.path = path
+        self.size = size
+        self.bounds = (lon, lat, lon + 1, lat + 1)  # oeste, sul, leste, norte
+        self._data = np.memmap(path, dtype=">i2", mode="r", shape=(size, size))
+
+    def sample(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        west, _, _, north = self.bounds
+        rows = (north - lats) * (self.size - 1)
+        cols = (lons - west) * (self.size - 1)
+        values = _bilinear_grid(self._data, rows, cols)
+        # Vazios do SRTM
+        return self._mask_voids(values, rows, cols)
+
+    def _mask_voids(
+        self, values: np.ndarray, rows: np.ndarray, cols: np.ndarray
+    ) -> np.ndarray:
+        valid = ~np.isnan(values)
+        if not valid.any():
+            return values
+        r0 = np.clip(np.floor(rows[valid]).astype(np.int64), 0, self.size - 2)
+        c0 = np.clip(np.floor(cols[valid]).astype(np.int64), 0, self.size - 2)
+        corners = np.stack(
+            [
+                self._data[r0, c0],
+                self._data[r0, c0 + 1],
+                self._data[r0 + 1, c0],
+                self._data[r0 + 1, c0 + 1],
+            ]
+        )
+        void = (corners == HGT_VOID).any(axis=0)
+        idx = np.flatnonzero(valid)[void]
+        values[idx] = np.nan
+        return values
+
+
+class GeoTiffDem:
+    """
+    DEM em GeoTIFF (SRTM/ALOS/Copernicus, qualquer CRS), lido com rasterio.
+
+    Cada consulta lê apenas a janela que cobre os pontos (com GDAL
+    GTIFF_VIRTUAL_MEM_IO, arquivos sem compressão são mapeados em memória)
+    e amostra bilinearmente nos centros dos pixels.
+    """
+
+    def __init__(self, path: str):
+        import rasterio
+
+        self.path = path
+        self._dataset = rasterio.open(path)
+        self._lock = threading.Lock()
+        self._nodata = self._dataset.nodata
+        self._geographic = (
+            self._dataset.crs is None or self._dataset.crs.to_epsg() == 4326
+        )
+
+        from rasterio.warp import transform_bounds
+
+        if self._geographic:
+            self.bounds = tuple(self._dataset.bounds)
+        else:
+            self.bounds = transform_bounds(
+                self._dataset.crs, "EPSG:4326", *self._dataset.bounds
+            )
+
+    def sample(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        import rasterio
+        from rasterio.windows import Window
+
+        xs, ys = lons, lats
+        if not self._geographic:
+            from rasterio.warp import transform
+
+            xs, ys = transform("EPSG:4326", self._dataset.crs, lons, lats)
+            xs, ys = np.asarray(xs), np.asarray(ys)
+
+        inverse = ~self._dataset.transform
+        cols, rows = inverse * (xs, ys)
+        # Centros dos pixels
+        cols = np.asarray(cols) - 0.5
+        rows = np.asarray(rows) - 0.5
+
+        row_start = max(int(np.floor(rows.min())), 0)
+        col_start = max(int(np.floor(cols.min())), 0)
+        row_stop = min(int(np.floor(rows.max())) + 2, self._dataset.height)
+        col_stop = min(int(np.floor(cols.max())) + 2, self._dataset.width)
+        if row_stop <= row_start or col_stop <= col_start:
+            return np.full(lats.shape, np.nan)
+
+        # rasterio.Env vale só na thread atual: configurado em cada leitura
+        with self._lock, rasterio.Env(GTIFF_VIRTUAL_MEM_IO="IF_ENOUGH_RAM"):
+            window = self._dataset.read(
+                1,
+                window=Window(
+                    col_start,
+                    row_start,
+                    col_stop - col_start,
+                    row_stop - row_start,
+                ),
+            ).astype(np.float64)
+        if self._nodata is not None:
+            window[window == self._nodata] = np.nan
+        return _bilinear_grid(window, rows - row_start, cols - col_start)
+
+    def close(self) -> None:
+        self._dataset.close()
+
+
+class DemProvider:
+    """
+    Elevações a partir de tiles DEM locais (.hgt e/ou GeoTIFF) de um
+    diretório. Pontos sem tile (ou em vazios do DEM) retornam NaN.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.tiles: List = []
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                lower = name.lower()
+                try:
+                    if lower.endswith(".hgt"):
+                        self.tiles.append(HgtTile(path))
+                    elif lower.endswith((".tif", ".tiff")):
+                        self.tiles.append(GeoTiffDem(path))
+                except Exception as e:
+                    print(f"Ignorando tile DEM {path}: {str(e)}")
+        if not self.tiles:
+            raise ValueError(f"Nenhum tile DEM encontrado em {directory}")
+        # Tiles .hgt indexados pelo canto sudoeste (busca O(1))
+        self._hgt_index: Dict[Tuple[int, int], HgtTile] = {
+            (tile.bounds[1], tile.bounds[0]): tile
+            for tile in self.tiles
+            if isinstance(tile, HgtTile)
+        }
+        self._other = [t for t in self.tiles if not isinstance(t, HgtTile)]
+
+    def sample(self, locations) -> np.ndarray:
+        """Elevações (m) dos pontos (lat, lon); NaN onde não há cobertura."""
+        coords = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+        lats, lons = coords[:, 0], coords[:, 1]
+        result = np.full(len(coords), np.nan)
+
+        if self._hgt_index:
+            cells = np.stack(
+                [np.floor(lats), np.floor(lons)], axis=1
+            ).astype(np.int64)
+            for cell in np.unique(cells, axis=0):
+                tile = self._hgt_index.get((int(cell[0]), int(cell[1])))
+                if tile is None:
+                    continue
+                idx = np.flatnonzero((cells == cell).all(axis=1))
+                result[idx] = tile.sample(lats[idx], lons[idx])
+
+        for tile in self._other:
+            missing = np.flatnonzero(np.isnan(result))
+            if len(missing) == 0:
+                break
+            west, south, east, north = tile.bounds
+            idx = missing[
+                (lons[missing] >= west)
+                & (lons[missing] <= east)
+                & (lats[missing] >= south)
+                & (lats[missing] <= north)
+            ]
+            if len(idx):
+                result[idx] = tile.sample(lats[idx], lons[idx])
+        return result
+
+
+_dem_provider: Optional[DemProvider] = None
+_dem_lock = threading.Lock()
+
+
+def get_dem_provider() -> Optional[DemProvider]:
+    """
+    Retorna o provedor DEM do processo (None se DEM_DIR não estiver
+    configurado).
+
+    Configuração via ambiente:
+        DEM_DIR: diretório com tiles .hgt e/ou GeoTIFF (EPSG:4326 ou
+            qualquer CRS suportado pelo rasterio)
+    """
+    global _dem_provider
+    directory = os.getenv("DEM_DIR")
+    if not directory:
+        return None
+    with _dem_lock:
+        if _dem_provider is None or _dem_provider.directory != directory:
+            _dem_provider = DemProvider(directory)
+        return _dem_provider
@@ -1,78 +1,300 @@
 import os
 from pathlib import Path
 import json
+import asyncio
+import threading
+from functools import partial
 from typing import List, Dict, Any, Optional
 import cv2
 import numpy as np
-from ultralytics import YOLO
 from datetime import datetime
 from .poligonization import (
     calculate_polygon_area,
     select_best_polygon_adjustment,
 )
+from .model_registry import model_registry
+from .pixel_to_geo import pixel_to_latlon_array
+from .segmentation_engines import load_segmentation_model, resolve_model_path
+from .inference_worker import InferenceWorker, InferenceQueueFull
+from .inference_pool import get_inference_pool, shutdown_inference_pool
 
 
 def load_yolo_model(model_path: str):
     """
-    Carrega o modelo YOLO (ultralytics).
+    Carrega o modelo YOLO na engine configurada (torch, onnx ou openvino).
     """
-    model = YOLO(model_path)
+    model = load_segmentation_model(resolve_model_path(model_path))
     return model
 
 
+def _segments_from_result(result) -> List[Dict[str, Any]]:
+    """
+    Extrai todas as segmentações de um resultado YOLO (ultralytics).
+    """
+    if result.masks is None or len(result.masks.data) == 0:
+        return []
+
+    boxes_conf = result.boxes.conf.cpu().numpy()  # array de confianças
+    if result.boxes.cls is not None:
+        boxes_cls = result.boxes.cls.cpu().numpy()
+    else:
+        boxes_cls = np.zeros(len(boxes_conf))
+
+    # Em YOLOv8, result.masks.xyn[i] => shape (N,2) com coords normalizadas 0..1
+    polygons = result.masks.xyn
+    return [
+        {
+            "polygon": polygons[i],  # (N,2)
+            "class_id": int(boxes_cls[i]),
+            "confidence": float(boxes_conf[i]),
+        }
+        for i in range(len(boxes_conf))
+    ]
+
+
+def predict_segments(
+    model, images: List[np.ndarray]
+) -> List[List[Dict[str, Any]]]:
+    """
+    Executa o modelo em lote e retorna, para cada imagem, todas as
+    segmentações (polygon, class_id, confidence), independente da engine
+    (ultralytics/torch ou modelos exportados ONNX/OpenVINO).
+    """
+    if hasattr(model, "predict_segments"):
+        return model.predict_segments(list(images))
+
+    results = model(list(images), verbose=False)
+    if not results:
+        return [[] for _ in images]
+    return [_segments_from_result(result) for result in results]
+
+
+def get_all_segmentations(
+    model,
+    images: List[np.ndarray],
+    min_confidence: float = 0.0,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Realiza a detecção em lote (uma única chamada ao modelo) e retorna, para
+    cada imagem, todas as segmentações com confiança >= min_confidence,
+    ordenadas da maior para a menor confiança.
+    Se model for None, usa o modelo padrão do registro.
+    """
+    if not images:
+        return []
+
+    try:
+        if model is None:
+            model = model_registry.get()
+
+        # Realiza a detecção
+        segments_per_image = predict_segments(model, images)
+
+        return [
+            sorted(
+                (
+                    seg
+                    for seg in segments
+                    if seg["confidence"] >= min_confidence
+                ),
+                key=lambda seg: seg["confidence"],
+                reverse=True,
+            )
+            for segments in segments_per_image
+        ]
+
+    except Exception as e:
+        print(f"Erro na segmentação: {str(e)}")
+        return [[] for _ in images]
+
+
+def get_best_segmentations(
+    model,
+    images: List[np.ndarray],
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Realiza a detecção em lote e retorna a melhor segmentação de cada
+    imagem, na mesma ordem da entrada.
+    Se model for None, usa o modelo padrão do registro.
+    """
+    # A segmentação com maior confiança é a primeira de cada lista
+    return [
+        segments[0] if segments else None
+        for segments in get_all_segmentations(model, images)
+    ]
+
+
 def get_best_segmentation(
     model,
     img_512,
 ) -> Optional[Dict[str, Any]]:
     """
     Realiza a detecção e retorna a melhor segmentação.
+    Se model for None, usa o modelo padrão do registro.
     """
-    try:
-        # Realiza a detecção
-        results = model(img_512, verbose=False)
+    return get_best_segmentations(model, [img_512])[0]
 
-        if not results or len(results) == 0:
-            return None
 
-        # Pega a primeira detecção (assumindo que é a melhor)
-        result = results[0]
-        if result.masks is None or len(result.masks.data) == 0:
+def prepare_detection_image(image) -> Optional[np.ndarray]:
+    """
+    Converte o conteúdo da imagem (bytes ou np.ndarray BGR) para a entrada
+    512x512 usada pelo modelo.
+    """
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        # Converte bytes para numpy array
+        nparr = np.frombuffer(image, np.uint8)
+        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        if image is None:
             return None
 
-        # # Extrai dados da máscara
-        # mask_data = result.masks[0]
-        # points = mask_data.xy[0]  # Pega apenas os pontos do primeiro polígono
-        # confidence = float(result.boxes[0].conf)
-        # class_id = int(result.boxes[0].cls)
+    if image.shape[:2] == (512, 512):
+        return image
 
-        # # Normaliza os pontos para o intervalo [0,1]
-        # normalized_points = points / 512  # Assumindo imagem 512x512
+    # Redimensiona para 512x512
+    return cv2.resize(image, (512, 512), interpolation=cv2.INTER_AREA)
 
-        # Precisamos encontrar a segmentação com maior confiança
-        boxes_conf = result.boxes.conf.cpu().numpy()  # array de confianças
-        best_idx = int(np.argmax(boxes_conf))  # índice da maior confiança
 
-        # Em YOLOv8, result.masks.xyn[best_idx] => shape (N,2) com coords normalizadas 0..1
-        best_polygon = result.masks.xyn[best_idx]
+def segment_image_batch(
+    images: list, model_path: Optional[str] = None
+) -> List[List[Dict[str, Any]]]:
+    """
+    Prepara um lote de imagens (bytes ou arrays) e executa uma única
+    inferência em lote. Retorna todas as segmentações de cada imagem,
+    ordenadas por confiança; imagens que não puderem ser decodificadas
+    retornam lista vazia.
+    """
+    prepared = [prepare_detection_image(image) for image in images]
+    valid_idx = [i for i, img in enumerate(prepared) if img is not None]
 
-        # Classe detectada (se seu modelo tiver só 1 classe, deve ser 0)
-        if result.boxes.cls is not None:
-            best_cls = int(result.boxes.cls[best_idx].item())
-        else:
-            best_cls = 0
+    results: List[List[Dict[str, Any]]] = [[] for _ in images]
+    if not valid_idx:
+        return results
 
-        # Confiança
-        best_conf = float(boxes_conf[best_idx])
+    model = model_registry.get(model_path)
+    batch_results = get_all_segmentations(
+        model, [prepared[i] for i in valid_idx]
+    )
+    for i, segments in zip(valid_idx, batch_results):
+        results[i] = segments
+    return results
 
-        return {
-            "polygon": best_polygon,  # (N,2)
-            "class_id": best_cls,
-            "confidence": best_conf,
-        }
 
-    except Exception as e:
-        print(f"Erro na segmentação: {str(e)}")
-        return None
+def touches_image_border(polygon, margin: float = 0.01) -> bool:
+    """
+    Verifica se o polígono normalizado (0..1) encosta na borda da imagem,
+    ou seja, se o lote provavelmente está cortado.
+    """
+    polygon = np.asarray(polygon, dtype=np.float64)
+    return bool(
+        np.any(polygon <= margin) or np.any(polygon >= 1.0 - margin)
+    )
+
+
+def polygon_to_geo_points(
+    polygon,
+    center_lat: float,
+    center_lon: float,
+    zoom: int,
+    scale: int = 2,
+    image_size: int = 1280,
+) -> List[List[float]]:
+    """
+    Converte um polígono normalizado (0..1) da imagem de satélite centrada em
+    (center_lat, center_lon) para uma lista de [lat, lon].
+    """
+    pixels = np.asarray(polygon, dtype=np.float64).reshape(-1, 2) * image_size
+    return pixel_to_latlon_array(
+        pixels,
+        center_lat=center_lat,
+        center_lon=center_lon,
+        zoom=zoom,
+        scale=scale,
+        image_width=image_size,
+        image_height=image_size,
+    ).tolist()
+
+
+def build_candidate_detections(
+    segments: List[Dict[str, Any]],
+    center_lat: float,
+    center_lon: float,
+    zoom: int,
+    min_confidence: float = 0.0,
+    scale: int = 2,
+    image_size: int = 1280,
+) -> List[Dict[str, Any]]:
+    """
+    Converte as demais segmentações de uma imagem (lotes vizinhos) com
+    confiança >= min_confidence em detecções candidatas com o polígono
+    geográfico de cada uma.
+
+    Lotes que encostam na borda da imagem são mantidos; quem armazena os
+    candidatos deve descartá-los (ver touches_image_border), pois a máscara
+    está cortada e não representa o lote inteiro.
+    """
+    candidates = []
+    for seg in segments:
+        if seg["confidence"] < min_confidence:
+            continue
+        polygon = np.asarray(seg["polygon"], dtype=np.float64)
+        if len(polygon) < 3:
+            continue
+        candidates.append(
+            {
+                "polygon": polygon.tolist(),
+                "class_id": int(seg["class_id"]),
+                "confidence": float(seg["confidence"]),
+                "geo_points": polygon_to_geo_points(
+                    polygon, center_lat, center_lon, zoom, scale, image_size
+                ),
+            }
+        )
+    return candidates
+
+
+_inference_workers: Dict[str, InferenceWorker] = {}
+_inference_workers_lock = threading.Lock()
+
+
+def get_inference_worker(model_path: Optional[str] = None) -> InferenceWorker:
+    """
+    Retorna o worker de micro-batching do modelo (um por caminho de modelo).
+
+    Os lotes são executados no pool de processos de inferência (com o modelo
+    pré-carregado em cada processo) ou, com o pool desativado, na própria
+    thread do worker.
+
+    Configuração via ambiente:
+        INFERENCE_BATCH_WINDOW_MS: janela de agrupamento em ms (default: 20)
+        INFERENCE_MAX_BATCH_SIZE: máximo de imagens por lote (default: 8)
+        INFERENCE_MAX_PENDING: máximo de imagens na fila (default: 64)
+    """
+    key = model_path or os.getenv("YOLO_MODEL_PATH") or ""
+    with _inference_workers_lock:
+        worker = _inference_workers.get(key)
+        if worker is None:
+            pool = get_inference_pool(model_path)
+            worker = InferenceWorker(
+                batch_fn=partial(segment_image_batch, model_path=model_path),
+                batch_window_ms=float(
+                    os.getenv("INFERENCE_BATCH_WINDOW_MS", "20")
+                ),
+                max_batch_size=int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8")),
+                executor=pool.executor if pool else None,
+                max_pending=int(os.getenv("INFERENCE_MAX_PENDING", "64")),
+            )
+            _inference_workers[key] = worker
+        return worker
+
+
+def stop_inference_workers() -> None:
+    """Encerra todos os workers de inferência e o pool de processos."""
+    with _inference_workers_lock:
+        workers = list(_inference_workers.values())
+        _inference_workers.clear()
+    for worker in workers:
+        worker.stop()
+    shutdown_inference_pool()
 
 
 def polygon_to_yolov8_mask_str(class_id: int, polygon: np.ndarray) -> str:
@@ -99,6 +321,82 @@ def polygon_to_yolov8_mask_str(class_id: int, polygon: np.ndarray) -> str:
     return " ".join(mask_str_list)
 
 
+def build_detection_doc(
+    item: Dict[str, Any],
+    seg_data: Dict[str, Any],
+    adjust_mask: bool = False,
+) -> Dict[str, Any]:
+    """
+    Monta o documento de detecção de um item a partir da segmentação,
+    aplicando o ajuste de máscara se solicitado.
+    """
+    item_id = item["object_id"]
+
+    # Calcula área original em pixels (normalizada)
+    original_area_pixels = calculate_polygon_area(seg_data["polygon"])
+
+    # Prepara documento base
+    doc_to_save = {
+        "yolov8_annotation": polygon_to_yolov8_mask_str(
+            seg_data["class_id"], seg_data["polygon"]
+        ),
+        "confidence": seg_data["confidence"],
+        "object_id": item_id,
+        "latitude": item["latitude"],
+        "longitude": item["longitude"],
+        "dimensions": item["dimensions"],
+        "zoom": item["zoom"],
+        "street_name": item.get("street_name", ""),
+        "google_place_id": item.get("google_place_id", ""),
+        "year": item.get("year", ""),
+        "created_at": datetime.utcnow(),
+        "original_area_pixels": float(original_area_pixels),
+        "original_detection": {
+            "polygon": seg_data["polygon"].tolist(),
+            "confidence": seg_data["confidence"],
+            "class_id": seg_data["class_id"],
+        },
+    }
+
+    # Se adjust_mask=True, processa ajuste
+    if adjust_mask:
+        adjusted_polygon, adjustment_method = select_best_polygon_adjustment(
+            seg_data,
+            original_area_pixels,
+            size=(512, 512),
+        )
+
+        if adjusted_polygon is not None:
+            # Calcula área do polígono ajustado
+            adjusted_area_pixels = calculate_polygon_area(adjusted_polygon)
+            area_difference = adjusted_area_pixels - original_area_pixels
+            area_difference_percent = (
+                area_difference / original_area_pixels
+            ) * 100
+
+            doc_to_save["adjusted_detection"] = {
+                "polygon": adjusted_polygon.tolist(),
+                "adjustment_method": adjustment_method,
+                "annotation": polygon_to_yolov8_mask_str(
+                    seg_data["class_id"], adjusted_polygon
+                ),
+                "adjusted_area_pixels": float(adjusted_area_pixels),
+                "area_difference_pixels": float(area_difference),
+                "area_difference_percent": float(area_difference_percent),
+            }
+
+    print(f"Processado item {item_id}")
+    if adjust_mask and "adjusted_detection" in doc_to_save:
+        print(
+            f"  Método de ajuste: {doc_to_save['adjusted_detection']['adjustment_method']}"
+        )
+        print(
+            f"  Diferença de área: {doc_to_save['adjusted_detection']['area_difference_percent']:.2f}%"
+        )
+
+    return doc_to_save
+
+
 def detect_lots_and_save(
     model_path: str,
     items_list: list,
@@ -118,9 +416,8 @@ def detect_lots_and_save(
     processed_docs = []
 
     try:
-        # Carrega o modelo YOLO
-        print("Carregando modelo YOLO...")
-        model = load_yolo_model(model_path)
+        # Usa o modelo já carregado no registro do processo
+        model = model_registry.get(model_path)
 
         for item in items_list:
             try:
@@ -131,18 +428,11 @@ def detect_lots_and_save(
                     print(f"Conteúdo da imagem não encontrado para {item_id}")
                     continue
 
-                # Converte bytes para numpy array
-                nparr = np.frombuffer(image_content, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                if img is None:
+                img_512 = prepare_detection_image(image_content)
+                if img_512 is None:
                     print(f"Erro ao decodificar imagem para {item_id}")
                     continue
 
-                # Redimensiona para 512x512
-                img_512 = cv2.resize(
-                    img, (512, 512), interpolation=cv2.INTER_AREA
-                )
-
                 # Realiza a detecção
                 seg_data = get_best_segmentation(model, img_512)
 
@@ -150,79 +440,10 @@ def detect_lots_and_save(
                     print(f"Nenhuma detecção encontrada para item {item_id}")
                     continue
 
-                # Calcula área original em pixels (normalizada)
-                original_area_pixels = calculate_polygon_area(
-                    seg_data["polygon"]
+                processed_docs.append(
+                    build_detection_doc(item, seg_data, adjust_mask)
                 )
 
-                # Prepara documento base
-                doc_to_save = {
-                    "yolov8_annotation": polygon_to_yolov8_mask_str(
-                        seg_data["class_id"], seg_data["polygon"]
-                    ),
-                    "confidence": seg_data["confidence"],
-                    "object_id": item_id,
-                    "latitude": item["latitude"],
-                    "longitude": item["longitude"],
-                    "dimensions": item["dimensions"],
-                    "zoom": item["zoom"],
-                    "street_name": item.get("street_name", ""),
-                    "google_place_id": item.get("google_place_id", ""),
-                    "year": item.get("year", ""),
-                    "created_at": datetime.utcnow(),
-                    "original_area_pixels": float(original_area_pixels),
-                    "original_detection": {
-                        "polygon": seg_data["polygon"].tolist(),
-                        "confidence": seg_data["confidence"],
-                        "class_id": seg_data["class_id"],
-                    },
-                }
-
-                # Se adjust_mask=True, processa ajuste
-                if adjust_mask:
-                    adjusted_polygon, adjustment_method = (
-                        select_best_polygon_adjustment(
-                            seg_data,
-                            original_area_pixels,
-                            size=(512, 512),
-                        )
-                    )
-
-                    if adjusted_polygon is not None:
-                        # Calcula área do polígono ajustado
-                        adjusted_area_pixels = calculate_polygon_area(
-                            adjusted_polygon
-                        )
-                        area_difference = (
-                            adjusted_area_pixels - original_area_pixels
-                        )
-                        area_difference_percent = (
-                            area_difference / original_area_pixels
-                        ) * 100
-
-                        doc_to_save["adjusted_detection"] = {
-                            "polygon": adjusted_polygon.tolist(),
-                            "adjustment_method": adjustment_method,
-                            "annotation": polygon_to_yolov8_mask_str(
-                                seg_data["class_id"], adjusted_polygon
-                            ),
-                            "adjusted_area_pixels": float(adjusted_area_pixels),
-                            "area_difference_pixels": float(area_difference),
-                            "area_difference_percent": float(
-                                area_difference_percent
-                            ),
-                        }
-
-                processed_docs.append(doc_to_save)
-                print(f"Processado item {item_id}")
-                if adjust_mask and "adjusted_detection" in doc_to_save:
-                    print(
-                        f"  Método de ajuste: {doc_to_save['adjusted_detection']['adjustment_method']}"
-                    )
-                    print(
-                        f"  Diferença de área: {doc_to_save['adjusted_detection']['area_difference_percent']:.2f}%"
-                    )
-
             except Exception as e:
                 print(f"Erro processando item: {str(e)}")
                 continue
@@ -233,3 +454,91 @@ def detect_lots_and_save(
     except Exception as e:
         print(f"Erro durante o processamento: {str(e)}")
         return []
+
+
+def build_detection_docs(
+    items_list: list,
+    seg_results: list,
+    adjust_mask: bool = False,
+    candidate_confidence: Optional[float] = None,
+) -> list:
+    """
+    Monta os documentos de detecção a partir das segmentações de cada item
+    (ou da exceção da inferência, que é registrada e o item ignorado).
+    """
+    processed_docs = []
+    for item, segments in zip(items_list, seg_results):
+        item_id = item["object_id"]
+        try:
+            if isinstance(segments, Exception):
+                raise segments
+            if not segments:
+                print(f"Nenhuma detecção encontrada para item {item_id}")
+                continue
+            doc = build_detection_doc(item, segments[0], adjust_mask)
+            if candidate_confidence is not None:
+                doc["candidate_detections"] = build_candidate_detections(
+                    segments[1:],
+                    center_lat=item["latitude"],
+                    center_lon=item["longitude"],
+                    zoom=item["zoom"],
+                    min_confidence=candidate_confidence,
+                )
+                print(
+                    f"  Lotes vizinhos candidatos: {len(doc['candidate_detections'])}"
+                )
+            processed_docs.append(doc)
+        except Exception as e:
+            print(f"Erro processando item: {str(e)}")
+            continue
+    return processed_docs
+
+
+async def detect_lots_async(
+    model_path: str,
+    items_list: list,
+    adjust_mask: bool = False,
+    candidate_confidence: Optional[float] = None,
+) -> list:
+    """
+    Versão assíncrona de detect_lots_and_save para os serviços FastAPI.
+
+    As imagens (bytes) são enviadas ao worker de micro-batching, que agrupa
+    as requisições concorrentes em uma única inferência em lote executada
+    fora do event loop. O formato dos documentos retornados é o mesmo de
+    detect_lots_and_save.
+
+    Se candidate_confidence for informado (modo multi-lote), cada documento
+    recebe também "candidate_detections": os demais lotes encontrados na
+    mesma imagem com confiança >= candidate_confidence, já com o polígono
+    geográfico (ver build_candidate_detections).
+    """
+    worker = get_inference_worker(model_path)
+
+    pending = []
+    for item in items_list:
+        if not item.get("image_content"):
+            print(f"Conteúdo da imagem não encontrado para {item['object_id']}")
+            continue
+        pending.append(item)
+
+    seg_results = await asyncio.gather(
+        *[worker.infer(item["image_content"]) for item in pending],
+        return_exceptions=True,
+    )
+    for segments in seg_results:
+        if isinstance(segments, InferenceQueueFull):
+            raise segments
+
+    # Ajuste de polígono (cv2) e conversão geográfica são CPU-bound: fora
+    # do event loop
+    processed_docs = await asyncio.to_thread(
+        build_detection_docs,
+        pending,
+        seg_results,
+        adjust_mask,
+        candidate_confidence,
+    )
+
+    print(f"\nTotal de documentos processados: {len(processed_docs)}")
+    return processed_docs
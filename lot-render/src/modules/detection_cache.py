@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+
+class DetectionCache:
+    """
+    Cache de resultados de detecção de lotes.
+
+    A chave combina latitude/longitude quantizadas, zoom, ano da imagem e o
+    hash do modelo, de forma que um novo modelo invalida automaticamente os
+    resultados antigos. Um acerto devolve os pontos do polígono e o doc_id
+    já salvos, sem buscar imagem no Google nem executar o modelo.
+
+    Dois níveis:
+        - memória: LRU com TTL, local ao processo;
+        - MongoDB (opcional): coleção compartilhada entre réplicas, com índice
+          TTL em expires_at para a expiração automática.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 86400,
+        max_entries: int = 10000,
+        precision: int = 5,
+        mongo_collection=None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(int(max_entries), 1)
+        self.precision = precision
+        self.mongo_collection = mongo_collection
+        self._lock = threading.Lock()
+        # chave -> (expira em (monotonic), valor)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+        self._mongo_indexes_ready = False
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(
+        self,
+        latitude: float,
+        longitude: float,
+        zoom: int,
+        year: str,
+        model_hash: str,
+    ) -> str:
+        """Chave do cache: lat/lon quantizadas + zoom + ano + hash do modelo."""
+        factor = 10**self.precision
+        return (
+            f"{int(round(latitude * factor))}:{int(round(longitude * factor))}"
+            f":{zoom}:{year}:{model_hash[:16]}"
+        )
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_memory(
+        self, key: str, value: Dict[str, Any], ttl_seconds: float
+    ) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def _ensure_mongo_indexes(self) -> None:
+        if self._mongo_indexes_ready:
+            return
+        await self.mongo_collection.create_index(
+            "expires_at", expireAfterSeconds=0
+        )
+        await self.mongo_collection.create_index("doc_id")
+        self._mongo_indexes_ready = True
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Busca na memória e, se não encontrar, no MongoDB."""
+        value = self._get_memory(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.mongo_collection is not None:
+            try:
+                await self._ensure_mongo_indexes()
+                now = datetime.utcnow()
+                doc = await self.mongo_collection.find_one(
+                    {"_id": key, "expires_at": {"$gt": now}}
+                )
+                if doc:
+                    value = doc["value"]
+                    remaining = (doc["expires_at"] - now).total_seconds()
+                    self._set_memory(key, value, remaining)
+                    self.hits += 1
+                    return value
+            except Exception as e:
+                print(f"Erro ao consultar cache de detecção no MongoDB: {str(e)}")
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Armazena o resultado na memória e, se configurado, no MongoDB."""
+        self._set_memory(key, value, self.ttl_seconds)
+
+        if self.mongo_collection is not None:
+            try:
+                await self._ensure_mongo_indexes()
+                await self.mongo_collection.replace_one(
+                    {"_id": key},
+                    {
+                        "_id": key,
+                        "doc_id": value.get("doc_id"),
+                        "value": value,
+                        "expires_at": datetime.utcnow()
+                        + timedelta(seconds=self.ttl_seconds),
+                    },
+                    upsert=True,
+                )
+            except Exception as e:
+                print(f"Erro ao salvar cache de detecção no MongoDB: {str(e)}")
+
+    async def invalidate_doc(self, doc_id: str) -> None:
+        """
+        Remove as entradas que apontam para um documento (ex.: depois que o
+        polígono foi corrigido em process_lot_service).
+        """
+        with self._lock:
+            for key in [
+                key
+                for key, (_, value) in self._entries.items()
+                if value.get("doc_id") == doc_id
+            ]:
+                del self._entries[key]
+
+        if self.mongo_collection is not None:
+            try:
+                await self.mongo_collection.delete_many({"doc_id": doc_id})
+            except Exception as e:
+                print(f"Erro ao invalidar cache de detecção no MongoDB: {str(e)}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "mongo_tier": self.mongo_collection is not None,
+        }
+
+
+_cache: Optional[DetectionCache] = None
+_cache_lock = threading.Lock()
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def get_detection_cache(mongo_db=None) -> Optional[DetectionCache]:
+    """
+    Retorna o cache de detecção do processo (None se desativado).
+
+    Configuração via ambiente:
+        DETECTION_CACHE_ENABLED: ativa o cache (default: true)
+        DETECTION_CACHE_TTL_SECONDS: validade das entradas (default: 86400)
+        DETECTION_CACHE_MAX_ENTRIES: tamanho máximo do LRU em memória (default: 10000)
+        DETECTION_CACHE_PRECISION: casas decimais de lat/lon na chave (default: 5, ~1 m)
+        DETECTION_CACHE_MONGO: usa também a coleção lots_detections_cache_hmg (default: false)
+    """
+    global _cache
+    if not _env_flag("DETECTION_CACHE_ENABLED", "true"):
+        return None
+
+    with _cache_lock:
+        if _cache is None:
+            mongo_collection = None
+            if mongo_db is not None and _env_flag("DETECTION_CACHE_MONGO", "false"):
+                mongo_collection = mongo_db.db["lots_detections_cache_hmg"]
+            _cache = DetectionCache(
+                ttl_seconds=float(
+                    os.getenv("DETECTION_CACHE_TTL_SECONDS", "86400")
+                ),
+                max_entries=int(os.getenv("DETECTION_CACHE_MAX_ENTRIES", "10000")),
+                precision=int(os.getenv("DETECTION_CACHE_PRECISION", "5")),
+                mongo_collection=mongo_collection,
+            )
+        return _cache
@@ -1,28 +1,23 @@
 import os
 import json
-import sqlite3
 from pathlib import Path
-from typing import Dict, List, Any, Tuple
-import requests
-import time
+from typing import Dict, List, Any, Optional, Tuple
 import numpy as np
+import utm
+from scipy.interpolate import LinearNDInterpolator, NearestNDInterpolator
+from scipy.spatial import ConvexHull, Delaunay
 import traceback
 import googlemaps
 from pymongo import MongoClient
 from bson import ObjectId
+from ..apis.elevation_fetcher import fetch_elevations
+from .elevation_cache import get_elevation_cache
+from .dem import get_dem_provider
 
 
 def init_elevation_cache(db_path: str) -> None:
-    """Initialize elevation cache database."""
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    c.execute(
-        """CREATE TABLE IF NOT EXISTS elevations
-                 (lat REAL, lon REAL, elevation REAL,
-                  PRIMARY KEY (lat, lon))"""
-    )
-    conn.commit()
-    conn.close()
+    """Initialize elevation cache database (persistent connection)."""
+    get_elevation_cache(db_path)
 
 
 def get_elevations_batch(
@@ -31,51 +26,27 @@ def get_elevations_batch(
     """
     Obtém elevações em lote da API do Google.
 
+    As requisições são concorrentes, limitadas por token bucket e enviadas
+    como polylines codificadas; pontos já em busca para outro lote são
+    aguardados em vez de requisitados de novo (ver
+    apis.elevation_fetcher).
+
     Parameters:
         locations: List[Tuple[float, float]] - Lista de coordenadas (lat, lon)
         api_key: str - Chave da API do Google
 
     Returns:
-        List[float] - Lista de elevações
+        List[float] - Lista de elevações (None onde a API falhou)
     """
-    max_locations_per_request = 100
-    elevations = []
-
-    for i in range(0, len(locations), max_locations_per_request):
-        batch = locations[i : i + max_locations_per_request]
-        coordenadas = "|".join([f"{lat},{lon}" for lat, lon in batch])
-
-        base_url = "https://maps.googleapis.com/maps/api/elevation/json"
-        url = f"{base_url}?locations={coordenadas}&key={api_key}"
-
-        try:
-            response = requests.get(url)
-            print(
-                f"Batch {i//max_locations_per_request + 1}: Status {response.status_code}"
-            )
-
-            if response.status_code == 200:
-                dados = response.json()
-                if dados.get("status") == "OK":
-                    batch_elevations = [
-                        result.get("elevation")
-                        for result in dados.get("results", [])
-                    ]
-                    elevations.extend(batch_elevations)
-                else:
-                    print(f"Erro na API: {dados.get('status')}")
-                    elevations.extend([None] * len(batch))
-            else:
-                print(f"Erro na requisição: {response.status_code}")
-                elevations.extend([None] * len(batch))
-
-            # Pausa para evitar limites de taxa da API
-            time.sleep(0.1)
-
-        except Exception as e:
-            print(f"Erro ao obter elevações: {str(e)}")
-            elevations.extend([None] * len(batch))
+    try:
+        elevations = fetch_elevations(locations, api_key)
+    except Exception as e:
+        print(f"Erro ao obter elevações: {str(e)}")
+        return [None] * len(locations)
 
+    failed = sum(elevation is None for elevation in elevations)
+    if failed:
+        print(f"Elevação indisponível para {failed} de {len(locations)} pontos")
     return elevations
 
 
@@ -95,27 +66,16 @@ def get_elevations_with_cache(
     Returns:
         List[float] - Lista de elevações
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    elevations = []
-    locations_to_fetch = []
-    cached_count = 0
-
-    # Verifica cache para cada localização
-    for lat, lon in locations:
-        cursor.execute(
-            "SELECT elevation FROM elevations WHERE lat = ? AND lon = ?",
-            (round(lat, 6), round(lon, 6)),
-        )
-        row = cursor.fetchone()
+    cache = get_elevation_cache(db_path)
 
-        if row and row[0] is not None and not np.isnan(row[0]):
-            elevations.append(row[0])
-            cached_count += 1
-        else:
-            elevations.append(None)
-            locations_to_fetch.append((lat, lon))
+    # Uma única consulta em lote ao cache
+    elevations = cache.get_many(locations)
+    locations_to_fetch = [
+        location
+        for location, elevation in zip(locations, elevations)
+        if elevation is None
+    ]
+    cached_count = len(elevations) - len(locations_to_fetch)
 
     print(f"Encontrados {cached_count} pontos no cache")
     print(f"Necessário buscar {len(locations_to_fetch)} novos pontos")
@@ -124,30 +84,370 @@ def get_elevations_with_cache(
     if locations_to_fetch:
         fetched_elevations = get_elevations_batch(locations_to_fetch, api_key)
 
-        # Atualiza lista de elevações e cache
-        index = 0
-        for i, elevation in enumerate(elevations):
-            if elevation is None:
-                elevation = fetched_elevations[index]
-                elevations[i] = elevation
-                index += 1
-
-        # Atualiza cache
-        cursor.executemany(
-            "INSERT OR REPLACE INTO elevations (lat, lon, elevation) VALUES (?, ?, ?)",
-            [
-                (round(lat, 6), round(lon, 6), elev)
-                for (lat, lon), elev in zip(
-                    locations_to_fetch, fetched_elevations
-                )
-            ],
-        )
-        conn.commit()
+        # Atualiza lista de elevações
+        fetched = iter(fetched_elevations)
+        elevations = [
+            next(fetched) if elevation is None else elevation
+            for elevation in elevations
+        ]
+
+        # Atualiza cache (falhas não são gravadas)
+        cache.put_many(locations_to_fetch, fetched_elevations)
+
+    return elevations
+
+
+def _bilinear(
+    corners: np.ndarray, fx: np.ndarray, fy: np.ndarray
+) -> np.ndarray:
+    """
+    Interpolação bilinear. corners: Nx4 com os nós (i0,j0), (i0+1,j0),
+    (i0,j0+1), (i0+1,j0+1); fx/fy: posição fracionária dentro da célula.
+    """
+    bottom = corners[:, 0] * (1 - fx) + corners[:, 1] * fx
+    top = corners[:, 2] * (1 - fx) + corners[:, 3] * fx
+    return bottom * (1 - fy) + top * fy
+
+
+def _project_utm(coords: np.ndarray):
+    """
+    Projeta (lat, lon) em UTM usando a zona do centro do lote para todos
+    os pontos (coordenadas contínuas mesmo perto da borda de uma zona).
+    """
+    _, _, zone_number, zone_letter = utm.from_latlon(
+        float(coords[:, 0].mean()), float(coords[:, 1].mean())
+    )
+    easting, northing, _, _ = utm.from_latlon(
+        coords[:, 0], coords[:, 1], force_zone_number=zone_number
+    )
+    return easting, northing, zone_number, zone_letter
+
+
+def get_elevations_grid(
+    locations: List[Tuple[float, float]],
+    api_key: str,
+    db_path: str = "elevation_cache.db",
+    step_m: float = 5.0,
+) -> List[float]:
+    """
+    Obtém elevações ajustando as consultas a uma grade métrica fixa (UTM,
+    passo step_m) e interpolando cada ponto bilinearmente a partir dos 4
+    nós da célula.
+
+    Apenas os nós ausentes do cache são buscados na API. Como os nós são os
+    mesmos para lotes vizinhos (mesma zona UTM), a taxa de acerto do cache
+    cresce à medida que a vizinhança é processada, ao contrário dos pontos
+    aleatórios de cor, que quase nunca se repetem.
+
+    Parameters:
+        locations: List[Tuple[float, float]] - Lista de coordenadas (lat, lon)
+        api_key: str - Chave da API do Google
+        db_path: str - Caminho para o banco de dados de cache
+        step_m: float - Espaçamento da grade em metros
+
+    Returns:
+        List[float] - Elevações (None onde algum nó não pôde ser obtido)
+    """
+    if not locations:
+        return []
+
+    coords = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+    easting, northing, zone_number, zone_letter = _project_utm(coords)
+
+    gx = easting / step_m
+    gy = northing / step_m
+    i0 = np.floor(gx).astype(np.int64)
+    j0 = np.floor(gy).astype(np.int64)
+    fx = gx - i0
+    fy = gy - j0
+
+    # 4 nós por ponto: (i0,j0), (i0+1,j0), (i0,j0+1), (i0+1,j0+1)
+    corner_i = np.stack([i0, i0 + 1, i0, i0 + 1], axis=1)
+    corner_j = np.stack([j0, j0, j0 + 1, j0 + 1], axis=1)
+    nodes, inverse = np.unique(
+        np.stack([corner_i.ravel(), corner_j.ravel()], axis=1),
+        axis=0,
+        return_inverse=True,
+    )
+    node_lat, node_lon = utm.to_latlon(
+        nodes[:, 0] * step_m,
+        nodes[:, 1] * step_m,
+        zone_number,
+        zone_letter,
+        strict=False,
+    )
+    node_locations = list(zip(node_lat.tolist(), node_lon.tolist()))
+    print(
+        f"Grade de {step_m:g} m: {len(node_locations)} nós para "
+        f"{len(coords)} pontos"
+    )
+
+    node_elevations = np.array(
+        [
+            np.nan if elevation is None else elevation
+            for elevation in get_elevations_with_cache(
+                node_locations, api_key, db_path
+            )
+        ],
+        dtype=np.float64,
+    )
+    corners = node_elevations[inverse.reshape(-1)].reshape(-1, 4)
+    values = _bilinear(corners, fx, fy)
+    return [None if np.isnan(value) else float(value) for value in values]
+
+
+def get_elevations_dem(
+    locations: List[Tuple[float, float]],
+    api_key: str,
+    db_path: str = "elevation_cache.db",
+) -> List[float]:
+    """
+    Obtém elevações dos tiles DEM locais (DEM_DIR: .hgt SRTM/ALOS ou
+    GeoTIFF) por amostragem bilinear vetorizada. Apenas os pontos sem
+    cobertura (fora dos tiles ou em vazios do DEM) são consultados na API
+    do Google, com cache.
+
+    Parameters:
+        locations: List[Tuple[float, float]] - Lista de coordenadas (lat, lon)
+        api_key: str - Chave da API do Google
+        db_path: str - Caminho para o banco de dados de cache
+
+    Returns:
+        List[float] - Elevações (None onde não puderam ser obtidas)
+    """
+    if not locations:
+        return []
+
+    provider = get_dem_provider()
+    if provider is None:
+        raise ValueError("Modo de elevação dem requer DEM_DIR")
+
+    values = provider.sample(locations)
+    elevations = [None if np.isnan(value) else float(value) for value in values]
 
-    conn.close()
+    missing = [i for i, elevation in enumerate(elevations) if elevation is None]
+    if missing:
+        print(
+            f"DEM sem cobertura para {len(missing)} de {len(locations)} "
+            "pontos, consultando API"
+        )
+        fallback = get_elevations_with_cache(
+            [locations[i] for i in missing], api_key, db_path
+        )
+        for i, elevation in zip(missing, fallback):
+            elevations[i] = elevation
     return elevations
 
 
+def _farthest_point_sample(
+    xy: np.ndarray, count: int, initial: List[int]
+) -> List[int]:
+    """
+    Índices de uma amostra bem espalhada: parte de initial e acrescenta
+    sempre o ponto mais distante dos já escolhidos, até count pontos.
+    """
+    selected = list(initial)
+    if not selected:
+        centroid = xy.mean(axis=0)
+        selected = [int(np.argmax(((xy - centroid) ** 2).sum(axis=1)))]
+    distances = np.min(
+        ((xy[:, None, :] - xy[None, selected, :]) ** 2).sum(axis=2), axis=1
+    )
+    while len(selected) < count:
+        index = int(np.argmax(distances))
+        if distances[index] == 0:
+            break
+        selected.append(index)
+        distances = np.minimum(distances, ((xy - xy[index]) ** 2).sum(axis=1))
+    return selected
+
+
+def _rough_simplices(
+    tri: Delaunay, values: np.ndarray, tolerance: float
+) -> np.ndarray:
+    """
+    Triângulos em que o relevo local não é plano: o vértice oposto de
+    algum triângulo vizinho se afasta mais de tolerance (m) do plano do
+    triângulo. Encostas uniformes não são refinadas, já que a interpolação
+    linear é exata nelas.
+    """
+    simplices = tri.simplices
+    vertices = tri.points[simplices]
+    # Plano z = a*x + b*y + c de cada triângulo
+    system = np.concatenate([vertices, np.ones(vertices.shape[:2] + (1,))], axis=2)
+    planes = (np.linalg.pinv(system) @ values[simplices][..., None])[..., 0]
+
+    neighbors = tri.neighbors
+    valid = neighbors >= 0
+    neighbor_vertices = simplices[np.where(valid, neighbors, 0)]
+    not_shared = ~(
+        neighbor_vertices[..., None] == simplices[:, None, None, :]
+    ).any(axis=3)
+    opposite = np.take_along_axis(
+        neighbor_vertices, not_shared.argmax(axis=2)[..., None], axis=2
+    )[..., 0]
+
+    points = tri.points[opposite]
+    predicted = (
+        planes[:, None, 0] * points[..., 0]
+        + planes[:, None, 1] * points[..., 1]
+        + planes[:, None, 2]
+    )
+    deviation = np.abs(values[opposite] - predicted)
+    return (valid & (deviation > tolerance)).any(axis=1)
+
+
+def get_elevations_adaptive(
+    locations: List[Tuple[float, float]],
+    api_key: str,
+    db_path: str = "elevation_cache.db",
+    tolerance_m: float = 0.5,
+    initial_samples: int = 12,
+    max_rounds: int = 8,
+) -> List[float]:
+    """
+    Obtém elevações consultando a API só para parte dos pontos.
+
+    Começa por uma amostra grossa (casca convexa do lote + pontos mais
+    distantes entre si, initial_samples no total), triangula (Delaunay) e,
+    a cada rodada, consulta um novo ponto dentro de cada triângulo cujo
+    relevo local se afasta do plano mais que tolerance_m. Os demais pontos
+    são interpolados linearmente sobre a triangulação (vizinho mais próximo
+    como reserva). Lotes planos ou em rampa uniforme ficam na amostra
+    inicial.
+
+    Parameters:
+        locations: List[Tuple[float, float]] - Lista de coordenadas (lat, lon)
+        api_key: str - Chave da API do Google
+        db_path: str - Caminho para o banco de dados de cache
+        tolerance_m: float - Desvio máximo do plano local (m) sem refinar
+        initial_samples: int - Tamanho da amostra inicial
+        max_rounds: int - Máximo de rodadas de refinamento
+
+    Returns:
+        List[float] - Elevações na ordem de locations (todas None se alguma
+        consulta falhar)
+    """
+    if not locations:
+        return []
+
+    coords = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+    easting, northing, _, _ = _project_utm(coords)
+    xy = np.column_stack([easting, northing])
+    xy -= xy.mean(axis=0)
+    count = len(coords)
+
+    try:
+        hull = ConvexHull(xy).vertices.tolist()
+    except Exception:
+        # Pontos colineares ou repetidos: sem triangulação
+        hull = None
+    if hull is None or count <= initial_samples:
+        return get_elevations_with_cache(locations, api_key, db_path)
+
+    sampled = np.zeros(count, dtype=bool)
+    values = np.full(count, np.nan)
+
+    def fetch(indices) -> bool:
+        elevations = get_elevations_with_cache(
+            [locations[i] for i in indices], api_key, db_path
+        )
+        for i, elevation in zip(indices, elevations):
+            values[i] = np.nan if elevation is None else elevation
+        sampled[indices] = True
+        return all(elevation is not None for elevation in elevations)
+
+    if not fetch(_farthest_point_sample(xy, max(initial_samples, len(hull)), hull)):
+        return [None] * count
+
+    for _ in range(max_rounds):
+        pending = np.flatnonzero(~sampled)
+        if len(pending) == 0:
+            break
+        indices = np.flatnonzero(sampled)
+        tri = Delaunay(xy[indices])
+        rough = _rough_simplices(tri, values[indices], tolerance_m)
+        if not rough.any():
+            break
+
+        simplex = tri.find_simplex(xy[pending])
+        in_rough = simplex >= 0
+        in_rough[in_rough] = rough[simplex[in_rough]]
+        if not in_rough.any():
+            break
+
+        # Um ponto por triângulo irregular: o mais próximo do centróide
+        candidates = pending[in_rough]
+        candidate_simplex = simplex[in_rough]
+        centroids = tri.points[tri.simplices].mean(axis=1)
+        distances = ((xy[candidates] - centroids[candidate_simplex]) ** 2).sum(axis=1)
+        order = np.lexsort((distances, candidate_simplex))
+        _, first = np.unique(candidate_simplex[order], return_index=True)
+        if not fetch(candidates[order[first]].tolist()):
+            return [None] * count
+
+    indices = np.flatnonzero(sampled)
+    rest = np.flatnonzero(~sampled)
+    if len(rest):
+        estimates = LinearNDInterpolator(xy[indices], values[indices])(xy[rest])
+        outside = np.isnan(estimates)
+        if outside.any():
+            estimates[outside] = NearestNDInterpolator(
+                xy[indices], values[indices]
+            )(xy[rest[outside]])
+        values[rest] = estimates
+
+    print(
+        f"Amostragem adaptativa: {len(indices)} de {count} pontos consultados"
+    )
+    return values.tolist()
+
+
+ELEVATION_MODES = ("points", "grid", "dem", "adaptive")
+
+
+def get_elevations(
+    locations: List[Tuple[float, float]],
+    api_key: str,
+    db_path: str = "elevation_cache.db",
+    mode: str = "points",
+) -> List[float]:
+    """
+    Obtém as elevações dos pontos no modo escolhido:
+        points: cada ponto consultado (e cacheado) individualmente
+        grid: nós de uma grade fixa + interpolação bilinear
+            (ELEVATION_GRID_STEP_M, default: 5)
+        dem: tiles DEM locais (DEM_DIR), API apenas onde não há cobertura
+        adaptive: amostra grossa refinada onde o relevo não é plano e
+            interpolação dos demais pontos (ELEVATION_ADAPTIVE_TOLERANCE_M,
+            default: 0.5; ELEVATION_ADAPTIVE_INITIAL_SAMPLES, default: 12)
+    """
+    if mode == "points":
+        return get_elevations_with_cache(locations, api_key, db_path)
+    if mode == "grid":
+        return get_elevations_grid(
+            locations,
+            api_key,
+            db_path,
+            step_m=float(os.getenv("ELEVATION_GRID_STEP_M", "5")),
+        )
+    if mode == "dem":
+        return get_elevations_dem(locations, api_key, db_path)
+    if mode == "adaptive":
+        return get_elevations_adaptive(
+            locations,
+            api_key,
+            db_path,
+            tolerance_m=float(os.getenv("ELEVATION_ADAPTIVE_TOLERANCE_M", "0.5")),
+            initial_samples=int(
+                os.getenv("ELEVATION_ADAPTIVE_INITIAL_SAMPLES", "12")
+            ),
+        )
+    raise ValueError(
+        f"Modo de elevação inválido: {mode} (opções: {', '.join(ELEVATION_MODES)})"
+    )
+
+
 def process_lots_elevation(
     mongodb_uri: str,
     api_key: str,
@@ -155,6 +455,7 @@ def process_lots_elevation(
     doc_id: str = None,
     db_path: str = "elevation_cache.db",
     confidence: float = 0.62,
+    mode: Optional[str] = None,
 ) -> List[Dict]:
     """
     Processa elevações para lotes na collection.
@@ -166,10 +467,20 @@ def process_lots_elevation(
         doc_id (str): ID específico do documento (opcional)
         db_path (str): Caminho para o banco de dados de cache
         confidence (float): Valor mínimo de confiança para processar o documento (default: 0.62)
+        mode (str): Modo de obtenção das elevações (ver get_elevations;
+            default: ELEVATION_MODE ou "points")
 
     Returns:
         List[Dict]: Lista de documentos processados
     """
+    mode = (mode or os.getenv("ELEVATION_MODE", "points")).lower()
+    if mode not in ELEVATION_MODES:
+        raise ValueError(
+            f"Modo de elevação inválido: {mode} (opções: {', '.join(ELEVATION_MODES)})"
+        )
+    if mode == "dem" and get_dem_provider() is None:
+        raise ValueError("Modo de elevação dem requer DEM_DIR")
+
     # Inicializa cache
     init_elevation_cache(db_path)
 
@@ -222,10 +533,19 @@ def process_lots_elevation(
                 print(f"Total de pontos para elevação: {len(points_lat_lon)}")
 
                 # Obtém elevações
-                elevations = get_elevations_with_cache(
-                    points_lat_lon, api_key, db_path
+                elevations = get_elevations(
+                    points_lat_lon, api_key, db_path, mode=mode
                 )
 
+                # Não grava elevações parciais: falhas da API viram erro
+                missing = sum(elevation is None for elevation in elevations)
+                if missing:
+                    print(
+                        f"❌ {missing}/{len(elevations)} elevações não obtidas "
+                        f"para {doc['_id']}, documento não atualizado"
+                    )
+                    continue
+
                 # Atualiza documento com as elevações no novo formato
                 result = collection.update_one(
                     {"_id": doc["_id"]},
@@ -0,0 +1,180 @@
+import math
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Coordenadas inteiras em micrograus (6 casas, como o cache anterior)
+KEY_SCALE = 1_000_000
+LON_BITS = 29  # (180 * 1e6) * 2 < 2**29
+MAX_SQL_VARIABLES = 900
+
+
+def pack_keys(locations: Sequence[Sequence[float]]) -> np.ndarray:
+    """
+    Codifica (lat, lon) em uma chave inteira de 64 bits:
+    round((lat + 90) * 1e6) << 29 | round((lon + 180) * 1e6).
+    """
+    coords = np.asarray(locations, dtype=np.float64).reshape(-1, 2)
+    lat = np.rint((coords[:, 0] + 90.0) * KEY_SCALE).astype(np.int64)
+    lon = np.rint((coords[:, 1] + 180.0) * KEY_SCALE).astype(np.int64)
+    return (lat << LON_BITS) | lon
+
+
+def unpack_keys(keys: Sequence[int]) -> np.ndarray:
+    """Inverso de pack_keys: array Nx2 de (lat, lon)."""
+    keys = np.asarray(keys, dtype=np.int64)
+    lat = (keys >> LON_BITS) / KEY_SCALE - 90.0
+    lon = (keys & ((1 << LON_BITS) - 1)) / KEY_SCALE - 180.0
+    return np.column_stack([lat, lon])
+
+
+class ElevationCache:
+    """
+    Cache SQLite de elevações com uma conexão persistente por processo.
+
+    A conexão usa WAL (leitores não bloqueiam o escritor, inclusive entre
+    processos) e é compartilhada entre threads com um lock. A chave é a
+    lat/lon em micrograus empacotada em um inteiro (INTEGER PRIMARY KEY, o
+    próprio rowid), e cada lote é consultado com um único SELECT ... IN
+    (em blocos de até MAX_SQL_VARIABLES chaves) em vez de um SELECT por
+    ponto.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            db_path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS elevation_points "
+            "(key INTEGER PRIMARY KEY, elevation REAL NOT NULL)"
+        )
+        self._migrate_legacy_table()
+        self.hits = 0
+        self.misses = 0
+
+    def _migrate_legacy_table(self) -> None:
+        """Importa a tabela antiga elevations (lat, lon, elevation), se houver."""
+        legacy = self._conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='elevations'"
+        ).fetchone()
+        if not legacy:
+            return
+        has_rows = self._conn.execute(
+            "SELECT 1 FROM elevation_points LIMIT 1"
+        ).fetchone()
+        if has_rows:
+            return
+        self._conn.execute(
+            f"""
+            INSERT OR IGNORE INTO elevation_points (key, elevation)
+            SELECT (CAST(ROUND((lat + 90) * {KEY_SCALE}) AS INTEGER) << {LON_BITS})
+                   | CAST(ROUND((lon + 180) * {KEY_SCALE}) AS INTEGER),
+                   elevation
+            FROM elevations
+            WHERE elevation IS NOT NULL AND elevation = elevation
+            """
+        )
+
+    def get_by_keys(self, keys: Sequence[int]) -> Dict[int, float]:
+        """Busca as chaves em lote; retorna apenas as encontradas."""
+        unique = list({int(k) for k in keys})
+        found: Dict[int, float] = {}
+        with self._lock:
+            for i in range(0, len(unique), MAX_SQL_VARIABLES):
+                chunk = unique[i : i + MAX_SQL_VARIABLES]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(
+                    self._conn.execute(
+                        "SELECT key, elevation FROM elevation_points "
+                        f"WHERE key IN ({placeholders})",
+                        chunk,
+                    ).fetchall()
+                )
+        return found
+
+    def get_many(
+        self, locations: Sequence[Sequence[float]]
+    ) -> List[Optional[float]]:
+        """Elevações em cache na ordem de locations (None quando ausente)."""
+        if len(locations) == 0:
+            return []
+        keys = pack_keys(locations).tolist()
+        found = self.get_by_keys(keys)
+        result = [found.get(key) for key in keys]
+        hits = sum(value is not None for value in result)
+        self.hits += hits
+        self.misses += len(result) - hits
+        return result
+
+    def put_by_keys(self, items: Sequence[Tuple[int, Optional[float]]]) -> None:
+        """Grava (chave, elevação) em uma transação, ignorando falhas."""
+        rows = [
+            (int(key), float(elevation))
+            for key, elevation in items
+            if elevation is not None and not math.isnan(elevation)
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO elevation_points (key, elevation) "
+                    "VALUES (?, ?)",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def put_many(
+        self,
+        locations: Sequence[Sequence[float]],
+        elevations: Sequence[Optional[float]],
+    ) -> None:
+        if len(locations) == 0:
+            return
+        self.put_by_keys(list(zip(pack_keys(locations).tolist(), elevations)))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM elevation_points"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "db_path": self.db_path,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_caches: Dict[str, ElevationCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_elevation_cache(db_path: str = "elevation_cache.db") -> ElevationCache:
+    """Retorna o cache (conexão persistente) do arquivo db_path."""
+    path = os.path.abspath(db_path)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = ElevationCache(path)
+            _caches[path] = cache
+        return cache
@@ -8,8 +8,7 @@ from pathlib import Path
 import numpy as np
 from pymongo import MongoClient
 from bson import ObjectId
-from google.cloud import storage
-import tempfile
+from ..database.storage import get_storage
 
 
 def find_nearest_point_color(
@@ -199,29 +198,15 @@ def process_lot_csv(client: MongoClient, doc_id: str, bucket_name: str) -> None:
         # Gera o DataFrame
         df = generate_lot_csv(doc)
 
-        # Inicializa cliente do GCS
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
-
-        # Cria arquivo CSV temporário
-        with tempfile.NamedTemporaryFile(
-            mode="w", suffix=".csv", delete=False
-        ) as temp_file:
-            df.to_csv(temp_file.name, index=False)
-            temp_path = temp_file.name
-
-        # Define o caminho do blob
+        # Gera o CSV em memória e envia ao storage (upload em background,
+        # a URL final é retornada imediatamente)
         blob_path = f"csv_files/{doc_id}.csv"
-        blob = bucket.blob(blob_path)
-
-        # Faz upload do arquivo
-        blob.upload_from_filename(temp_path)
-
-        # Remove arquivo temporário
-        os.unlink(temp_path)
-
-        # Gera URL pública
-        csv_url = f"https://storage.cloud.google.com/{bucket_name}/{blob_path}"
+        csv_url = get_storage().upload(
+            bucket_name,
+            blob_path,
+            df.to_csv(index=False).encode("utf-8"),
+            "text/csv",
+        )
 
         # Atualiza o documento com a URL do CSV
         result = collection.update_one(
@@ -4,7 +4,7 @@ import json
 import traceback
 from pymongo import MongoClient
 from bson import ObjectId
-from google.cloud import storage
+from ..database.storage import get_storage
 import tempfile
 from .blender.blender_execution import run_blender_process
 
@@ -32,11 +32,9 @@ def process_lots_glb(
     print(f"Filtro de confiança: >= {confidence}")
 
     client = None
-    storage_client = None
     try:
-        # Inicializa cliente do GCS
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(bucket_name)
+        # Cliente de storage compartilhado (GCS ou local)
+        storage = get_storage()
 
         # Estabelece conexão com MongoDB
         client = MongoClient(mongodb_uri)
@@ -79,14 +77,10 @@ def process_lots_glb(
                     temp_csv = os.path.join(temp_dir, f"{current_doc_id}.csv")
                     temp_glb = os.path.join(temp_dir, f"{current_doc_id}.glb")
 
-                    # Download do CSV do GCS
-                    csv_blob_path = csv_url.replace(
-                        f"https://storage.cloud.google.com/{bucket_name_csv}/",
-                        "",
-                    )
-                    csv_bucket = storage_client.bucket(bucket_name_csv)
-                    csv_blob = csv_bucket.blob(csv_blob_path)
-                    csv_blob.download_to_filename(temp_csv)
+                    # Download do CSV (lido da memória se o upload ainda
+                    # estiver pendente)
+                    with open(temp_csv, "wb") as f:
+                        f.write(storage.download_url(csv_url))
 
                     # Executa processo do Blender
                     print(f"Executando Blender para {current_doc_id}...")
@@ -101,13 +95,15 @@ def process_lots_glb(
                         errors += 1
                         continue
 
-                    # Upload do GLB para GCS
+                    # Upload do GLB a partir da memória
                     glb_blob_path = f"glb_files/{current_doc_id}.glb"
-                    glb_blob = bucket.blob(glb_blob_path)
-                    glb_blob.upload_from_filename(temp_glb)
-
-                    # Gera URL pública
-                    glb_url = f"https://storage.cloud.google.com/{bucket_name}/{glb_blob_path}"
+                    with open(temp_glb, "rb") as f:
+                        glb_url = storage.upload(
+                            bucket_name,
+                            glb_blob_path,
+                            f.read(),
+                            "model/gltf-binary",
+                        )
 
                     # Atualiza o documento com a URL do GLB
                     result = collection.update_one(
@@ -154,9 +150,3 @@ def process_lots_glb(
                 print("✅ Conexão com MongoDB fechada com sucesso")
             except Exception as e:
                 print(f"⚠️ Erro ao fechar conexão com MongoDB: {e}")
-        if storage_client:
-            try:
-                storage_client.close()
-                print("✅ Conexão com GCS fechada com sucesso")
-            except Exception as e:
-                print(f"⚠️ Erro ao fechar conexão com GCS: {e}")
@@ -1,10 +1,10 @@
-import requests
 from typing import List, Dict, Any, Optional, Tuple
 import os
 from math import sqrt, sin, cos, pi
 from collections import defaultdict
 import traceback
 import time
+from ..apis.http_client import http_get
 
 
 def calculate_center(points: List[Dict[str, float]]) -> Dict[str, float]:
@@ -87,7 +87,7 @@ def get_place_details(place_id: str) -> Optional[Dict[str, str]]:
             "key": api_key,
         }
 
-        response = requests.get(url, params=params)
+        response = http_get(url, params=params, provider="google_places")
         response.raise_for_status()
 
         result = response.json()
@@ -194,6 +194,7 @@ def get_snapped_points(
 
             snapped_points = []
             place_ids = set()
+            errors = 0
 
             for point in points:
                 lat, lon = point["lat"], point["lng"]
@@ -207,7 +208,7 @@ def get_snapped_points(
                 try:
                     # Chamada ao OSRM
                     url = f"{MATCH_ENDPOINT}/{coordinates}?geometries=geojson&overview=full&timestamps=0;1"
-                    response = requests.get(url)
+                    response = http_get(url, provider="osrm")
 
                     if response.status_code == 200:
                         data = response.json()
@@ -222,7 +223,9 @@ def get_snapped_points(
 
                             # Obtém o nome da rua usando o OSRM
                             nearest_url = f"{OSRM_SERVER}/nearest/v1/driving/{matched_lon},{matched_lat}?number=1"
-                            nearest_response = requests.get(nearest_url)
+                            nearest_response = http_get(
+                                nearest_url, provider="osrm"
+                            )
 
                             if nearest_response.status_code == 200:
                                 nearest_data = nearest_response.json()
@@ -248,9 +251,15 @@ def get_snapped_points(
                     time.sleep(0.1)  # Pequeno delay entre requisições
 
                 except Exception as e:
+                    errors += 1
                     print(f"Erro ao processar ponto OSRM: {str(e)}")
                     continue
 
+            if not snapped_points and errors:
+                # Falha do OSRM (não apenas pontos sem rua próxima)
+                print(f"Erro: OSRM falhou para {errors}/{len(points)} pontos")
+                return None
+
             return {
                 "snapped_points": snapped_points,
                 "streets_info": [
@@ -269,8 +278,10 @@ def get_snapped_points(
                 "key": api_key,
             }
 
-            response = requests.get(
-                "https://roads.googleapis.com/v1/snapToRoads", params=params
+            response = http_get(
+                "https://roads.googleapis.com/v1/snapToRoads",
+                params=params,
+                provider="google_roads",
             )
 
             if response.status_code != 200:
@@ -0,0 +1,179 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+
+def decode_image(content: bytes) -> Optional[np.ndarray]:
+    """Decodifica bytes JPEG/PNG para um ndarray BGR (None se inválido)."""
+    return cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+
+
+class DecodedImageCache:
+    """
+    LRU em memória de imagens de satélite decodificadas, indexado pela URL
+    da imagem no GCS.
+
+    Cobre o caso em que a detecção e o processamento do mesmo lote rodam em
+    sequência no mesmo processo: o processamento reaproveita a imagem em vez
+    de baixá-la do GCS e decodificá-la de novo. A detecção guarda os bytes
+    já baixados do provedor, que só são decodificados no primeiro acesso.
+
+    As imagens devolvidas são somente leitura (compartilhadas entre etapas);
+    quem precisar desenhar sobre elas deve copiar antes. O TTL limita o
+    tempo em que uma imagem substituída no GCS por outra réplica ainda pode
+    ser servida daqui.
+    """
+
+    def __init__(self, max_entries: int = 16, ttl_seconds: float = 600):
+        self.max_entries = max(int(max_entries), 1)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # chave -> (expira em (monotonic), ndarray ou bytes ainda não decodificados)
+        self._entries: "OrderedDict[str, Tuple[float, Union[np.ndarray, bytes]]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def _store(self, key: str, value: Union[np.ndarray, bytes]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def put(self, key: str, image: np.ndarray) -> np.ndarray:
+        """Armazena uma imagem decodificada e devolve a versão somente leitura."""
+        image.setflags(write=False)
+        self._store(key, image)
+        return image
+
+    def put_encoded(self, key: str, content: bytes) -> None:
+        """Armazena bytes da imagem, decodificados só quando forem lidos."""
+        self._store(key, content)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            expires_at, value = entry
+
+        if isinstance(value, np.ndarray):
+            return value
+
+        image = decode_image(value)
+        if image is None:
+            self.invalidate(key)
+            return None
+        image.setflags(write=False)
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = (expires_at, image)
+        return image
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+_image_cache: Optional[DecodedImageCache] = None
+_image_cache_lock = threading.Lock()
+
+
+def get_image_cache() -> Optional[DecodedImageCache]:
+    """
+    Retorna o LRU de imagens decodificadas do processo (None se desativado).
+
+    Configuração via ambiente:
+        IMAGE_MEMORY_CACHE_ENTRIES: imagens mantidas em memória (default: 16,
+            ~5 MB cada para 1280x1280; 0 desativa)
+        IMAGE_MEMORY_CACHE_TTL_SECONDS: validade das entradas (default: 600)
+    """
+    global _image_cache
+    max_entries = int(os.getenv("IMAGE_MEMORY_CACHE_ENTRIES", "16"))
+    if max_entries <= 0:
+        return None
+
+    with _image_cache_lock:
+        if _image_cache is None:
+            _image_cache = DecodedImageCache(
+                max_entries=max_entries,
+                ttl_seconds=float(
+                    os.getenv("IMAGE_MEMORY_CACHE_TTL_SECONDS", "600")
+                ),
+            )
+        return _image_cache
+
+
+class LotArtifacts:
+    """
+    Artefatos de um lote compartilhados entre as etapas de uma requisição.
+
+    Guarda a imagem de satélite decodificada uma única vez e a entrega às
+    etapas seguintes (cores, miniatura do site, ...). O GCS continua sendo a
+    cópia durável: a imagem só é baixada de lá quando não está no contexto
+    nem no LRU do processo.
+    """
+
+    def __init__(self, doc_id: str):
+        self.doc_id = doc_id
+        self.image_url: Optional[str] = None
+        self._image: Optional[np.ndarray] = None
+
+    def set_image_content(self, image_url: str, content: bytes) -> None:
+        """Registra a imagem recém-obtida (bytes enviados ao GCS)."""
+        self.image_url = image_url
+        self._image = decode_image(content)
+        if self._image is None:
+            return
+        cache = get_image_cache()
+        if cache:
+            self._image = cache.put(image_url, self._image)
+        else:
+            self._image.setflags(write=False)
+
+    def get_image(self, doc: dict) -> Optional[np.ndarray]:
+        """
+        Imagem do lote: do contexto, senão do LRU/provedor/GCS (carregada uma
+        única vez por requisição). None se o documento ainda não tem imagem.
+        """
+        if self._image is not None:
+            return self._image
+
+        url = doc.get("image_info", {}).get("url")
+        if not url:
+            return None
+
+        from .colors import load_lot_image
+
+        self._image = load_lot_image(doc)
+        if self._image is not None:
+            self.image_url = url
+        return self._image
@@ -0,0 +1,146 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Dict, Optional
+
+from .model_registry import model_registry
+
+
+def _init_pool_worker(model_path: str, torch_threads: int) -> None:
+    """
+    Inicializador de cada processo do pool: limita as threads do torch e
+    carrega/aquece o modelo no registro do próprio processo.
+    """
+    if torch_threads > 0:
+        try:
+            import torch
+
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+    model_registry.load(model_path)
+
+
+def _worker_ready() -> int:
+    """Tarefa vazia usada para garantir que um worker subiu e está aquecido."""
+    return os.getpid()
+
+
+class InferencePool:
+    """
+    Pool de processos dedicado à inferência YOLO.
+
+    Cada processo carrega o modelo uma única vez no startup (initializer), de
+    forma que decode, resize e inferência rodam fora do event loop da API e
+    podem usar todos os núcleos da máquina.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        workers: int,
+        torch_threads: Optional[int] = None,
+    ):
+        self.model_path = os.path.abspath(model_path)
+        self.workers = max(int(workers), 1)
+        if torch_threads is None:
+            torch_threads = max((os.cpu_count() or 1) // self.workers, 1)
+        self.torch_threads = torch_threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_pool_worker,
+            initargs=(self.model_path, self.torch_threads),
+        )
+        self._ready = threading.Event()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        return self._executor
+
+    def warmup(self, timeout: Optional[float] = None) -> bool:
+        """
+        Sobe todos os processos do pool (cada um carrega e aquece o modelo) e
+        marca o pool como pronto.
+        """
+        futures = [
+            self._executor.submit(_worker_ready) for _ in range(self.workers)
+        ]
+        done, not_done = wait(futures, timeout=timeout)
+        for future in done:
+            future.result()
+        if not not_done:
+            self._ready.set()
+            print(f"Pool de inferência pronto com {self.workers} processos")
+        return self._ready.is_set()
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def status(self) -> dict:
+        return {
+            "model_path": self.model_path,
+            "workers": self.workers,
+            "torch_threads": self.torch_threads,
+            "ready": self.is_ready(),
+        }
+
+    def shutdown(self) -> None:
+        self._ready.clear()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Um pool por modelo (caminho absoluto)
+_pools: Dict[str, InferencePool] = {}
+_pool_lock = threading.Lock()
+
+
+def get_pool_workers() -> int:
+    """
+    Número de processos do pool de inferência (INFERENCE_POOL_WORKERS).
+    Por padrão usa metade dos núcleos; 0 desativa o pool e a inferência roda
+    em uma thread do próprio processo da API.
+    """
+    value = os.getenv("INFERENCE_POOL_WORKERS")
+    if value is None or value == "":
+        return max((os.cpu_count() or 2) // 2, 1)
+    return max(int(value), 0)
+
+
+def get_inference_pool(model_path: Optional[str] = None) -> Optional[InferencePool]:
+    """
+    Retorna o pool de inferência do modelo model_path (default:
+    YOLO_MODEL_PATH), criando-o na primeira chamada para esse modelo; cada
+    modelo tem os próprios processos. Retorna None quando o pool está
+    desativado.
+    """
+    workers = get_pool_workers()
+    if workers == 0:
+        return None
+
+    model_path = model_path or os.getenv("YOLO_MODEL_PATH")
+    if not model_path:
+        raise ValueError("YOLO_MODEL_PATH not found")
+    key = os.path.abspath(model_path)
+
+    with _pool_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            threads = os.getenv("INFERENCE_POOL_TORCH_THREADS")
+            pool = InferencePool(
+                model_path,
+                workers,
+                torch_threads=int(threads) if threads else None,
+            )
+            _pools[key] = pool
+        return pool
+
+
+def shutdown_inference_pool() -> None:
+    """Encerra os pools de inferência, se existirem."""
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
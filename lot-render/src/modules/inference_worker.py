@@ -0,0 +1,181 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class InferenceQueueFull(Exception):
+    """Fila de inferência cheia: a requisição é rejeitada em vez de esperar."""
+
+
+class InferenceWorker:
+    """
+    Worker de inferência com micro-batching dinâmico.
+
+    Requisições concorrentes enviam imagens via submit(); uma thread dedicada
+    agrupa as imagens que chegam dentro de uma janela (batch_window_ms) ou até
+    max_batch_size itens, executa batch_fn uma única vez para o lote inteiro e
+    devolve a cada chamador o seu próprio resultado.
+
+    batch_fn recebe uma lista de entradas e deve retornar uma lista de
+    resultados do mesmo tamanho e na mesma ordem.
+
+    Se executor for informado (ex.: um pool de processos), cada lote é
+    submetido a ele e a thread volta imediatamente a agrupar o próximo lote,
+    permitindo vários lotes em paralelo. Nesse caso batch_fn precisa ser
+    serializável (função de módulo ou functools.partial).
+
+    max_pending limita o número de itens na fila ou em execução; acima disso
+    submit() levanta InferenceQueueFull.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        batch_window_ms: float = 20.0,
+        max_batch_size: int = 8,
+        executor: Optional[Executor] = None,
+        max_pending: Optional[int] = None,
+        name: str = "inference-worker",
+    ):
+        self.batch_fn = batch_fn
+        self.batch_window = max(batch_window_ms, 0.0) / 1000.0
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.executor = executor
+        self.max_pending = max_pending
+        self.name = name
+        self._queue: "queue.Queue[Optional[Tuple[Any, Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.batches_run = 0
+        self.items_processed = 0
+
+    @property
+    def pending(self) -> int:
+        """Itens aguardando na fila ou em execução."""
+        return self._pending
+
+    def start(self) -> None:
+        """Inicia a thread do worker (idempotente)."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name=self.name, daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Sinaliza o fim do worker e aguarda a thread terminar."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def submit(self, item: Any) -> Future:
+        """Enfileira um item e retorna um Future com o seu resultado."""
+        self.start()
+        with self._lock:
+            if self.max_pending is not None and self._pending >= self.max_pending:
+                raise InferenceQueueFull(
+                    f"Fila de inferência cheia ({self._pending} itens pendentes)"
+                )
+            self._pending += 1
+        future: Future = Future()
+        future.add_done_callback(self._release)
+        self._queue.put((item, future))
+        return future
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def infer(self, item: Any) -> Any:
+        """Versão awaitable de submit() para uso nos serviços FastAPI."""
+        return await asyncio.wrap_future(self.submit(item))
+
+    def _collect_batch(self, first: Tuple[Any, Future]) -> Tuple[list, bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stopping = self._collect_batch(first)
+            self._process(batch)
+            if stopping:
+                return
+
+    def _process(self, batch: List[Tuple[Any, Future]]) -> None:
+        # Ignora chamadores que já desistiram (ex.: requisição cancelada)
+        batch = [
+            (item, future)
+            for item, future in batch
+            if future.set_running_or_notify_cancel()
+        ]
+        if not batch:
+            return
+
+        items = [item for item, _ in batch]
+        if self.executor is None:
+            try:
+                results = self.batch_fn(items)
+            except Exception as e:
+                self._fail(batch, e)
+                return
+            self._deliver(batch, results)
+            return
+
+        try:
+            batch_future = self.executor.submit(self.batch_fn, items)
+        except Exception as e:
+            self._fail(batch, e)
+            return
+
+        def on_done(done: Future) -> None:
+            try:
+                results = done.result()
+            except Exception as e:
+                self._fail(batch, e)
+                return
+            self._deliver(batch, results)
+
+        batch_future.add_done_callback(on_done)
+
+    def _fail(self, batch: List[Tuple[Any, Future]], error: Exception) -> None:
+        for _, future in batch:
+            future.set_exception(error)
+
+    def _deliver(self, batch: List[Tuple[Any, Future]], results: List[Any]) -> None:
+        if len(results) != len(batch):
+            self._fail(
+                batch,
+                RuntimeError(
+                    f"batch_fn retornou {len(results)} resultados para {len(batch)} itens"
+                ),
+            )
+            return
+
+        self.batches_run += 1
+        self.items_processed += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
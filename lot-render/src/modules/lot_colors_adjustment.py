@@ -1,34 +1,34 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy.spatial import cKDTree
 
-# Função para encontrar a cor média de pontos próximos não escuros
-def get_replacement_color(point, data, radius=2.0):
-    x, y, z = point['x'], point['y'], point['z']
-    # Filtrar pontos próximos
-    nearby_points = data[
-        (~data['is_dark']) &  # Apenas pontos não escuros
-        (np.abs(data['x'] - x) <= radius) & 
-        (np.abs(data['y'] - y) <= radius) &
-        (np.abs(data['z'] - z) <= radius)
-    ]
-    if nearby_points.empty:
-        return None  # Nenhum ponto próximo encontrado
-    # Calcular a média de R, G, B dos pontos próximos
-    avg_r = nearby_points['r'].mean()
-    avg_g = nearby_points['g'].mean()
-    avg_b = nearby_points['b'].mean()
-    return int(avg_r), int(avg_g), int(avg_b)
+def _replace_outliers(data, is_outlier, radius=2.0):
+    """
+    Troca a cor de cada ponto marcado em is_outlier pela média das cores dos
+    pontos não marcados a até radius (em x, y e z); pontos sem vizinhos
+    ficam como estão.
+    """
+    targets = np.flatnonzero(is_outlier)
+    means, found = _replacement_colors(
+        data[['x', 'y', 'z']].to_numpy(dtype=np.float64),
+        data[['r', 'g', 'b']].to_numpy(),
+        targets,
+        np.flatnonzero(~is_outlier),
+        radius,
+    )
+    if found.any():
+        data.loc[data.index[targets[found]], ['r', 'g', 'b']] = means[found]
 
 # Função para corrigir cores escuras
 def correct_dark_colors(data, dark_threshold=50, radius=2.0):
     data['is_dark'] = data[['r', 'g', 'b']].mean(axis=1) < dark_threshold
-    for index, row in data[data['is_dark']].iterrows():
-        replacement_color = get_replacement_color(row, data, radius)
-        if replacement_color:
-            data.loc[index, ['r', 'g', 'b']] = replacement_color
+    _replace_outliers(data, data['is_dark'].to_numpy(), radius)
     # Atualizar a coluna 'hex_color'
-    data['hex_color'] = data.apply(lambda row: f"#{int(row['r']):02x}{int(row['g']):02x}{int(row['b']):02x}", axis=1)
+    data['hex_color'] = [
+        f"#{int(r):02x}{int(g):02x}{int(b):02x}"
+        for r, g, b in data[['r', 'g', 'b']].to_numpy()
+    ]
     return data
 
 # Função para plotar os pontos antes e depois da correção
@@ -62,31 +62,6 @@ def plot_points_before_after(data_original, data_corrected):
     plt.tight_layout(rect=[0, 0, 1, 0.96])
     plt.show()
 
-def get_replacement_color_for_bright(point, data, radius=2.0):
-    """
-    Encontra a cor média de pontos próximos não brancos.
-    
-    Parameters:
-        point: Series - Ponto atual com coordenadas e cores
-        data: DataFrame - DataFrame com todos os pontos
-        radius: float - Raio de busca para pontos próximos
-    """
-    x, y, z = point['x'], point['y'], point['z']
-    # Filtrar pontos próximos
-    nearby_points = data[
-        (~data['is_bright']) &  # Apenas pontos não brancos
-        (np.abs(data['x'] - x) <= radius) & 
-        (np.abs(data['y'] - y) <= radius) &
-        (np.abs(data['z'] - z) <= radius)
-    ]
-    if nearby_points.empty:
-        return None
-    # Calcular a média de R, G, B dos pontos próximos
-    avg_r = nearby_points['r'].mean()
-    avg_g = nearby_points['g'].mean()
-    avg_b = nearby_points['b'].mean()
-    return int(avg_r), int(avg_g), int(avg_b)
-
 def correct_bright_colors(data, bright_threshold=240, radius=2.0):
     """
     Corrige cores muito claras (brancas) substituindo pela média das cores próximas.
@@ -100,10 +75,7 @@ def correct_bright_colors(data, bright_threshold=240, radius=2.0):
     data['is_bright'] = data[['r', 'g', 'b']].mean(axis=1) > bright_threshold
     
     # Corrige cores muito claras
-    for index, row in data[data['is_bright']].iterrows():
-        replacement_color = get_replacement_color_for_bright(row, data, radius)
-        if replacement_color:
-            data.loc[index, ['r', 'g', 'b']] = replacement_color
+    _replace_outliers(data, data['is_bright'].to_numpy(), radius)
     
     return data
 
@@ -122,3 +94,68 @@ def correct_colors(data, dark_threshold=50, bright_threshold=240, radius=2.0):
     # Depois corrige as cores claras
     data = correct_bright_colors(data, bright_threshold, radius)
     return data
+
+def _replacement_colors(positions, colors, targets, sources, radius):
+    """
+    Média (truncada) das cores dos pontos sources a até radius, em cada eixo,
+    de cada ponto de targets. Retorna (médias, encontrou_vizinho).
+
+    Uma única consulta em lote numa cKDTree dos sources com distância de
+    Chebyshev (p=inf), equivalente ao filtro |dx|, |dy|, |dz| <= radius.
+    """
+    means = np.zeros((len(targets), 3), dtype=np.int64)
+    found = np.zeros(len(targets), dtype=bool)
+    if len(targets) == 0 or len(sources) == 0:
+        return means, found
+    tree = cKDTree(positions[sources])
+    neighbours = tree.query_ball_point(positions[targets], r=radius, p=np.inf)
+    counts = np.fromiter((len(n) for n in neighbours), dtype=np.int64, count=len(targets))
+    found = counts > 0
+    if not found.any():
+        return means, found
+    owners = np.repeat(np.arange(len(targets)), counts)
+    members = np.concatenate([n for n in neighbours if n]).astype(np.int64)
+    source_colors = colors[sources].astype(np.float64)
+    for channel in range(3):
+        sums = np.bincount(owners, weights=source_colors[members, channel], minlength=len(targets))
+        means[found, channel] = (sums[found] / counts[found]).astype(np.int64)
+    return means, found
+
+def correct_colors_array(colors, positions=None, dark_threshold=50, bright_threshold=240, radius=2.0):
+    """
+    Versão vetorizada de correct_colors sobre um array de cores, com o mesmo
+    resultado: primeiro as cores escuras e depois as claras são trocadas pela
+    média dos pontos não escuros/não claros a até radius (em x, y e z).
+
+    Parameters:
+        colors: array (N, 3) - Cores RGB
+        positions: array (N, 2) ou (N, 3) - Coordenadas x, y[, z] dos pontos
+            (z = 0 quando ausente)
+        dark_threshold: int - Valor máximo para considerar uma cor como escura
+        bright_threshold: int - Valor mínimo para considerar uma cor como branca
+        radius: float - Raio de busca para pontos próximos
+
+    Returns:
+        array (N, 3) - Cores RGB corrigidas (int64)
+    """
+    corrected = np.array(colors, dtype=np.int64).reshape(-1, 3)
+    if positions is None:
+        positions = np.zeros((len(corrected), 3))
+    positions = np.asarray(positions, dtype=np.float64).reshape(len(corrected), -1)
+    if positions.shape[1] == 2:
+        positions = np.column_stack([positions, np.zeros(len(positions))])
+
+    # Cores escuras (média dos canais abaixo do threshold)
+    is_dark = corrected.mean(axis=1) < dark_threshold
+    means, found = _replacement_colors(
+        positions, corrected, np.flatnonzero(is_dark), np.flatnonzero(~is_dark), radius
+    )
+    corrected[np.flatnonzero(is_dark)[found]] = means[found]
+
+    # Cores claras, avaliadas após a correção das escuras
+    is_bright = corrected.mean(axis=1) > bright_threshold
+    means, found = _replacement_colors(
+        positions, corrected, np.flatnonzero(is_bright), np.flatnonzero(~is_bright), radius
+    )
+    corrected[np.flatnonzero(is_bright)[found]] = means[found]
+    return corrected
@@ -0,0 +1,172 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .segmentation_engines import load_segmentation_model, resolve_model_path
+
+
+def _model_files(path: str) -> list:
+    """Arquivos que compõem o modelo (o IR do OpenVINO tem .xml + .bin)."""
+    files = [path]
+    weights = os.path.splitext(path)[0] + ".bin"
+    if path.endswith(".xml") and os.path.exists(weights):
+        files.append(weights)
+    return files
+
+
+def compute_file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Calcula o hash SHA-256 de um arquivo (lido em blocos).
+    """
+    sha = hashlib.sha256()
+    for file_path in _model_files(path):
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Registro de modelos YOLO compartilhado pelo processo.
+
+    Cada modelo é carregado uma única vez, indexado pelo caminho e pelo hash
+    do arquivo, e aquecido com uma inferência dummy 512x512. As funções de
+    detecção pegam o modelo emprestado daqui em vez de reconstruí-lo a cada
+    requisição.
+
+    O caminho informado (ex.: best.pt) é resolvido para o artefato da engine
+    configurada em YOLO_ENGINE (torch, onnx ou openvino).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # (path, hash) -> modelo carregado
+        self._models: Dict[Tuple[str, str], Any] = {}
+        # path -> (fingerprint dos arquivos, hash)
+        self._hashes: Dict[str, Tuple[Tuple[int, ...], str]] = {}
+        self._warm: Dict[Tuple[str, str], float] = {}
+        self._errors: Dict[str, str] = {}
+        self.default_path: Optional[str] = None
+
+    def _resolve_path(self, model_path: Optional[str]) -> str:
+        model_path = model_path or self.default_path or os.getenv(
+            "YOLO_MODEL_PATH"
+        )
+        if not model_path:
+            raise ValueError("YOLO_MODEL_PATH not found")
+        return os.path.abspath(resolve_model_path(model_path))
+
+    def model_hash(self, model_path: Optional[str] = None) -> str:
+        """
+        Retorna o hash do arquivo do modelo, recalculando apenas se o arquivo
+        mudou (mtime/tamanho) desde a última leitura.
+        """
+        path = self._resolve_path(model_path)
+        fingerprint = tuple(
+            value
+            for file_path in _model_files(path)
+            for value in (
+                os.stat(file_path).st_mtime_ns,
+                os.stat(file_path).st_size,
+            )
+        )
+        with self._lock:
+            cached = self._hashes.get(path)
+            if cached and cached[0] == fingerprint:
+                return cached[1]
+            file_hash = compute_file_hash(path)
+            self._hashes[path] = (fingerprint, file_hash)
+            return file_hash
+
+    def _build_model(self, path: str):
+        return load_segmentation_model(path)
+
+    def warmup(self, model) -> None:
+        """Executa uma inferência dummy 512x512 para aquecer o modelo."""
+        dummy = np.zeros((512, 512, 3), dtype=np.uint8)
+        if hasattr(model, "predict_segments"):
+            model.predict_segments([dummy])
+        else:
+            model(dummy, verbose=False)
+
+    def load(self, model_path: Optional[str] = None, warmup: bool = True):
+        """
+        Carrega (se necessário) e aquece o modelo, tornando-o o padrão do
+        registro. Chamado no startup da API.
+        """
+        path = self._resolve_path(model_path)
+        try:
+            model = self.get(path)
+            key = (path, self.model_hash(path))
+            if warmup and key not in self._warm:
+                start = time.perf_counter()
+                self.warmup(model)
+                with self._lock:
+                    self._warm[key] = time.perf_counter() - start
+                print(
+                    f"Modelo YOLO aquecido em {self._warm[key]:.2f}s ({path})"
+                )
+            with self._lock:
+                if self.default_path is None:
+                    self.default_path = path
+                self._errors.pop(path, None)
+            return model
+        except Exception as e:
+            with self._lock:
+                self._errors[path] = str(e)
+            print(f"Erro ao carregar modelo YOLO {path}: {str(e)}")
+            raise
+
+    def get(self, model_path: Optional[str] = None):
+        """
+        Retorna o modelo registrado para o caminho, carregando-o na primeira
+        chamada ou quando o arquivo mudou no disco.
+        """
+        path = self._resolve_path(model_path)
+        key = (path, self.model_hash(path))
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                print(f"Carregando modelo YOLO {path} ({key[1][:12]})...")
+                model = self._build_model(path)
+                # Remove versões antigas do mesmo caminho
+                for old_key in [k for k in self._models if k[0] == path]:
+                    self._models.pop(old_key, None)
+                    self._warm.pop(old_key, None)
+                self._models[key] = model
+            return model
+
+    def is_ready(self, model_path: Optional[str] = None) -> bool:
+        """True quando o modelo padrão (ou o informado) está carregado e aquecido."""
+        try:
+            path = self._resolve_path(model_path)
+        except ValueError:
+            return False
+        with self._lock:
+            cached = self._hashes.get(path)
+            return bool(cached) and (path, cached[1]) in self._warm
+
+    def status(self) -> Dict[str, Any]:
+        """Resumo do estado do registro para o probe de readiness."""
+        with self._lock:
+            return {
+                "default_path": self.default_path,
+                "models": [
+                    {
+                        "path": path,
+                        "hash": file_hash,
+                        "warm": (path, file_hash) in self._warm,
+                        "warmup_seconds": self._warm.get((path, file_hash)),
+                    }
+                    for path, file_hash in self._models
+                ],
+                "errors": dict(self._errors),
+            }
+
+
+model_registry = ModelRegistry()
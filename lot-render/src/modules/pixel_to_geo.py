@@ -1,5 +1,6 @@
 import math
 import re
+import numpy as np
 from math import radians, sin, cos, sqrt, atan2
 
 # Constante do tamanho padrão dos tiles
@@ -160,3 +161,97 @@ def lat_lon_to_pixel_normalized(
     y_normalized = pixel_y / image_height
 
     return x_normalized, y_normalized
+
+
+def latlon_to_world_pixel_array(latlon, zoom, scale):
+    """
+    Versão vetorizada de latlon_to_world_pixel.
+
+    Parameters:
+        latlon (array-like): Array (N, 2) com [lat, lon].
+        zoom (int): Nível de zoom.
+        scale (int): Fator de escala (ex: 2).
+
+    Returns:
+        np.ndarray: Array (N, 2) com [x, y] em pixels no mundo.
+    """
+    latlon = np.asarray(latlon, dtype=np.float64).reshape(-1, 2)
+    sin_lat = np.sin(latlon[:, 0] * math.pi / 180)
+    map_size = TILE_SIZE * (2**zoom) * scale
+    world = np.empty_like(latlon)
+    world[:, 0] = (latlon[:, 1] + 180) / 360 * map_size
+    world[:, 1] = (
+        0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    ) * map_size
+    return world
+
+
+def world_pixel_to_latlon_array(world, zoom, scale):
+    """
+    Versão vetorizada de world_pixel_to_latlon: (N, 2) [x, y] -> (N, 2) [lat, lon].
+    """
+    world = np.asarray(world, dtype=np.float64).reshape(-1, 2)
+    map_size = TILE_SIZE * (2**zoom) * scale
+    latlon = np.empty_like(world)
+    latlon[:, 1] = (world[:, 0] / map_size) * 360.0 - 180.0
+    y_fraction = 0.5 - (world[:, 1] / map_size)
+    lat_rad = 2 * np.arctan(np.exp(y_fraction * 2 * math.pi)) - math.pi / 2
+    latlon[:, 0] = lat_rad * 180 / math.pi
+    return latlon
+
+
+def pixel_to_latlon_array(
+    pixels,
+    center_lat,
+    center_lon,
+    zoom,
+    scale,
+    image_width,
+    image_height,
+):
+    """
+    Versão vetorizada de pixel_to_latlon.
+
+    Parameters:
+        pixels (array-like): Array (N, 2) com [x, y] em pixels na imagem.
+        center_lat, center_lon, zoom, scale, image_width, image_height:
+            Mesmos parâmetros de pixel_to_latlon.
+
+    Returns:
+        np.ndarray: Array (N, 2) com [lat, lon] de cada pixel.
+    """
+    top_left_x, top_left_y = get_top_left_world_pixel(
+        center_lat, center_lon, zoom, scale, image_width, image_height
+    )
+    world = np.asarray(pixels, dtype=np.float64).reshape(-1, 2) + (
+        top_left_x,
+        top_left_y,
+    )
+    return world_pixel_to_latlon_array(world, zoom, scale)
+
+
+def lat_lon_to_pixel_normalized_array(
+    latlon,
+    center_lat,
+    center_lon,
+    zoom,
+    scale,
+    image_width,
+    image_height,
+):
+    """
+    Versão vetorizada de lat_lon_to_pixel_normalized.
+
+    Parameters:
+        latlon (array-like): Array (N, 2) com [lat, lon].
+        center_lat, center_lon, zoom, scale, image_width, image_height:
+            Mesmos parâmetros de lat_lon_to_pixel_normalized.
+
+    Returns:
+        np.ndarray: Array (N, 2) com [x, y] normalizados (0-1) na imagem.
+    """
+    top_left_x, top_left_y = get_top_left_world_pixel(
+        center_lat, center_lon, zoom, scale, image_width, image_height
+    )
+    world = latlon_to_world_pixel_array(latlon, zoom, scale)
+    return (world - (top_left_x, top_left_y)) / (image_width, image_height)
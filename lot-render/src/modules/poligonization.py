@@ -28,6 +28,98 @@ def calculate_polygon_area(points: np.ndarray) -> float:
     return area
 
 
+class PolygonAdjuster:
+    """
+    Ajuste geométrico de um polígono de segmentação, feito diretamente sobre
+    os vértices (sem rasterizar a máscara e extrair o contorno de novo).
+
+    O contorno em pixels, o fecho convexo, o perímetro e a área são
+    calculados uma única vez e compartilhados por todos os métodos de ajuste.
+    """
+
+    def __init__(self, polygon: np.ndarray, size: tuple = (512, 512)):
+        h, w = size
+        self.scale = np.array([w, h], dtype=np.float64)
+        self.polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+        self.area = calculate_polygon_area(self.polygon)
+
+        # Contorno em pixels no formato esperado pelo OpenCV (N, 1, 2)
+        self.contour = (self.polygon * self.scale).astype(np.float32).reshape(
+            -1, 1, 2
+        )
+        self.is_valid = len(self.polygon) >= 3 and self.area > 0
+        if self.is_valid:
+            # Mesma convenção do findContours (o approxPolyDP depende do
+            # ponto inicial): começa no vértice mais acima/à esquerda e
+            # percorre com área orientada negativa
+            if cv2.contourArea(self.contour, oriented=True) > 0:
+                self.contour = self.contour[::-1]
+            pts = self.contour.reshape(-1, 2)
+            start = np.lexsort((pts[:, 0], pts[:, 1]))[0]
+            self.contour = np.roll(self.contour, -start, axis=0)
+        self.hull = cv2.convexHull(self.contour) if self.is_valid else None
+        self.perimeter = (
+            cv2.arcLength(self.contour, True) if self.is_valid else 0.0
+        )
+
+    def _normalize(self, points: np.ndarray) -> np.ndarray:
+        return points.reshape(-1, 2).astype(float) / self.scale
+
+    def min_rect(self) -> Optional[np.ndarray]:
+        """Retângulo de área mínima (calculado sobre o fecho convexo)."""
+        if not self.is_valid:
+            return None
+        rect = cv2.minAreaRect(self.hull)
+        return self._normalize(cv2.boxPoints(rect))
+
+    def approx_poly(
+        self,
+        epsilon_factor: float = 0.04,
+        min_points: int = 4,
+        max_points: int = 6,
+    ) -> Optional[np.ndarray]:
+        """
+        Aproximação poligonal (Douglas-Peucker) com busca binária do epsilon
+        para obter entre min_points e max_points vértices.
+        """
+        if not self.is_valid:
+            return None
+
+        # Busca binária para encontrar o melhor epsilon
+        epsilon_min = epsilon_factor * 0.5
+        epsilon_max = epsilon_factor * 2.0
+        best_approx = None
+        best_points = 0
+
+        for _ in range(10):  # Máximo de 10 tentativas
+            epsilon = (epsilon_min + epsilon_max) / 2
+            current_epsilon = epsilon * self.perimeter
+            approx = cv2.approxPolyDP(self.contour, current_epsilon, True)
+            num_points = len(approx)
+
+            if num_points >= min_points and num_points <= max_points:
+                best_approx = approx
+                break
+            elif num_points > max_points:
+                epsilon_min = epsilon
+            else:
+                epsilon_max = epsilon
+
+            # Guarda a melhor aproximação até agora
+            if best_approx is None or abs(
+                num_points - (min_points + max_points) / 2
+            ) < abs(best_points - (min_points + max_points) / 2):
+                best_approx = approx
+                best_points = num_points
+
+        if best_approx is None:
+            return None
+
+        points = self._normalize(best_approx)
+        print(f"Polígono ajustado com {len(points)} pontos")
+        return points
+
+
 def adjust_mask_with_min_rect(
     segmentation_data: dict, size: tuple = (512, 512)
 ) -> np.ndarray:
@@ -41,36 +133,7 @@ def adjust_mask_with_min_rect(
     Returns:
         np.ndarray - Array com as coordenadas normalizadas do polígono ajustado
     """
-    h, w = size
-
-    # Cria máscara binária a partir do polígono original
-    original_polygon = segmentation_data["polygon"]
-    mask = np.zeros((h, w), dtype=np.uint8)
-    points = np.array(original_polygon * [w, h], dtype=np.int32)
-    cv2.fillPoly(mask, [points], 1)
-
-    # Encontra contornos
-    mask_uint8 = mask.astype(np.uint8) * 255
-    contours, _ = cv2.findContours(
-        mask_uint8, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-    )
-
-    if not contours:
-        return None
-
-    # Pega o maior contorno
-    largest_contour = max(contours, key=cv2.contourArea)
-
-    # Aplica minimum area rectangle
-    rect = cv2.minAreaRect(largest_contour)
-    points = cv2.boxPoints(rect)
-
-    # Normaliza as coordenadas (0..1)
-    points = points.astype(float)
-    points[:, 0] /= w
-    points[:, 1] /= h
-
-    return points
+    return PolygonAdjuster(segmentation_data["polygon"], size).min_rect()
 
 
 def adjust_mask_with_approx_poly(
@@ -95,65 +158,10 @@ def adjust_mask_with_approx_poly(
     Returns:
         np.ndarray - Array com as coordenadas normalizadas do polígono ajustado
     """
-    h, w = size
-
-    # Cria máscara binária a partir do polígono original
-    original_polygon = segmentation_data["polygon"]
-    mask = np.zeros((h, w), dtype=np.uint8)
-    points = np.array(original_polygon * [w, h], dtype=np.int32)
-    cv2.fillPoly(mask, [points], 1)
-
-    # Encontra contornos
-    mask_uint8 = mask.astype(np.uint8) * 255
-    contours, _ = cv2.findContours(
-        mask_uint8, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+    return PolygonAdjuster(segmentation_data["polygon"], size).approx_poly(
+        epsilon_factor, min_points, max_points
     )
 
-    if not contours:
-        return None
-
-    # Pega o maior contorno
-    largest_contour = max(contours, key=cv2.contourArea)
-    perimeter = cv2.arcLength(largest_contour, True)
-
-    # Busca binária para encontrar o melhor epsilon
-    epsilon_min = epsilon_factor * 0.5
-    epsilon_max = epsilon_factor * 2.0
-    best_approx = None
-    best_points = 0
-
-    for _ in range(10):  # Máximo de 10 tentativas
-        epsilon = (epsilon_min + epsilon_max) / 2
-        current_epsilon = epsilon * perimeter
-        approx = cv2.approxPolyDP(largest_contour, current_epsilon, True)
-        num_points = len(approx)
-
-        if num_points >= min_points and num_points <= max_points:
-            best_approx = approx
-            break
-        elif num_points > max_points:
-            epsilon_min = epsilon
-        else:
-            epsilon_max = epsilon
-
-        # Guarda a melhor aproximação até agora
-        if best_approx is None or abs(
-            num_points - (min_points + max_points) / 2
-        ) < abs(best_points - (min_points + max_points) / 2):
-            best_approx = approx
-            best_points = num_points
-
-    if best_approx is None:
-        return None
-
-    # Normaliza as coordenadas (0..1)
-    points = best_approx.reshape(-1, 2).astype(float)
-    points[:, 0] /= w
-    points[:, 1] /= h
-
-    print(f"Polígono ajustado com {len(points)} pontos")
-    return points
-
 
 def is_polygon_convex(points: np.ndarray) -> bool:
     """
@@ -232,18 +240,22 @@ def select_best_polygon_adjustment(
     """
     Seleciona o melhor método de ajuste de polígono baseado na diferença de área
     e na convexidade do polígono.
+
+    Contorno, fecho convexo e área do polígono original são calculados uma
+    única vez (PolygonAdjuster) e reaproveitados por todos os métodos.
     """
+    adjuster = PolygonAdjuster(segmentation_data["polygon"], size)
+
     # Tenta primeiro com minimum area rectangle
-    min_rect_polygon = adjust_mask_with_min_rect(segmentation_data, size)
+    min_rect_polygon = adjuster.min_rect()
     if min_rect_polygon is None:
         return None, "none"
 
     # Calcula área do retângulo mínimo em pixels (normalizada)
     min_rect_area_pixels = calculate_polygon_area(min_rect_polygon)
 
-    # Calcula área do polígono original em pixels (normalizada)
-    original_polygon = segmentation_data["polygon"]
-    original_area_pixels = calculate_polygon_area(original_polygon)
+    # Área do polígono original em pixels (normalizada)
+    original_area_pixels = adjuster.area
 
     # Calcula a diferença relativa entre as áreas para min_rect
     min_rect_area_difference = (
@@ -258,11 +270,8 @@ def select_best_polygon_adjustment(
         return min_rect_polygon, "min_rect"
 
     # Se min_rect não está dentro do threshold, tenta com aproximação poligonal
-    approx_polygon = adjust_mask_with_approx_poly(
-        segmentation_data,
-        size=size,
-        min_points=min_points,
-        max_points=max_points,
+    approx_polygon = adjuster.approx_poly(
+        min_points=min_points, max_points=max_points
     )
 
     # Se approx_poly é válido e convexo, calcula sua diferença de área
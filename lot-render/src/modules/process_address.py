@@ -5,6 +5,7 @@ import traceback
 from pymongo import MongoClient
 from bson import ObjectId
 import googlemaps
+from ..apis.http_client import get_session, http_timeouts
 
 
 def extract_address_components(result: Dict[str, Any]) -> Dict[str, Any]:
@@ -70,8 +71,14 @@ def process_lot_address(
 
     client = None
     try:
-        # Inicializa cliente do Google Maps
-        gmaps = googlemaps.Client(key=google_maps_api_key)
+        # Inicializa cliente do Google Maps (sessão HTTP compartilhada)
+        connect_timeout, read_timeout = http_timeouts()
+        gmaps = googlemaps.Client(
+            key=google_maps_api_key,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            requests_session=get_session(),
+        )
 
         # Estabelece conexão com MongoDB
         client = MongoClient(mongodb_uri)
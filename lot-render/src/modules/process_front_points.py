@@ -3,7 +3,8 @@ import os
 import traceback
 from pathlib import Path
 import json
-from .pixel_to_geo import pixel_to_latlon
+import numpy as np
+from .pixel_to_geo import pixel_to_latlon_array
 from pymongo import MongoClient
 from bson import ObjectId
 
@@ -49,29 +50,21 @@ def process_single_document(
         # Converte coordenadas YOLO para pixels
         points = annotation.split()[1:]  # Remove o primeiro elemento (classe)
         image_size = 1280  # 640 * scale
-        coordinates = []
-
-        for i in range(0, len(points), 2):
-            x_norm = float(points[i])
-            y_norm = float(points[i + 1])
-
-            # Converte para pixels
-            pixel_x = int(x_norm * image_size)
-            pixel_y = int(y_norm * image_size)
-
-            # Converte para lat/lon
-            lat, lon = pixel_to_latlon(
-                pixel_x=pixel_x,
-                pixel_y=pixel_y,
-                center_lat=center_lat,
-                center_lon=center_lon,
-                zoom=zoom,
-                scale=scale,
-                image_width=image_size,
-                image_height=image_size,
-            )
-
-            coordinates.append({"lat": lat, "lng": lon})
+
+        # Converte para pixels (truncando como antes) e depois para lat/lon
+        pixels = (
+            np.array(points, dtype=np.float64).reshape(-1, 2) * image_size
+        ).astype(int)
+        latlon = pixel_to_latlon_array(
+            pixels,
+            center_lat=center_lat,
+            center_lon=center_lon,
+            zoom=zoom,
+            scale=scale,
+            image_width=image_size,
+            image_height=image_size,
+        )
+        coordinates = [{"lat": lat, "lng": lon} for lat, lon in latlon.tolist()]
 
         return {"document_id": document["id"], "coordinates": coordinates}
 
@@ -0,0 +1,368 @@
+"""
+Quantização INT8 do modelo de segmentação de lotes (ONNX Runtime).
+
+Gera uma variante INT8 (dinâmica ou estática com calibração) do best.onnx e
+um relatório comparando a IoU das máscaras contra o ground truth e a
+latência/memória em CPU das duas variantes.
+
+O ground truth vem apenas de lotes corrigidos manualmente (documentos com
+old_detection_result ou adjusted_mask.adjustment_type "manual"): nos demais
+a anotação é a própria predição do modelo FP32, e a IoU mediria só a
+concordância com ele. A calibração usa as imagens salvas em
+satellite_images/ dos demais documentos, lidas sob demanda.
+
+Uso (a partir de lot-render/):
+    python -m src.modules.quantization --onnx models/best.onnx --mode static \\
+        --calibration-size 200 --eval-size 100 \\
+        --report models/quantization_report.json
+
+O modelo gerado (best_int8.onnx) é usado pela detecção com
+YOLO_ENGINE=onnx e YOLO_QUANTIZATION=int8.
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from onnxruntime.quantization import (
+    CalibrationDataReader,
+    QuantFormat,
+    QuantType,
+    quantize_dynamic,
+    quantize_static,
+)
+from onnxruntime.quantization.shape_inference import quant_pre_process
+from pymongo import MongoClient
+
+from .colors import download_image_from_gcs
+from .detection import get_best_segmentation, prepare_detection_image
+from .segmentation_engines import OnnxSegmentationModel
+
+
+def int8_model_path(onnx_path: str) -> str:
+    """Caminho da variante INT8 de um modelo ONNX (best.onnx -> best_int8.onnx)."""
+    path = Path(onnx_path)
+    return str(path.with_name(f"{path.stem}_int8.onnx"))
+
+
+def annotation_to_polygon(annotation: str) -> Optional[np.ndarray]:
+    """Converte 'classe x0 y0 x1 y1 ...' para um array (N,2) normalizado."""
+    values = annotation.strip().split()[1:]
+    if len(values) < 6:
+        return None
+    return np.array([float(v) for v in values]).reshape(-1, 2)
+
+
+# Documentos cuja máscara foi corrigida por uma pessoa
+MANUAL_CORRECTION_QUERY = {
+    "$or": [
+        {"old_detection_result": {"$exists": True}},
+        {"detection_result.adjusted_mask.adjustment_type": "manual"},
+    ]
+}
+
+
+def load_annotated_samples(
+    mongodb_uri: str, limit: int
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Carrega imagens de satellite_images de lotes corrigidos manualmente,
+    com a anotação YOLOv8 da correção (máscara ajustada).
+
+    Returns:
+        Lista de (imagem 512x512 BGR, polígono ground truth normalizado)
+    """
+    client = None
+    samples = []
+    try:
+        client = MongoClient(mongodb_uri)
+        db = client["gethome-01-hml"]
+        collection = db["lots_detections_details_hmg"]
+
+        query = {
+            "image_info.url": {"$exists": True},
+            "detection_result.yolov8_annotation": {"$exists": True},
+            **MANUAL_CORRECTION_QUERY,
+        }
+        cursor = collection.find(
+            query,
+            {"image_info.url": 1, "detection_result": 1},
+        ).sort("_id", -1)
+
+        for doc in cursor:
+            if len(samples) >= limit:
+                break
+            detection = doc["detection_result"]
+            annotation = detection.get("adjusted_mask", {}).get(
+                "yolov8_annotation"
+            ) or detection.get("yolov8_annotation")
+            polygon = annotation_to_polygon(annotation or "")
+            if polygon is None:
+                continue
+
+            image = download_image_from_gcs(doc["image_info"]["url"])
+            if image is None:
+                continue
+            samples.append((prepare_detection_image(image), polygon))
+
+        print(f"Amostras corrigidas manualmente carregadas: {len(samples)}")
+        return samples
+
+    finally:
+        if client:
+            client.close()
+
+
+def iter_calibration_images(
+    mongodb_uri: str, limit: int, min_confidence: float = 0.62
+) -> Iterator[np.ndarray]:
+    """
+    Gera, uma a uma, imagens de satellite_images (512x512 BGR) para a
+    calibração, excluindo os lotes corrigidos manualmente (usados na
+    avaliação). Cada imagem é baixada só quando pedida.
+    """
+    client = MongoClient(mongodb_uri)
+    try:
+        collection = client["gethome-01-hml"]["lots_detections_details_hmg"]
+        query = {
+            "image_info.url": {"$exists": True},
+            "detection_result.confidence": {"$gte": min_confidence},
+            "$nor": MANUAL_CORRECTION_QUERY["$or"],
+        }
+        cursor = collection.find(query, {"image_info.url": 1}).sort("_id", -1)
+
+        count = 0
+        for doc in cursor:
+            if count >= limit:
+                break
+            image = download_image_from_gcs(doc["image_info"]["url"])
+            if image is None:
+                continue
+            count += 1
+            yield prepare_detection_image(image)
+        print(f"Imagens de calibração usadas: {count}")
+    finally:
+        client.close()
+
+
+class SatelliteCalibrationReader(CalibrationDataReader):
+    """
+    CalibrationDataReader do ONNX Runtime alimentado pelas imagens de
+    satélite armazenadas, pré-processadas como na inferência só quando o
+    ONNX Runtime pede o próximo lote (sem manter todas em memória).
+    """
+
+    def __init__(self, model: OnnxSegmentationModel, images: Iterable[np.ndarray]):
+        self.input_name = model.input_name
+        self._model = model
+        self._images = iter(images)
+        self.count = 0
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        image = next(self._images, None)
+        if image is None:
+            return None
+        self.count += 1
+        return {self.input_name: self._model.preprocess([image])}
+
+
+def quantize_model(
+    onnx_path: str,
+    output_path: Optional[str] = None,
+    mode: str = "static",
+    calibration_images: Optional[Iterable[np.ndarray]] = None,
+) -> str:
+    """
+    Quantiza o modelo ONNX para INT8.
+
+    Args:
+        onnx_path: Modelo ONNX fp32 exportado do best.pt
+        output_path: Destino (default: <nome>_int8.onnx)
+        mode: 'dynamic' (só pesos) ou 'static' (pesos e ativações, QDQ)
+        calibration_images: Imagens BGR 512x512 para a calibração estática
+            (lista ou gerador, consumido sob demanda)
+    """
+    output_path = output_path or int8_model_path(onnx_path)
+    prepared_path = str(Path(output_path).with_suffix(".prep.onnx"))
+    quant_pre_process(onnx_path, prepared_path)
+
+    try:
+        if mode == "dynamic":
+            quantize_dynamic(
+                prepared_path, output_path, weight_type=QuantType.QInt8
+            )
+        elif mode == "static":
+            if calibration_images is None:
+                raise ValueError("Quantização estática requer imagens de calibração")
+
+            reader = SatelliteCalibrationReader(
+                OnnxSegmentationModel(onnx_path), calibration_images
+            )
+            quantize_static(
+                prepared_path,
+                output_path,
+                reader,
+                quant_format=QuantFormat.QDQ,
+                per_channel=True,
+                activation_type=QuantType.QUInt8,
+                weight_type=QuantType.QInt8,
+            )
+            if reader.count == 0:
+                raise ValueError("Nenhuma imagem de calibração disponível")
+        else:
+            raise ValueError(f"Modo de quantização inválido: {mode}")
+    finally:
+        if os.path.exists(prepared_path):
+            os.unlink(prepared_path)
+
+    print(f"Modelo INT8 salvo em: {output_path}")
+    return output_path
+
+
+def _current_rss_mb() -> float:
+    """RSS atual do processo em MB (Linux), com fallback para o pico."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _polygon_mask(polygon: Optional[np.ndarray], size: int = 512) -> np.ndarray:
+    mask = np.zeros((size, size), dtype=np.uint8)
+    if polygon is not None and len(polygon) >= 3:
+        pts = np.array(polygon * size, dtype=np.int32).reshape(-1, 1, 2)
+        cv2.fillPoly(mask, [pts], 1)
+    return mask
+
+
+def _mask_iou(a: np.ndarray, b: np.ndarray) -> float:
+    union = np.logical_or(a, b).sum()
+    if union == 0:
+        return 1.0
+    return float(np.logical_and(a, b).sum() / union)
+
+
+def evaluate_model(
+    model_path: str, samples: List[Tuple[np.ndarray, np.ndarray]]
+) -> Dict[str, Any]:
+    """
+    Mede IoU da melhor máscara contra o ground truth, latência e memória
+    de um modelo ONNX.
+    """
+    rss_before = _current_rss_mb()
+    model = OnnxSegmentationModel(model_path)
+    get_best_segmentation(model, samples[0][0])  # aquecimento
+    rss_after = _current_rss_mb()
+
+    ious = []
+    latencies = []
+    for image, gt_polygon in samples:
+        start = time.perf_counter()
+        seg_data = get_best_segmentation(model, image)
+        latencies.append((time.perf_counter() - start) * 1000)
+        predicted = seg_data["polygon"] if seg_data else None
+        ious.append(
+            _mask_iou(_polygon_mask(predicted), _polygon_mask(gt_polygon))
+        )
+
+    latencies.sort()
+    return {
+        "model_path": model_path,
+        "file_size_mb": os.path.getsize(model_path) / 1024**2,
+        "rss_increase_mb": rss_after - rss_before,
+        "mean_iou": statistics.mean(ious),
+        "median_iou": statistics.median(ious),
+        "latency_mean_ms": statistics.mean(latencies),
+        "latency_p50_ms": statistics.median(latencies),
+        "latency_p95_ms": latencies[
+            min(int(len(latencies) * 0.95), len(latencies) - 1)
+        ],
+    }
+
+
+def build_report(fp32: Dict[str, Any], int8: Dict[str, Any]) -> Dict[str, Any]:
+    """Resumo da troca qualidade x desempenho da variante INT8."""
+    return {
+        "fp32": fp32,
+        "int8": int8,
+        "iou_drop": fp32["mean_iou"] - int8["mean_iou"],
+        "latency_speedup": fp32["latency_mean_ms"] / int8["latency_mean_ms"],
+        "file_size_ratio": int8["file_size_mb"] / fp32["file_size_mb"],
+        "rss_saved_mb": fp32["rss_increase_mb"] - int8["rss_increase_mb"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Quantiza o modelo de segmentação para INT8 e gera relatório"
+    )
+    parser.add_argument("--onnx", default="models/best.onnx")
+    parser.add_argument("--output")
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static")
+    parser.add_argument("--calibration-size", type=int, default=200)
+    parser.add_argument("--eval-size", type=int, default=100)
+    parser.add_argument("--report", default="models/quantization_report.json")
+    parser.add_argument(
+        "--mongodb-uri", default=os.getenv("MONGO_CONNECTION_STRING")
+    )
+    args = parser.parse_args()
+
+    if not args.mongodb_uri:
+        raise ValueError("MONGO_CONNECTION_STRING not found")
+
+    # Avaliação só com lotes corrigidos manualmente; calibração com os demais
+    eval_samples = load_annotated_samples(args.mongodb_uri, args.eval_size)
+    if not eval_samples:
+        raise ValueError("Nenhum lote corrigido manualmente para a avaliação")
+
+    calibration = {"count": 0}
+
+    def calibration_images():
+        for image in iter_calibration_images(
+            args.mongodb_uri, args.calibration_size
+        ):
+            calibration["count"] += 1
+            yield image
+
+    int8_path = quantize_model(
+        args.onnx,
+        args.output,
+        mode=args.mode,
+        calibration_images=calibration_images(),
+    )
+
+    report = build_report(
+        evaluate_model(args.onnx, eval_samples),
+        evaluate_model(int8_path, eval_samples),
+    )
+    report["mode"] = args.mode
+    report["calibration_images"] = calibration["count"]
+    report["eval_images"] = len(eval_samples)
+
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n=== Relatório de quantização ===")
+    for name in ("fp32", "int8"):
+        r = report[name]
+        print(
+            f"{name}: IoU={r['mean_iou']:.4f} "
+            f"latência={r['latency_mean_ms']:.1f}ms (p95 {r['latency_p95_ms']:.1f}ms) "
+            f"arquivo={r['file_size_mb']:.1f}MB RSS+={r['rss_increase_mb']:.1f}MB"
+        )
+    print(f"Queda de IoU: {report['iou_drop']:.4f}")
+    print(f"Speedup de latência: {report['latency_speedup']:.2f}x")
+    print(f"Relatório salvo em: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
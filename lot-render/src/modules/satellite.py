@@ -1,6 +1,8 @@
-import requests
 from typing import Optional
 
+from ..apis.google_maps import GoogleMapsAPI
+from ..apis.imagery_providers import get_imagery_provider
+
 
 def get_satellite_image(
     lat: float,
@@ -11,7 +13,8 @@ def get_satellite_image(
     scale: int = 2,
 ) -> bytes:
     """
-    Get satellite image from Google Maps Static API.
+    Get satellite image from the configured imagery provider
+    (IMAGERY_PROVIDER, Google Maps Static API by default).
 
     Args:
         lat: Latitude
@@ -24,21 +27,7 @@ def get_satellite_image(
     Returns:
         bytes: Image content
     """
-    base_url = "https://maps.googleapis.com/maps/api/staticmap"
-
-    params = {
-        "center": f"{lat},{lng}",
-        "zoom": zoom,
-        "size": size,
-        "scale": scale,
-        "maptype": "satellite",
-        "key": api_key,
-    }
-
-    response = requests.get(base_url, params=params)
-    if response.status_code != 200:
-        raise Exception(
-            f"Error getting image: {response.status_code} - {response.text}"
-        )
-
-    return response.content
+    google_maps = GoogleMapsAPI(api_key) if api_key else None
+    return get_imagery_provider(google_maps).get_satellite_image(
+        lat=lat, lng=lng, zoom=zoom, size=size, scale=scale
+    )
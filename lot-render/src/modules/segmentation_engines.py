@@ -0,0 +1,325 @@
+"""
+Engines de inferência para o modelo de segmentação de lotes.
+
+O modelo treinado (best.pt) roda por padrão no PyTorch via ultralytics. Para
+nós sem GPU ele pode ser exportado para ONNX (e opcionalmente OpenVINO) e
+servido pelas classes deste módulo, que reimplementam o pós-processamento do
+YOLOv8-seg (NMS + decodificação das máscaras por protótipos) para devolver os
+mesmos polígonos normalizados que result.masks.xyn.
+
+Engine selecionada via YOLO_ENGINE (torch | onnx | openvino). Com
+YOLO_ENGINE=onnx, YOLO_QUANTIZATION=int8 usa a variante INT8 gerada por
+src.modules.quantization.
+
+Exportação:
+    python -m src.modules.segmentation_engines --model models/best.pt --format onnx
+"""
+
+import argparse
+import ast
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+ENGINES = ("torch", "onnx", "openvino")
+
+
+def get_engine() -> str:
+    """Engine configurada em YOLO_ENGINE (default: torch)."""
+    engine = os.getenv("YOLO_ENGINE", "torch").lower()
+    if engine not in ENGINES:
+        raise ValueError(
+            f"YOLO_ENGINE inválida: {engine} (opções: {', '.join(ENGINES)})"
+        )
+    return engine
+
+
+def resolve_model_path(model_path: str, engine: Optional[str] = None) -> str:
+    """
+    Resolve o arquivo a ser carregado para a engine.
+
+    Caminhos já exportados (.onnx / .xml) são usados como estão; para um .pt
+    usa o artefato gerado pelo export do ultralytics ao lado dele
+    (best.onnx, best_int8.onnx ou best_openvino_model/best.xml).
+    """
+    engine = engine or get_engine()
+    path = Path(model_path)
+    if engine == "torch" or path.suffix in (".onnx", ".xml"):
+        return str(path)
+    if engine == "onnx":
+        if os.getenv("YOLO_QUANTIZATION", "").lower() == "int8":
+            return str(path.with_name(f"{path.stem}_int8.onnx"))
+        return str(path.with_suffix(".onnx"))
+    return str(path.parent / f"{path.stem}_openvino_model" / f"{path.stem}.xml")
+
+
+def load_segmentation_model(model_path: str):
+    """
+    Carrega o modelo de acordo com a extensão do arquivo:
+    .onnx -> ONNX Runtime, .xml -> OpenVINO, demais -> ultralytics YOLO.
+    """
+    suffix = Path(model_path).suffix.lower()
+    if suffix == ".onnx":
+        if get_engine() == "openvino":
+            return OpenVinoSegmentationModel(model_path)
+        return OnnxSegmentationModel(model_path)
+    if suffix == ".xml":
+        return OpenVinoSegmentationModel(model_path)
+
+    from ultralytics import YOLO
+
+    return YOLO(model_path)
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _largest_contour_polygon(mask: np.ndarray) -> np.ndarray:
+    """Contorno externo com mais pontos (estratégia 'largest' do ultralytics)."""
+    contours, _ = cv2.findContours(
+        mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+    )
+    if not contours:
+        return np.zeros((0, 2), dtype=np.float32)
+    largest = max(contours, key=len)
+    return largest.reshape(-1, 2).astype(np.float32)
+
+
+class ExportedSegmentationModel:
+    """
+    Base para modelos YOLOv8-seg exportados. As subclasses implementam
+    _infer(batch) retornando (predições, protótipos).
+    """
+
+    conf_threshold = 0.25
+    iou_threshold = 0.7
+    max_det = 300
+
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+        self.imgsz: Tuple[int, int] = (640, 640)
+        self.fixed_batch: Optional[int] = None
+
+    def _set_input_shape(self, shape, metadata: Dict[str, str]) -> None:
+        # shape: [batch, 3, h, w] (dimensões dinâmicas vêm como str/None/-1)
+        if isinstance(shape[0], int) and shape[0] > 0:
+            self.fixed_batch = shape[0]
+        if isinstance(shape[2], int) and shape[2] > 0:
+            self.imgsz = (int(shape[2]), int(shape[3]))
+        elif metadata.get("imgsz"):
+            h, w = ast.literal_eval(metadata["imgsz"])
+            self.imgsz = (int(h), int(w))
+
+    def _infer(self, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    def preprocess(self, images: List[np.ndarray]) -> np.ndarray:
+        """BGR uint8 -> tensor float32 NCHW (RGB, 0..1) no tamanho do modelo."""
+        h, w = self.imgsz
+        batch = np.empty((len(images), 3, h, w), dtype=np.float32)
+        for i, img in enumerate(images):
+            resized = cv2.resize(img, (w, h), interpolation=cv2.INTER_LINEAR)
+            rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+            batch[i] = rgb.transpose(2, 0, 1) / 255.0
+        return batch
+
+    def _run(self, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if self.fixed_batch is None or len(batch) == self.fixed_batch:
+            return self._infer(batch)
+        # Modelo exportado com batch fixo: executa item a item
+        outputs = [self._infer(batch[i : i + 1]) for i in range(len(batch))]
+        preds = np.concatenate([o[0] for o in outputs])
+        protos = np.concatenate([o[1] for o in outputs])
+        return preds, protos
+
+    def _decode(
+        self, preds: np.ndarray, protos: np.ndarray
+    ) -> List[Dict[str, Any]]:
+        """
+        Decodifica a saída de uma imagem: preds (4+nc+nm, A), protos (nm, mh, mw).
+        """
+        nm, mh, mw = protos.shape
+        nc = preds.shape[0] - 4 - nm
+        preds = preds.T
+
+        scores = preds[:, 4 : 4 + nc]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        keep = confidences > self.conf_threshold
+        if not np.any(keep):
+            return []
+
+        preds = preds[keep]
+        class_ids = class_ids[keep]
+        confidences = confidences[keep]
+
+        # xywh (centro) -> xyxy
+        xywh = preds[:, :4]
+        xyxy = np.empty_like(xywh)
+        xyxy[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+        xyxy[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+
+        # NMS por classe (deslocando as caixas de cada classe)
+        offset = class_ids[:, None].astype(np.float32) * 7680.0
+        nms_boxes = np.concatenate(
+            [xyxy[:, :2] + offset, xywh[:, 2:]], axis=1
+        ).tolist()
+        indices = cv2.dnn.NMSBoxes(
+            nms_boxes,
+            confidences.tolist(),
+            self.conf_threshold,
+            self.iou_threshold,
+        )
+        indices = np.array(indices, dtype=int).reshape(-1)[: self.max_det]
+        if len(indices) == 0:
+            return []
+
+        # Máscaras: coeficientes x protótipos, recorte na caixa, upsample
+        coeffs = preds[indices, 4 + nc :]
+        masks = _sigmoid(coeffs @ protos.reshape(nm, -1)).reshape(-1, mh, mw)
+
+        h, w = self.imgsz
+        scale = np.array([mw / w, mh / h, mw / w, mh / h], dtype=np.float32)
+        instances = []
+        for mask, box, idx in zip(masks, xyxy[indices] * scale, indices):
+            x1, y1, x2, y2 = box
+            cols = np.arange(mw, dtype=np.float32)
+            rows = np.arange(mh, dtype=np.float32)
+            inside = ((rows >= y1) & (rows < y2))[:, None] & (
+                (cols >= x1) & (cols < x2)
+            )[None, :]
+            mask = np.where(inside, mask, 0.0).astype(np.float32)
+            mask = cv2.resize(mask, (w, h), interpolation=cv2.INTER_LINEAR)
+            binary = (mask > 0.5).astype(np.uint8)
+
+            polygon = _largest_contour_polygon(binary)
+            polygon[:, 0] /= w
+            polygon[:, 1] /= h
+            instances.append(
+                {
+                    "polygon": polygon,
+                    "class_id": int(class_ids[idx]),
+                    "confidence": float(confidences[idx]),
+                }
+            )
+
+        return instances
+
+    def predict_segments(
+        self, images: List[np.ndarray]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Retorna, para cada imagem, a lista de segmentações encontradas com
+        polygon (N,2) normalizado, class_id e confidence.
+        """
+        if not images:
+            return []
+        preds, protos = self._run(self.preprocess(images))
+        return [self._decode(preds[i], protos[i]) for i in range(len(images))]
+
+
+class OnnxSegmentationModel(ExportedSegmentationModel):
+    """YOLOv8-seg exportado para ONNX, executado no ONNX Runtime (CPU)."""
+
+    def __init__(self, model_path: str, providers: Optional[List[str]] = None):
+        super().__init__(model_path)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        threads = os.getenv("ONNX_INTRA_OP_THREADS")
+        if threads:
+            options.intra_op_num_threads = int(threads)
+        self.session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=providers or ["CPUExecutionProvider"],
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self._set_input_shape(
+            model_input.shape,
+            self.session.get_modelmeta().custom_metadata_map,
+        )
+
+    def _infer(self, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        outputs = self.session.run(None, {self.input_name: batch})
+        preds = next(o for o in outputs if o.ndim == 3)
+        protos = next(o for o in outputs if o.ndim == 4)
+        return preds, protos
+
+
+class OpenVinoSegmentationModel(ExportedSegmentationModel):
+    """YOLOv8-seg exportado (OpenVINO IR ou ONNX) executado no OpenVINO (CPU)."""
+
+    def __init__(self, model_path: str, device: str = "CPU"):
+        super().__init__(model_path)
+        import openvino as ov
+
+        core = ov.Core()
+        model = core.read_model(model_path)
+        shape = [
+            dim.get_length() if dim.is_static else None
+            for dim in model.input(0).get_partial_shape()
+        ]
+        self._set_input_shape(shape, {})
+        self.compiled = core.compile_model(model, device)
+
+    def _infer(self, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        outputs = list(self.compiled(batch).values())
+        preds = next(o for o in outputs if o.ndim == 3)
+        protos = next(o for o in outputs if o.ndim == 4)
+        return preds, protos
+
+
+def export_model(
+    model_path: str, export_format: str = "onnx", imgsz: Optional[int] = None
+) -> str:
+    """
+    Exporta o best.pt para ONNX ou OpenVINO usando o ultralytics.
+    O ONNX é exportado com batch dinâmico para suportar o micro-batching.
+
+    Sem imgsz usa o tamanho de entrada do treino do checkpoint (o mesmo que
+    a engine torch usa), mantendo os polígonos iguais entre as engines.
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    imgsz = imgsz or model.overrides.get("imgsz")
+    options = {"imgsz": imgsz} if imgsz else {}
+    print(f"Tamanho de entrada da exportação: {imgsz or 'padrão do ultralytics'}")
+    if export_format == "onnx":
+        exported = model.export(
+            format="onnx", dynamic=True, simplify=True, **options
+        )
+    elif export_format == "openvino":
+        exported = model.export(format="openvino", **options)
+        exported = resolve_model_path(model_path, "openvino")
+    else:
+        raise ValueError(f"Formato de exportação inválido: {export_format}")
+    print(f"Modelo exportado: {exported}")
+    return str(exported)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Exporta o modelo de segmentação para ONNX/OpenVINO"
+    )
+    parser.add_argument(
+        "--model", default=os.getenv("YOLO_MODEL_PATH", "models/best.pt")
+    )
+    parser.add_argument("--format", choices=["onnx", "openvino"], default="onnx")
+    parser.add_argument(
+        "--imgsz",
+        type=int,
+        default=None,
+        help="tamanho de entrada (default: o do treino do checkpoint)",
+    )
+    args = parser.parse_args()
+    export_model(args.model, args.format, args.imgsz)
@@ -1,15 +1,15 @@
 import os
 import json
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import cv2
 import numpy as np
 from PIL import Image
-import tempfile
 import traceback
 from pymongo import MongoClient
-from google.cloud import storage
+from ..database.storage import get_storage
 from bson.objectid import ObjectId
+from .image_store import decode_image, get_image_cache
 
 
 def hex_to_bgr(hex_color: str) -> tuple:
@@ -85,6 +85,7 @@ def process_lot_images_for_site(
     hex_color: str,
     doc_id: str = None,
     confidence: float = 0.62,
+    image: Optional[np.ndarray] = None,
 ) -> list:
     """
     Processa imagens de lotes para exibição no site e salva no GCS.
@@ -95,6 +96,8 @@ def process_lot_images_for_site(
         watermark_path (str): Caminho para a imagem de marca d'água
         doc_id (str): ID específico do documento (opcional)
         confidence (float): Valor mínimo de confiança
+        image (np.ndarray): Imagem de satélite já decodificada por uma etapa
+            anterior (opcional, só usada junto com doc_id)
 
     Returns:
         list: Lista de documentos processados
@@ -103,11 +106,10 @@ def process_lot_images_for_site(
     print(f"Filtro de confiança: >= {confidence}")
 
     client = None
-    storage_client = None
     try:
-        # Initialize GCS with new bucket name
-        storage_client = storage.Client()
-        bucket = storage_client.bucket("images_from_have_allotment")
+        # Shared storage client (GCS or local backend)
+        storage = get_storage()
+        bucket_name = "images_from_have_allotment"
 
         # Connect to MongoDB
         client = MongoClient(mongodb_uri)
@@ -142,115 +144,116 @@ def process_lot_images_for_site(
                     )
                     continue
 
-                # Extract blob path from gs:// URL, now using the new bucket name
-                _, _, blob_path = satellite_image_url.partition(
-                    "images_from_have_allotment/"
-                )
+                image_cache = get_image_cache()
+                if doc_id and image is not None:
+                    doc_image = image
+                elif image_cache:
+                    doc_image = image_cache.get(satellite_image_url)
+                else:
+                    doc_image = None
+
+                if doc_image is None:
+                    # Extract blob path from gs:// URL, now using the new bucket name
+                    _, _, blob_path = satellite_image_url.partition(
+                        "images_from_have_allotment/"
+                    )
 
-                # Ensure the blob path starts with satellite_images/
-                if not blob_path.startswith("satellite_images/"):
-                    blob_path = f"satellite_images/{blob_path}"
-
-                # Download to temporary file
-                with tempfile.NamedTemporaryFile(
-                    suffix=".jpg", delete=False
-                ) as temp_file:
-                    blob = bucket.blob(blob_path)
-                    blob.download_to_filename(temp_file.name)
-
-                    # Read image with OpenCV
-                    image = cv2.imread(temp_file.name)
-                    os.unlink(temp_file.name)
-
-                    if image is None:
-                        print("Falha ao decodificar a imagem")
-                        continue
-
-                    # Redimensiona para 1280x1280 se necessário
-                    if image.shape[:2] != (1280, 1280):
-                        image = cv2.resize(
-                            image,
-                            (1280, 1280),
-                            interpolation=cv2.INTER_LANCZOS4,
-                        )
+                    # Ensure the blob path starts with satellite_images/
+                    if not blob_path.startswith("satellite_images/"):
+                        blob_path = f"satellite_images/{blob_path}"
 
-                    # Prepara o contorno
-                    if doc.get("detection_result"):
-                        if "adjusted_mask" in doc["detection_result"]:
-                            mask_annotation = doc["detection_result"][
-                                "adjusted_mask"
-                            ].get("yolov8_annotation")
-                        else:
-                            mask_annotation = doc["detection_result"].get(
-                                "yolov8_annotation"
-                            )
-
-                    if not mask_annotation:
-                        print(f"Nenhuma anotação de máscara encontrada")
-                        continue
-
-                    # Converte anotação em contornos
-                    contours = yolov8_annotation_to_contours(
-                        mask_annotation, image.shape[:2]
+                    # Download and decode in memory
+                    doc_image = decode_image(
+                        storage.download(bucket_name, blob_path)
                     )
-                    print(
-                        f"Contornos gerados com shape da imagem: {image.shape[:2]}"
-                    )
-                    print(
-                        f"Primeiro contorno: {contours[0][:3]}"
-                    )  # Debug dos primeiros 3 pontos
-
-                    # Aplica apenas o contorno
-                    processed_image = draw_segment_with_watermark(
-                        image=image,
-                        contours=contours,
-                        hex_color=hex_color,
-                        outline_thickness=4,
+                    if doc_image is not None and image_cache:
+                        doc_image = image_cache.put(
+                            satellite_image_url, doc_image
+                        )
+
+                if doc_image is None:
+                    print("Falha ao decodificar a imagem")
+                    continue
+
+                # Redimensiona para 1280x1280 se necessário
+                if doc_image.shape[:2] != (1280, 1280):
+                    doc_image = cv2.resize(
+                        doc_image,
+                        (1280, 1280),
+                        interpolation=cv2.INTER_LANCZOS4,
                     )
 
-                    # Salva temporariamente
-                    with tempfile.NamedTemporaryFile(
-                        suffix=".jpg", delete=False
-                    ) as temp_file:
-                        temp_path = temp_file.name
-                        encode_params = [
-                            cv2.IMWRITE_JPEG_QUALITY,
-                            95,
-                            cv2.IMWRITE_JPEG_OPTIMIZE,
-                            1,
-                        ]
-                        cv2.imwrite(temp_path, processed_image, encode_params)
-
-                        # Upload para GCS na pasta site_images
-                        site_blob_path = f"site_images/{current_doc_id}.jpg"
-                        blob = bucket.blob(site_blob_path)
-                        blob.upload_from_filename(temp_path)
-
-                        # Gera URL pública com link direto
-                        site_image_url = f"https://storage.cloud.google.com/images_from_have_allotment/{site_blob_path}"
-
-                        # Atualiza MongoDB
-                        collection.update_one(
-                            {"_id": doc["_id"]},
-                            {
-                                "$set": {
-                                    "image_info.image_thumb_site": site_image_url
-                                }
-                            },
+                # Prepara o contorno
+                if doc.get("detection_result"):
+                    if "adjusted_mask" in doc["detection_result"]:
+                        mask_annotation = doc["detection_result"][
+                            "adjusted_mask"
+                        ].get("yolov8_annotation")
+                    else:
+                        mask_annotation = doc["detection_result"].get(
+                            "yolov8_annotation"
                         )
 
-                        processed_docs.append(
-                            {
-                                "id": current_doc_id,
-                                "site_image_url": site_image_url,
-                                "confidence": doc.get("confidence"),
-                            }
-                        )
+                if not mask_annotation:
+                    print(f"Nenhuma anotação de máscara encontrada")
+                    continue
+
+                # Converte anotação em contornos
+                contours = yolov8_annotation_to_contours(
+                    mask_annotation, doc_image.shape[:2]
+                )
+                print(
+                    f"Contornos gerados com shape da imagem: {doc_image.shape[:2]}"
+                )
+                print(
+                    f"Primeiro contorno: {contours[0][:3]}"
+                )  # Debug dos primeiros 3 pontos
+
+                # Aplica apenas o contorno
+                processed_image = draw_segment_with_watermark(
+                    image=doc_image,
+                    contours=contours,
+                    hex_color=hex_color,
+                    outline_thickness=4,
+                )
 
-                        print(f"Imagem processada e salva: {site_image_url}")
+                # Codifica em memória e envia ao storage na pasta site_images
+                encode_params = [
+                    cv2.IMWRITE_JPEG_QUALITY,
+                    95,
+                    cv2.IMWRITE_JPEG_OPTIMIZE,
+                    1,
+                ]
+                ok, encoded = cv2.imencode(
+                    ".jpg", processed_image, encode_params
+                )
+                if not ok:
+                    print("Falha ao codificar a imagem")
+                    continue
 
-                    # Remove arquivo temporário
-                    os.unlink(temp_path)
+                site_blob_path = f"site_images/{current_doc_id}.jpg"
+                site_image_url = storage.upload(
+                    bucket_name,
+                    site_blob_path,
+                    encoded.tobytes(),
+                    "image/jpeg",
+                )
+
+                # Atualiza MongoDB
+                collection.update_one(
+                    {"_id": doc["_id"]},
+                    {"$set": {"image_info.image_thumb_site": site_image_url}},
+                )
+
+                processed_docs.append(
+                    {
+                        "id": current_doc_id,
+                        "site_image_url": site_image_url,
+                        "confidence": doc.get("confidence"),
+                    }
+                )
+
+                print(f"Imagem processada e salva: {site_image_url}")
 
             except Exception as e:
                 print(f"Erro ao processar documento {current_doc_id}: {str(e)}")
@@ -273,9 +276,3 @@ def process_lot_images_for_site(
                 print("✅ Conexão com MongoDB fechada com sucesso")
             except Exception as e:
                 print(f"⚠️ Erro ao fechar conexão com MongoDB: {e}")
-        if storage_client:
-            try:
-                storage_client.close()
-                print("✅ Conexão com GCS fechada com sucesso")
-            except Exception as e:
-                print(f"⚠️ Erro ao fechar conexão com GCS: {e}")
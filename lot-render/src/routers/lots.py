@@ -1,5 +1,6 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
+import asyncio
 import tempfile
 from pathlib import Path
 import subprocess
@@ -9,8 +10,11 @@ from datetime import datetime
 import json
 from typing import Optional, Dict, Any, List
 
+from ..apis.google_maps import GoogleMapsAPI
+from ..database.mongodb import MongoDB
 from ..services.lots.detect_lot_service import detect_lot_service
 from ..services.lots.process_lot_service import process_lot_service
+from ..modules.inference_worker import InferenceQueueFull
 
 router = APIRouter(tags=["lots"])
 
@@ -23,11 +27,18 @@ class Point(BaseModel):
 class DetectLotRequest(BaseModel):
     latitude: float
     longitude: float
+    multi_lot: bool = False
+
+
+class CandidateLot(BaseModel):
+    points: List[Point]
+    confidence: float
 
 
 class DetectLotData(BaseModel):
     points: List[Point]
     doc_id: Optional[str] = None
+    candidates: Optional[List[CandidateLot]] = None
 
 
 class DetectLotResponse(BaseModel):
@@ -53,26 +64,25 @@ class ProcessLotResponse(BaseModel):
     meta: Optional[Dict] = None
 
 
-@router.post("/detect/", response_model=DetectLotResponse)
-async def detect_lot(request: DetectLotRequest):
-    """
-    Detect a lot based on its coordinates using satellite imagery and AI detection.
-    Returns only the detected polygon points.
-    """
-    result = await detect_lot_service(
-        latitude=request.latitude,
-        longitude=request.longitude,
-        zoom=20,  # Fixed value
-        confidence=0.62,  # Fixed value
-    )
-
-    # Convert the service response to the new format
+def build_detect_response(result: Dict[str, Any]) -> DetectLotResponse:
+    """Convert a detect_lot_service result to the DetectLotResponse format"""
     if result["status"] == "success":
         points = [Point(**point) for point in result["points"]]
+        candidates = None
+        if "candidates" in result:
+            candidates = [
+                CandidateLot(
+                    points=[Point(**point) for point in candidate["points"]],
+                    confidence=candidate["confidence"],
+                )
+                for candidate in result["candidates"]
+            ]
         return DetectLotResponse(
             status="success",
             message="Success",
-            data=DetectLotData(points=points, doc_id=result["doc_id"]),
+            data=DetectLotData(
+                points=points, doc_id=result["doc_id"], candidates=candidates
+            ),
             meta=result.get("meta"),
         )
     else:
@@ -84,6 +94,107 @@ async def detect_lot(request: DetectLotRequest):
         )
 
 
+def retry_after_seconds() -> int:
+    """Retry-After sent when the inference queue is full"""
+    return int(os.getenv("INFERENCE_RETRY_AFTER_SECONDS", "1"))
+
+
+@router.post("/detect/", response_model=DetectLotResponse)
+async def detect_lot(request: DetectLotRequest):
+    """
+    Detect a lot based on its coordinates using satellite imagery and AI detection.
+    Returns the detected polygon points; with multi_lot=true also the other
+    lots found in the same image.
+    """
+    try:
+        result = await detect_lot_service(
+            latitude=request.latitude,
+            longitude=request.longitude,
+            zoom=20,  # Fixed value
+            confidence=0.62,  # Fixed value
+            multi_lot=request.multi_lot,
+        )
+    except InferenceQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(retry_after_seconds())},
+        )
+
+    # Convert the service response to the new format
+    return build_detect_response(result)
+
+
+@router.post("/detect/batch")
+async def detect_lot_batch(items: List[DetectLotRequest]):
+    """
+    Detect many lots in one call.
+    Streams one DetectLotResponse JSON line (NDJSON) per input as soon as it
+    is ready; meta.index points back to the position in the request list.
+    Imagery is fetched concurrently and inference is micro-batched.
+    Requests with more than DETECT_BATCH_MAX_ITEMS inputs are rejected
+    with 413, since one task is created per input.
+    """
+    max_items = int(os.getenv("DETECT_BATCH_MAX_ITEMS", "500"))
+    if len(items) > max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(items)} items, the limit is {max_items}",
+        )
+    concurrency = int(os.getenv("DETECT_BATCH_CONCURRENCY", "16"))
+
+    async def stream():
+        semaphore = asyncio.Semaphore(concurrency)
+        mongo_db = MongoDB()
+        google_maps = GoogleMapsAPI()
+
+        async def run(index: int, request: DetectLotRequest):
+            async with semaphore:
+                try:
+                    result = await detect_lot_service(
+                        latitude=request.latitude,
+                        longitude=request.longitude,
+                        zoom=20,  # Fixed value
+                        confidence=0.62,  # Fixed value
+                        mongo_db=mongo_db,
+                        google_maps=google_maps,
+                        multi_lot=request.multi_lot,
+                    )
+                except InferenceQueueFull as e:
+                    # The stream has already started: flag the line as retryable
+                    result = {
+                        "status": "error",
+                        "error": str(e),
+                        "meta": {
+                            "retryable": True,
+                            "retry_after": retry_after_seconds(),
+                        },
+                    }
+            return index, request, result
+
+        tasks = [
+            asyncio.create_task(run(index, request))
+            for index, request in enumerate(items)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, request, result = await next_done
+                response = build_detect_response(result)
+                response.meta = {
+                    **(response.meta or {}),
+                    "index": index,
+                    "latitude": request.latitude,
+                    "longitude": request.longitude,
+                }
+                yield response.model_dump_json() + "\n"
+        finally:
+            # Client disconnected or stream finished: drop pending work
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.post("/process/", response_model=ProcessLotResponse)
 async def process_lot(request: ProcessLotRequest):
     """
@@ -100,10 +211,17 @@ async def process_lot(request: ProcessLotRequest):
     9. GLB generation
     10. Slope classification
     """
-    result = await process_lot_service(
-        doc_id=request.doc_id,
-        points=request.points,
-    )
+    try:
+        result = await process_lot_service(
+            doc_id=request.doc_id,
+            points=request.points,
+        )
+    except InferenceQueueFull as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(retry_after_seconds())},
+        )
 
     if result["status"] == "success":
         return ProcessLotResponse(
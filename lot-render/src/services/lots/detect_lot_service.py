@@ -1,16 +1,26 @@
 from pathlib import Path
+import asyncio
 import os
 from datetime import datetime
 from typing import Dict, Any, List
 from bson import ObjectId
-import tempfile
+import numpy as np
 
 from ...apis.google_maps import GoogleMapsAPI
-from ...modules.detection import detect_lots_and_save
-from ...modules.pixel_to_geo import pixel_to_latlon
+from ...apis.imagery_providers import get_imagery_provider
+from ...modules.detection import (
+    build_detection_doc,
+    detect_lots_async,
+    polygon_to_geo_points,
+    touches_image_border,
+)
+from ...modules.image_store import get_image_cache
+from ...modules.inference_worker import InferenceQueueFull
+from ...modules.detection_cache import get_detection_cache
+from ...modules.model_registry import model_registry
 from ...database.mongodb import MongoDB
 from ...modules.area import calculate_geo_area
-from google.cloud import storage
+from ...database.storage import get_storage
 
 
 def points_to_yolov8_annotation(points: List[List[float]]) -> str:
@@ -25,6 +35,177 @@ def points_to_yolov8_annotation(points: List[List[float]]) -> str:
     return " ".join(annotation)
 
 
+def candidates_enabled() -> bool:
+    """Whether neighbouring lots are persisted and reused (DETECT_CANDIDATES_ENABLED)."""
+    return os.getenv("DETECT_CANDIDATES_ENABLED", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+
+
+def cache_value(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Part of a successful detection result stored in the detection cache."""
+    value = {"points": result["points"], "doc_id": result["doc_id"]}
+    if "candidates" in result:
+        value["candidates"] = result["candidates"]
+    return value
+
+
+async def save_detection_result(
+    mongo_db: MongoDB,
+    doc_id: str,
+    detection: Dict[str, Any],
+    center_lat: float,
+    center_lon: float,
+    zoom: int,
+) -> List[Dict[str, float]]:
+    """
+    Store detection_result and lot_details for a processed detection and
+    return the lot polygon as lat/lon points.
+    center_lat/center_lon are the center of the image the mask refers to.
+    """
+    # Convert normalized pixel coordinates to lat/lon points for original mask
+    print(f"Original detection: {detection['original_detection']['polygon']}")
+    original_points = polygon_to_geo_points(
+        detection["original_detection"]["polygon"], center_lat, center_lon, zoom
+    )
+
+    detection_result = {
+        "detection_result": {
+            "center": {
+                "pixel": {
+                    "x": detection["original_detection"]["polygon"][0][0],
+                    "y": detection["original_detection"]["polygon"][0][1],
+                },
+                "geo": {"lat": center_lat, "lon": center_lon},
+            },
+            "confidence": detection["confidence"],
+            "mask_points": detection["original_detection"]["polygon"],
+            "geo_points": original_points,
+            "yolov8_annotation": points_to_yolov8_annotation(
+                detection["original_detection"]["polygon"]
+            ),
+            "processed_at": datetime.utcnow(),
+        }
+    }
+
+    points_lat_lon = original_points
+    if "adjusted_detection" in detection:
+        # Convert normalized pixel coordinates to lat/lon points for adjusted mask
+        adjusted_geo_points = polygon_to_geo_points(
+            detection["adjusted_detection"]["polygon"],
+            center_lat,
+            center_lon,
+            zoom,
+        )
+
+        detection_result["detection_result"]["adjusted_mask"] = {
+            "points": detection["adjusted_detection"]["polygon"],
+            "geo_points": adjusted_geo_points,
+            "center": {"geo": {"lat": center_lat, "lon": center_lon}},
+            "adjustment_type": detection["adjusted_detection"][
+                "adjustment_method"
+            ],
+            "yolov8_annotation": points_to_yolov8_annotation(
+                detection["adjusted_detection"]["polygon"]
+            ),
+            "adjusted_at": datetime.utcnow(),
+        }
+        points_lat_lon = adjusted_geo_points
+
+    await mongo_db.update_detection(doc_id, detection_result)
+
+    # Calculate area
+    area_m2 = calculate_geo_area(points_lat_lon)
+
+    # Initialize lot_details structure
+    lot_details = {
+        "area_m2": area_m2,
+        "point_colors": {
+            "points": [],
+            "colors": [],
+            "colors_adjusted": [],
+            "points_lat_lon": points_lat_lon,
+            "points_utm": [],
+            "cardinal_points": {},
+            "front_points": [],
+            "front_points_lat_lon": [],
+            "street_points": [],
+            "street_info": {},
+        },
+        "elevations": [],
+        "mask_elevation": [],
+        "mask_utm": [],
+    }
+
+    # Update MongoDB with lot_details
+    await mongo_db.update_detection(doc_id, {"lot_details": lot_details})
+
+    return [{"lat": lat, "lon": lon} for lat, lon in points_lat_lon]
+
+
+async def detect_lot_from_candidate(
+    mongo_db: MongoDB,
+    candidate: Dict[str, Any],
+    latitude: float,
+    longitude: float,
+    zoom: int,
+) -> Dict[str, Any]:
+    """
+    Create a detection document from a stored candidate (a neighbouring lot
+    found in an earlier detection image) without fetching imagery or running
+    inference. The document points at the candidate's source image, so its
+    coordinates are that image's center.
+    """
+    center_lat = candidate["image_center"]["lat"]
+    center_lon = candidate["image_center"]["lon"]
+    candidate_id = str(candidate["_id"])
+    current_datetime = datetime.utcnow()
+
+    initial_data = {
+        "coordinates": {"lat": center_lat, "lon": center_lon},
+        "requested_coordinates": {"lat": latitude, "lon": longitude},
+        "image_info": dict(candidate["image_info"]),
+        "created_at": current_datetime,
+        "updated_at": current_datetime,
+        "detection_index": 0,
+        "detection_id": None,
+        "candidate_id": candidate_id,
+    }
+    doc_id = await mongo_db.insert_detection(initial_data)
+
+    item = {
+        "object_id": doc_id,
+        "latitude": center_lat,
+        "longitude": center_lon,
+        "dimensions": "1280x1280",
+        "zoom": zoom,
+        "year": candidate["image_info"].get("year", ""),
+    }
+    seg_data = {
+        "polygon": np.asarray(candidate["mask_points"], dtype=np.float32),
+        "class_id": candidate.get("class_id", 0),
+        "confidence": candidate["confidence"],
+    }
+    # Polygon adjustment (cv2) is CPU-bound: keep it off the event loop
+    detection = await asyncio.to_thread(
+        build_detection_doc, item, seg_data, adjust_mask=True
+    )
+
+    points = await save_detection_result(
+        mongo_db, doc_id, detection, center_lat, center_lon, zoom
+    )
+    await mongo_db.mark_candidate_served(candidate_id, doc_id)
+
+    return {
+        "status": "success",
+        "points": points,
+        "doc_id": str(doc_id),
+        "meta": {"source": "candidate", "candidate_id": candidate_id},
+    }
+
+
 async def detect_lot_service(
     latitude: float,
     longitude: float,
@@ -32,16 +213,31 @@ async def detect_lot_service(
     object_id: str = None,
     confidence: float = 0.62,
     year: str = None,
+    mongo_db: MongoDB = None,
+    google_maps: GoogleMapsAPI = None,
+    multi_lot: bool = False,
 ) -> Dict[str, Any]:
     """
     Service that detects a lot and returns its polygon points.
+    mongo_db and google_maps can be shared by callers that detect many lots.
+
+    With multi_lot=True the result also lists the other lots found in the
+    same image (confidence >= confidence) as "candidates". With
+    DETECT_CANDIDATES_ENABLED the neighbours that do not touch the image
+    border are stored, and later single-lot requests that fall inside one
+    of them are served from it.
+
+    Results are cached by quantized location, zoom, imagery year and model
+    hash (see detection_cache); a hit returns the stored points and doc_id
+    without fetching imagery or running the model.
+
+    Raises InferenceQueueFull when the inference queue is full, so callers
+    can signal backpressure instead of reporting a failed detection.
     """
     try:
         # Initialize services
-        google_maps = GoogleMapsAPI()
-        mongo_db = MongoDB()
-        storage_client = storage.Client()
-        bucket = storage_client.bucket("images_from_have_allotment")
+        google_maps = google_maps or GoogleMapsAPI()
+        mongo_db = mongo_db or MongoDB()
 
         # Load environment variables
         model_path = os.getenv("YOLO_MODEL_PATH")
@@ -52,13 +248,58 @@ async def detect_lot_service(
         current_year = str(datetime.now().year)
         current_month = datetime.now().strftime("%m")
         current_datetime = datetime.utcnow()
+        year = year or current_year
+
+        cache = get_detection_cache(mongo_db)
+        cache_key = None
+        if cache:
+            model_hash = await asyncio.to_thread(
+                model_registry.model_hash, model_path
+            )
+            cache_key = cache.make_key(latitude, longitude, zoom, year, model_hash)
+            cached = await cache.get(cache_key)
+            if cached and (not multi_lot or "candidates" in cached):
+                print(f"Detecção servida do cache: {cached['doc_id']}")
+                result = {
+                    "status": "success",
+                    "points": cached["points"],
+                    "doc_id": cached["doc_id"],
+                    "meta": {"source": "cache"},
+                }
+                if multi_lot:
+                    result["candidates"] = cached["candidates"]
+                return result
+
+        store_candidates = candidates_enabled()
+        # A stored candidate has no neighbours of its own to list, so
+        # multi-lot requests always run the detection
+        if store_candidates and not multi_lot:
+            candidate = await mongo_db.find_candidate_detection(
+                latitude,
+                longitude,
+                zoom,
+                year,
+                max_age_days=float(
+                    os.getenv("DETECT_CANDIDATE_MAX_AGE_DAYS", "30")
+                ),
+            )
+            if candidate:
+                print(
+                    f"Lote servido a partir do candidato {candidate['_id']}"
+                )
+                result = await detect_lot_from_candidate(
+                    mongo_db, candidate, latitude, longitude, zoom
+                )
+                if cache_key:
+                    await cache.set(cache_key, cache_value(result))
+                return result
 
         initial_data = {
             "coordinates": {"lat": latitude, "lon": longitude},
             "image_info": {
                 "zoom": zoom,
                 "scale": 2,
-                "year": year or current_year,
+                "year": year,
                 "month": current_month,
                 "captured_at": current_datetime,
             },
@@ -71,8 +312,10 @@ async def detect_lot_service(
         # Insert initial document
         doc_id = await mongo_db.insert_detection(initial_data)
 
-        # Get satellite image and save to GCS
-        image_content = google_maps.get_satellite_image(
+        # Get satellite image from the configured imagery provider (async
+        # HTTP for Static Maps, a worker thread for local sources)
+        imagery = get_imagery_provider(google_maps)
+        image_content = await imagery.get_satellite_image_async(
             lat=latitude,
             lng=longitude,
             zoom=zoom,
@@ -80,20 +323,20 @@ async def detect_lot_service(
             scale=2,
         )
 
-        # Save image to GCS and update image_info
+        # Save image to storage (background upload) and update image_info
         blob_path = f"satellite_images/{doc_id}.jpg"
-        blob = bucket.blob(blob_path)
-
-        with tempfile.NamedTemporaryFile(
-            suffix=".jpg", delete=False
-        ) as temp_file:
-            temp_file.write(image_content)
-            temp_file.flush()
-            blob.upload_from_filename(temp_file.name)
-            os.unlink(temp_file.name)
+        satellite_image_url = await asyncio.to_thread(
+            get_storage().upload,
+            "images_from_have_allotment",
+            blob_path,
+            image_content,
+            "image/jpeg",
+        )
 
-        # Update image URL in MongoDB
-        satellite_image_url = f"https://storage.cloud.google.com/images_from_have_allotment/{blob_path}"
+        # Keep the bytes in memory for a process request that follows shortly
+        image_cache = get_image_cache()
+        if image_cache:
+            image_cache.put_encoded(satellite_image_url, image_content)
 
         image_info_update = {
             "image_info.url": satellite_image_url,
@@ -112,14 +355,17 @@ async def detect_lot_service(
                 "longitude": longitude,
                 "dimensions": "1280x1280",
                 "zoom": zoom,
-                "year": initial_data["image_info"]["year"],
+                "year": year,
             }
         ]
 
-        processed_docs = detect_lots_and_save(
+        processed_docs = await detect_lots_async(
             model_path=model_path,
             items_list=items_list,
             adjust_mask=True,
+            candidate_confidence=(
+                confidence if multi_lot or store_candidates else None
+            ),
         )
 
         if not processed_docs:
@@ -132,127 +378,50 @@ async def detect_lot_service(
 
         # Update detection results
         detection = processed_docs[0]
+        candidates = detection.pop("candidate_detections", [])
 
-        # Convert normalized pixel coordinates to lat/lon points for original mask
-        original_points = []
-        print(
-            f"Original detection: {detection['original_detection']['polygon']}"
-        )
-        for x, y in detection["original_detection"]["polygon"]:
-            lat, lon = pixel_to_latlon(
-                pixel_x=x * 1280,
-                pixel_y=y * 1280,
-                center_lat=latitude,
-                center_lon=longitude,
-                zoom=zoom,
-                scale=2,
-                image_width=1280,
-                image_height=1280,
-            )
-            original_points.append([lat, lon])
-
-        detection_result = {
-            "detection_result": {
-                "center": {
-                    "pixel": {
-                        "x": detection["original_detection"]["polygon"][0][0],
-                        "y": detection["original_detection"]["polygon"][0][1],
-                    },
-                    "geo": {"lat": latitude, "lon": longitude},
-                },
-                "confidence": detection["confidence"],
-                "mask_points": detection["original_detection"]["polygon"],
-                "geo_points": original_points,
-                "yolov8_annotation": points_to_yolov8_annotation(
-                    detection["original_detection"]["polygon"]
-                ),
-                "processed_at": datetime.utcnow(),
-            }
-        }
-
-        if "adjusted_detection" in detection:
-            # Convert normalized pixel coordinates to lat/lon points for adjusted mask
-            adjusted_geo_points = []
-            for x, y in detection["adjusted_detection"]["polygon"]:
-                lat, lon = pixel_to_latlon(
-                    pixel_x=x * 1280,
-                    pixel_y=y * 1280,
-                    center_lat=latitude,
-                    center_lon=longitude,
-                    zoom=zoom,
-                    scale=2,
-                    image_width=1280,
-                    image_height=1280,
-                )
-                adjusted_geo_points.append([lat, lon])
-
-            detection_result["detection_result"]["adjusted_mask"] = {
-                "points": detection["adjusted_detection"]["polygon"],
-                "geo_points": adjusted_geo_points,
-                "center": {"geo": {"lat": latitude, "lon": longitude}},
-                "adjustment_type": detection["adjusted_detection"][
-                    "adjustment_method"
-                ],
-                "yolov8_annotation": points_to_yolov8_annotation(
-                    detection["adjusted_detection"]["polygon"]
-                ),
-                "adjusted_at": datetime.utcnow(),
-            }
-
-        await mongo_db.update_detection(doc_id, detection_result)
-
-        # Get points from detection result
-        points_array = (
-            detection_result["detection_result"]["adjusted_mask"]["points"]
-            if "adjusted_mask" in detection_result["detection_result"]
-            else detection_result["detection_result"]["mask_points"]
+        points = await save_detection_result(
+            mongo_db, doc_id, detection, latitude, longitude, zoom
         )
 
-        # Convert normalized pixel coordinates to lat/lon points
-        points = []
-        for x, y in points_array:
-            lat, lon = pixel_to_latlon(
-                pixel_x=x
-                * 1280,  # Convert normalized coordinates back to pixels
-                pixel_y=y * 1280,
-                center_lat=latitude,
-                center_lon=longitude,
-                zoom=zoom,
-                scale=2,
-                image_width=1280,
-                image_height=1280,
+        # Lots cut by the image border are returned but not stored
+        complete_candidates = [
+            candidate
+            for candidate in candidates
+            if not touches_image_border(candidate["polygon"])
+        ]
+        if store_candidates and complete_candidates:
+            candidate_ids = await mongo_db.insert_candidate_detections(
+                source_doc_id=doc_id,
+                image_center={"lat": latitude, "lon": longitude},
+                image_info={
+                    **initial_data["image_info"],
+                    "url": satellite_image_url,
+                    "path": blob_path,
+                },
+                candidates=complete_candidates,
             )
-            points.append({"lat": lat, "lon": lon})
-
-        # Calculate area
-        points_lat_lon = [[p["lat"], p["lon"]] for p in points]
-        area_m2 = calculate_geo_area(points_lat_lon)
-
-        # Initialize lot_details structure
-        lot_details = {
-            "area_m2": area_m2,
-            "point_colors": {
-                "points": [],
-                "colors": [],
-                "colors_adjusted": [],
-                "points_lat_lon": points_lat_lon,
-                "points_utm": [],
-                "cardinal_points": {},
-                "front_points": [],
-                "front_points_lat_lon": [],
-                "street_points": [],
-                "street_info": {},
-            },
-            "elevations": [],
-            "mask_elevation": [],
-            "mask_utm": [],
-        }
-
-        # Update MongoDB with lot_details
-        await mongo_db.update_detection(doc_id, {"lot_details": lot_details})
-
-        return {"status": "success", "points": points, "doc_id": str(doc_id)}
-
+            print(f"Lotes candidatos salvos: {len(candidate_ids)}")
+
+        result = {"status": "success", "points": points, "doc_id": str(doc_id)}
+        if multi_lot:
+            result["candidates"] = [
+                {
+                    "points": [
+                        {"lat": lat, "lon": lon}
+                        for lat, lon in candidate["geo_points"]
+                    ],
+                    "confidence": candidate["confidence"],
+                }
+                for candidate in candidates
+            ]
+        if cache_key:
+            await cache.set(cache_key, cache_value(result))
+        return result
+
+    except InferenceQueueFull:
+        # Backpressure: the router answers 503 with Retry-After
+        raise
     except Exception as e:
         return {
             "status": "error",
@@ -1,15 +1,15 @@
 from pathlib import Path
+import asyncio
 import os
 import json
 from datetime import datetime
 from typing import Dict, Any, List
 import numpy as np
 from bson import ObjectId
-import tempfile
-from google.cloud import storage
 from geopy.distance import geodesic
 
 from ...apis.google_maps import GoogleMapsAPI
+from ...apis.imagery_providers import get_imagery_provider
 from ...modules.colors import process_lot_colors
 from ...modules.elevation import process_lots_elevation
 from ...modules.utm import process_lots_utm_coordinates
@@ -19,13 +19,16 @@ from ...modules.generate_csv import process_lots_csv
 from ...modules.generate_glb import process_lots_glb
 from ...modules.classify_lots_slope import process_lots_slope
 from ...database.mongodb import MongoDB
+from ...database.storage import get_storage
 from ...modules.site_images import process_lot_images_for_site
-from ...modules.detection import (
-    detect_lots_and_save,
-    load_yolo_model,
-    get_best_segmentation,
+from ...modules.detection import detect_lots_async
+from ...modules.inference_worker import InferenceQueueFull
+from ...modules.detection_cache import get_detection_cache
+from ...modules.image_store import LotArtifacts
+from ...modules.pixel_to_geo import (
+    pixel_to_latlon_array,
+    lat_lon_to_pixel_normalized_array,
 )
-from ...modules.pixel_to_geo import pixel_to_latlon, lat_lon_to_pixel_normalized
 from ...modules.process_address import process_lot_address
 
 
@@ -79,23 +82,18 @@ def ai_validation(
     param_center_lat, param_center_lon = param_center
 
     # Primeiro converte cada ponto do polígono para lat/lon
-    ai_points_latlon = []
-    for x_norm, y_norm in ai_points:
-        lat, lon = pixel_to_latlon(
-            pixel_x=x_norm * 1280,  # Convert from normalized (0-1) to pixels
-            pixel_y=y_norm * 1280,
-            center_lat=param_center_lat,
-            center_lon=param_center_lon,
-            zoom=zoom,
-            scale=2,
-            image_width=1280,
-            image_height=1280,
-        )
-        ai_points_latlon.append((lat, lon))
+    ai_points_latlon = pixel_to_latlon_array(
+        np.asarray(ai_points, dtype=np.float64) * 1280,  # normalized -> pixels
+        center_lat=param_center_lat,
+        center_lon=param_center_lon,
+        zoom=zoom,
+        scale=2,
+        image_width=1280,
+        image_height=1280,
+    )
 
     # Calcula o centro como média das coordenadas lat/lon
-    ai_center_lat = sum(p[0] for p in ai_points_latlon) / len(ai_points_latlon)
-    ai_center_lon = sum(p[1] for p in ai_points_latlon) / len(ai_points_latlon)
+    ai_center_lat, ai_center_lon = ai_points_latlon.mean(axis=0).tolist()
 
     print(f"Centro do polígono por parâmetro: {param_center}")
     print(
@@ -152,6 +150,10 @@ async def process_lot_service(
         # Fixed values
         zoom = 20
 
+        # Satellite image shared by the stages of this request
+        artifacts = LotArtifacts(doc_id)
+        satellite_image_url = None
+
         # Check if points are different from the original ones
         original_points = None
         original_center = None
@@ -183,8 +185,9 @@ async def process_lot_service(
             new_center_lon = sum(p.lon for p in points) / len(points)
             new_center = (new_center_lat, new_center_lon)
 
-            # Get new satellite image
-            image_content = google_maps.get_satellite_image(
+            # Get new satellite image from the configured imagery provider
+            imagery = get_imagery_provider(google_maps)
+            image_content = imagery.get_satellite_image(
                 lat=new_center_lat,
                 lng=new_center_lon,
                 zoom=zoom,
@@ -192,13 +195,11 @@ async def process_lot_service(
                 scale=2,
             )
 
-            # Load YOLO model and run detection
+            # Run detection with the registry-loaded YOLO model
             model_path = os.getenv("YOLO_MODEL_PATH")
             if not model_path:
                 return {"status": "error", "error": "YOLO_MODEL_PATH not found"}
 
-            model = load_yolo_model(model_path)
-
             # Create items list for detection
             items_list = [
                 {
@@ -215,7 +216,7 @@ async def process_lot_service(
             print(f"\nExecutando detecção para o lote {doc_id}")
             print(f"Centro: lat={new_center_lat}, lon={new_center_lon}")
 
-            processed_docs = detect_lots_and_save(
+            processed_docs = await detect_lots_async(
                 model_path=model_path,
                 items_list=items_list,
                 adjust_mask=False,
@@ -263,19 +264,15 @@ async def process_lot_service(
                     "error": "Nenhuma detecção encontrada",
                 }
             # Convert points to normalized pixel coordinates for mask_points
-            normalized_points = []
-            for point in points:
-                x_norm, y_norm = lat_lon_to_pixel_normalized(
-                    lat=point.lat,
-                    lon=point.lon,
-                    center_lat=new_center_lat,
-                    center_lon=new_center_lon,
-                    zoom=zoom,
-                    scale=2,
-                    image_width=1280,
-                    image_height=1280,
-                )
-                normalized_points.append([x_norm, y_norm])
+            normalized_points = lat_lon_to_pixel_normalized_array(
+                new_points_lat_lon,
+                center_lat=new_center_lat,
+                center_lon=new_center_lon,
+                zoom=zoom,
+                scale=2,
+                image_width=1280,
+                image_height=1280,
+            ).tolist()
 
             # Move current detection_result to old_detection_result
             if "detection_result" in doc:
@@ -325,14 +322,18 @@ async def process_lot_service(
             await mongo_db.update_detection(
                 doc_id, {"detection_result": new_detection_result}
             )
+
+            # Cached detections for this doc now hold outdated points
+            detection_cache = get_detection_cache(mongo_db)
+            if detection_cache:
+                await detection_cache.invalidate_doc(doc_id)
             print("\nCriando novo detection_result com parâmetros fornecidos:")
             print(f"Confiança: {confidence}")
             print("Detecção anterior salva em old_detection_result")
             print("Nova detecção salva em detection_result com adjusted_mask")
 
-            # Save image to GCS
-            storage_client = storage.Client()
-            bucket = storage_client.bucket("images_from_have_allotment")
+            # Save image to storage
+            storage = get_storage()
 
             # Save current image path as old if it exists
             if "image_info" in doc and "path" in doc["image_info"]:
@@ -340,24 +341,19 @@ async def process_lot_service(
                 if old_blob_path:
                     # Move current image to old_ path
                     old_path = f"old_{old_blob_path}"
-                    bucket.copy_blob(
-                        bucket.blob(old_blob_path), bucket, old_path
+                    storage.copy(
+                        "images_from_have_allotment", old_blob_path, old_path
                     )
 
-            # Save new image
+            # Save new image (background upload, URL returned immediately)
             blob_path = f"satellite_images/{doc_id}.jpg"
-            blob = bucket.blob(blob_path)
-
-            with tempfile.NamedTemporaryFile(
-                suffix=".jpg", delete=False
-            ) as temp_file:
-                temp_file.write(image_content)
-                temp_file.flush()
-                blob.upload_from_filename(temp_file.name)
-                os.unlink(temp_file.name)
-
-            # Generate new image URL
-            satellite_image_url = f"https://storage.cloud.google.com/images_from_have_allotment/{blob_path}"
+            satellite_image_url = storage.upload(
+                "images_from_have_allotment",
+                blob_path,
+                image_content,
+                "image/jpeg",
+            )
+            artifacts.set_image_content(satellite_image_url, image_content)
 
             # Update image_info with new image data and timestamp
             image_info_update = {
@@ -398,6 +394,9 @@ async def process_lot_service(
                 {"lot_details.point_colors.points_lat_lon": new_points_lat_lon},
             )
 
+        # Decode the satellite image once for the colour and site image stages
+        lot_image = artifacts.get_image(doc)
+
         # Process colors
         colors_processed = process_lot_colors(
             mongodb_uri=mongo_connection_string,
@@ -406,6 +405,9 @@ async def process_lot_service(
             bright_threshold=215,
             confidence=confidence,
             doc_id=doc_id,
+            image=lot_image,
+            # Same sampled points on every run of the lot (cacheable output)
+            seed=int(str(doc_id), 16) % 2**32,
         )
 
         if colors_processed:
@@ -421,6 +423,7 @@ async def process_lot_service(
             hex_color="#e8f34e",
             doc_id=doc_id,
             confidence=confidence,
+            image=lot_image,
         )
 
         if site_images_processed:
@@ -578,9 +581,24 @@ async def process_lot_service(
         # Get final document
         final_doc = await mongo_db.get_detection(doc_id)
 
+        # The satellite image was uploaded in the background: report a failed
+        # upload instead of success (Mongo points to an object that is missing)
+        if satellite_image_url:
+            upload_error = await asyncio.to_thread(
+                get_storage().upload_error_for_url, satellite_image_url
+            )
+            if upload_error:
+                return {
+                    "status": "error",
+                    "error": f"Satellite image upload failed: {upload_error}",
+                }
+
         # Return success response with document ID
         return {"status": "success", "doc_id": str(doc_id)}
 
+    except InferenceQueueFull:
+        # Backpressure: the router answers 503 with Retry-After
+        raise
     except Exception as e:
         return {"status": "error", "error": str(e)}
 